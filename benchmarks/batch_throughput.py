@@ -0,0 +1,43 @@
+"""Rows per second when evaluating one program over a table of integer inputs.
+
+python benchmarks/batch_throughput.py --rows 1000000 --workers 1 2 4
+"""
+
+import argparse
+import array
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from execute import JitSession  # noqa: E402
+from main import compile_to_ir  # noqa: E402
+from programs import arithmetic_program  # noqa: E402
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=1_000, help="program size in tokens")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, nargs="*", default=[1, 2, 4])
+    options = parser.parse_args()
+
+    sys.setrecursionlimit(100_000)
+    inputs = array.array("q", range(options.rows))
+    out = array.array("q", bytes(8 * options.rows))
+    with JitSession() as session:
+        program = session.load(compile_to_ir(arithmetic_program(options.size)))
+
+        print(f"{'method':<20} {'rows/s':>14}")
+        calls = min(options.rows, 100_000)
+        start = time.perf_counter()
+        for x in inputs[:calls]:
+            program(x)
+        print(f"{'per-row call':<20} {calls / (time.perf_counter() - start):>14,.0f}")
+
+        for workers in options.workers:
+            start = time.perf_counter()
+            program.batch(inputs, out, workers=workers)
+            print(f"{f'batch x{workers}':<20} {options.rows / (time.perf_counter() - start):>14,.0f}")
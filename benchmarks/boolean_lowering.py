@@ -0,0 +1,139 @@
+"""Branch-heavy loops lowered with booleans kept as i1s, and with every boolean widened to an i64.
+
+python benchmarks/boolean_lowering.py --n 1000000 -O 0 2 --gc
+
+The "i64" lowering is `lower` as of the revision before booleans were kept as i1s: each comparison is widened with a
+`zext` when computed and narrowed again with a `trunc` (or, under `--gc`, compared with false) to branch on. Static
+counts are the `zext`, `trunc` and `phi i1` instructions of the program's own functions.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+import types
+from collections.abc import Callable
+from functools import partial
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from execute import JitSession  # noqa: E402
+from parse import parse  # noqa: E402
+from pass_manager import Pass, PassManager, default_pipeline  # noqa: E402
+from util import SequentialNameGenerator  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+PROGRAMS = {
+    # Collatz steps of every number below n, capped at 500 each.
+    "collatz": """
+        (program (n)
+          (let ((i 1) (total 0))
+            (begin
+              (while (< i n)
+                (let ((x i) (steps 0))
+                  (begin
+                    (while (and (> x 1) (< steps 500))
+                      (begin
+                        (if (= (* (/ x 2) 2) x) (set! x (/ x 2)) (set! x (+ (* 3 x) 1)))
+                        (set! steps (+ steps 1))))
+                    (set! total (+ total steps))
+                    (set! i (+ i 1)))))
+              total)))
+    """,
+    # Flags computed once per iteration and combined several ways.
+    "flags": """
+        (program (n)
+          (let ((i 0) (s 0))
+            (begin
+              (while (< i n)
+                (let ((even (= (* (/ i 2) 2) i)) (big (>= (- i (* (/ i 100) 100)) 50)) (third (= (* (/ i 3) 3) i)))
+                  (begin
+                    (if (and even (not big)) (set! s (+ s 1)) (set! s s))
+                    (if (or third big) (set! s (+ s 2)) (set! s (- s 1)))
+                    (if (and (or even third) (not (and big third))) (set! s (+ s 3)) (set! s s))
+                    (set! i (+ i 1)))))
+              s)))
+    """,
+    # Primes below n / 20 by trial division.
+    "primes": """
+        (program (n)
+          (let ((i 2) (count 0) (limit (/ n 20)))
+            (begin
+              (while (< i limit)
+                (let ((d 2) (prime #t))
+                  (begin
+                    (while (and prime (<= (* d d) i))
+                      (begin
+                        (if (= (* (/ i d) d) i) (set! prime #f) (set! prime prime))
+                        (set! d (+ d 1))))
+                    (if prime (set! count (+ count 1)) (set! count count))
+                    (set! i (+ i 1)))))
+              count)))
+    """,
+}
+
+
+def widening_lower() -> Callable[..., object]:
+    """`lower` as of the revision before `lower_flag` was added."""
+
+    def git(
+        *arguments: str,
+    ) -> str:
+        return subprocess.run(["git", *arguments], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+
+    revision = git("log", "-n", "1", "-S", "def lower_flag(", "--format=%H", "--", "src/lower.py").strip()
+    path = f"{revision}^:src/lower.py"
+    module = types.ModuleType("baseline_lower")
+    exec(compile(git("show", path), path, "exec"), module.__dict__)
+    return module.lower
+
+
+def compile_with(
+    source: str,
+    lower: Callable[..., object] | None,
+    gc: bool,
+) -> str:
+    passes = default_pipeline(SequentialNameGenerator(), gc=gc)
+    if lower is not None:
+        passes = [Pass("lower", partial(lower, gc=gc)) if p.name == "lower" else p for p in passes]
+    return str(PassManager(passes).run(parse(source)))
+
+
+def static_counts(
+    llvm_ir: str,
+) -> tuple[int, int, int]:
+    own = "".join(re.findall(r'define tailcc i64 @"(?:_start|_f\d+)".*?\n}', llvm_ir, re.DOTALL))
+    return own.count(" zext "), own.count(" trunc "), own.count("phi  i1")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=1_000_000, help="argument to run each program with")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per program and level; the fastest is reported")
+    parser.add_argument("-O", dest="optimization_levels", type=int, nargs="*", default=[0, 2])
+    parser.add_argument("--gc", action="store_true", help="lower for the garbage-collected heap")
+    options = parser.parse_args()
+
+    lowerings = {"i64": widening_lower(), "i1": None}
+    print(
+        f"{'program':<8} {'booleans':<9} {'zext':>5} {'trunc':>6} {'phi i1':>6} {'level':<6} {'result':>10} {'ms':>9}"
+    )
+    for name, source in PROGRAMS.items():
+        for booleans, lower in lowerings.items():
+            llvm_ir = compile_with(source, lower, options.gc)
+            zext, trunc, phis = static_counts(llvm_ir)
+            with JitSession() as session:
+                for level in options.optimization_levels:
+                    program = session.load(llvm_ir, level)
+                    seconds = float("inf")
+                    for _ in range(options.repeat):
+                        start = time.perf_counter()
+                        result = program(options.n)
+                        seconds = min(seconds, time.perf_counter() - start)
+                    print(
+                        f"{name:<8} {booleans:<9} {zext:>5} {trunc:>6} {phis:>6} {f'-O{level}':<6} {result:>10}"
+                        f" {seconds * 1e3:>9.2f}"
+                    )
@@ -0,0 +1,57 @@
+"""Heap allocations made by conditionals: join points versus join closures.
+
+python benchmarks/branch_allocations.py --branches 10 100 1000 --rows 100000
+
+Static counts (hoisted functions, heap allocation sites) come from the lowered IR. The closure-based lowering is the
+same program written with an explicit join lambda after every conditional, which is what conditionals used to compile
+to. Heap tuples come from the program's arena, whose counters give the allocations per row.
+"""
+
+import argparse
+import array
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from execute import JitSession  # noqa: E402
+from main import compile_to_ir  # noqa: E402
+from programs import branchy_program  # noqa: E402
+
+FUNCTIONS = "\ndefine tailcc "  # every function lowered from the program, `_start` included
+ALLOCATIONS = 'call i64* @"_arena_alloc"'
+
+
+def static_counts(
+    llvm_ir: str,
+) -> tuple[int, int]:
+    return llvm_ir.count(FUNCTIONS) - 1, llvm_ir.count(ALLOCATIONS)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--branches", type=int, nargs="*", default=[10, 100, 1_000])
+    parser.add_argument("--rows", type=int, default=100_000)
+    options = parser.parse_args()
+
+    sys.setrecursionlimit(100_000)
+    inputs = array.array("q", range(options.rows))
+
+    header = f"{'program':<14} {'lowering':<10} {'functions':>9} {'sites':>8} {'allocs/row':>10} {'ns/row':>8}"
+    print(header)
+    for branches in options.branches:
+        for lowering, join_closures in [("closures", True), ("joins", False)]:
+            llvm_ir = compile_to_ir(branchy_program(branches, join_closures))
+            functions, sites = static_counts(llvm_ir)
+            with JitSession() as session:
+                program = session.load(llvm_ir)
+                start = time.perf_counter()
+                program.batch(inputs)
+                seconds = time.perf_counter() - start
+                allocations = program.arena().allocations
+            print(
+                f"{f'branchy-{branches}':<14} {lowering:<10} {functions:>9} {sites:>8}"
+                f" {allocations / options.rows:>10.2f} {seconds / options.rows * 1e9:>8.1f}"
+            )
@@ -0,0 +1,55 @@
+"""Calls per second and heap allocations per call for non-tail recursive calls.
+
+python benchmarks/call_overhead.py --n 20 25 30 -O 0 2
+
+Each `fib` makes two calls that return to their caller. Calls compile to direct native call-and-return, and since
+`fib` is only ever called it needs no closure (nor a `letrec` cell to hold one), so a run makes no heap allocations.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from execute import JitSession  # noqa: E402
+from main import compile_to_ir  # noqa: E402
+from branch_allocations import static_counts  # noqa: E402
+
+FIB = "(program (n) (letrec ((fib (lambda (n) (if (< n 2) n (+ (fib (- n 1)) (fib (- n 2))))))) (fib n)))"
+
+
+def fib_calls(
+    n: int,
+) -> int:
+    """The number of times `fib` is entered computing `fib(n)`: 2 * fib(n + 1) - 1."""
+    a, b = 0, 1
+    for _ in range(n + 1):
+        a, b = b, a + b
+    return 2 * a - 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, nargs="*", default=[20, 25, 30])
+    parser.add_argument("-O", dest="optimization_levels", type=int, nargs="*", default=[0, 2])
+    options = parser.parse_args()
+
+    llvm_ir = compile_to_ir(FIB)
+    functions, sites = static_counts(llvm_ir)
+    print(f"fib: {functions} functions, {sites} heap allocation sites")
+
+    print(f"{'level':<6} {'n':>4} {'calls':>12} {'allocs':>8} {'calls/s':>14}")
+    with JitSession() as session:
+        for level in options.optimization_levels:
+            program = session.load(llvm_ir, level)
+            for n in options.n:
+                before = program.arena().allocations
+                start = time.perf_counter()
+                program(n)
+                seconds = time.perf_counter() - start
+                allocations = program.arena().allocations - before
+                calls = fib_calls(n)
+                print(f"{f'-O{level}':<6} {n:>4} {calls:>12,} {allocations:>8} {calls / seconds:>14,.0f}")
@@ -0,0 +1,45 @@
+"""Cold versus warm compile time through the on-disk compile cache.
+
+python benchmarks/compile_cache_speedup.py --sizes 1000 2000 4000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from compile_cache import CompileCache  # noqa: E402
+from main import compile_to_ir  # noqa: E402
+from programs import arithmetic_program  # noqa: E402
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="*", default=[1_000, 2_000, 4_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    options = parser.parse_args()
+
+    sys.setrecursionlimit(100_000)
+    examples = os.path.join(os.path.dirname(__file__), "..", "examples")
+    sources = [(name, open(os.path.join(examples, name)).read()) for name in sorted(os.listdir(examples))]
+    sources += [(f"arithmetic-{size}", arithmetic_program(size)) for size in options.sizes]
+
+    print(f"{'program':<20} {'cold (ms)':>10} {'warm (ms)':>10} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        cache = CompileCache(directory)
+        for name, source in sources:
+            start = time.perf_counter()
+            compile_to_ir(source, cache)
+            cold = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for _ in range(options.repeat):
+                compile_to_ir(source, cache)
+            warm = (time.perf_counter() - start) / options.repeat
+
+            print(f"{name:<20} {cold * 1000:>10.3f} {warm * 1000:>10.3f} {cold / warm:>8.0f}")
+        print(f"cache: {cache.hits} hits, {cache.misses} misses")
@@ -0,0 +1,59 @@
+"""Memory use of a `while` loop that allocates a heap tuple per iteration, with and without `--gc`.
+
+python benchmarks/gc_stress.py --iterations 100000000 1000000000 --arena-iterations 10000000
+
+With `--gc` the loop runs in a fixed amount of memory however far its total allocation exceeds the machine's RAM: the
+default billion iterations allocate 16 GB (8 bytes of field and 8 of header per tuple). Without it, the arena holds
+every tuple until the run returns, so its run is kept short. Peak RSS is the process's, so the arena runs last.
+"""
+
+import argparse
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from execute import JitSession  # noqa: E402
+from main import compile_to_ir  # noqa: E402
+
+# `box` returns its cell, so with inlining off escape analysis leaves every cell on the heap.
+LOOP = """
+(program (n)
+  (letrec ((box (lambda (i) (cell i))))
+    (let ((i 0) (s 0))
+      (begin
+        (while (< i n) (begin (set! s (+ s (^ (box i)))) (set! i (+ i 1))))
+        s))))
+"""
+
+
+def peak_rss_mib() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, nargs="*", default=[100_000_000, 1_000_000_000])
+    parser.add_argument("--arena-iterations", type=int, nargs="*", default=[10_000_000])
+    parser.add_argument("-O", dest="optimization_level", type=int, default=2)
+    options = parser.parse_args()
+
+    header = f"{'heap':<6} {'iterations':>13} {'allocated (GiB)':>16} {'collections':>12} {'peak RSS (MiB)':>15}"
+    print(f"{header} {'ns/iter':>8}")
+    for heap, gc, runs in [("gc", True, options.iterations), ("arena", False, options.arena_iterations)]:
+        with JitSession() as session:
+            program = session.load(compile_to_ir(LOOP, gc=gc, inline_budget=0), options.optimization_level)
+            for iterations in runs:
+                before = program.arena()
+                start = time.perf_counter()
+                assert program(iterations) == iterations * (iterations - 1) // 2
+                seconds = time.perf_counter() - start
+                after = program.arena()
+                allocated = (after.bytes - before.bytes) * (2 if gc else 1) / 2**30  # with headers under --gc
+                print(
+                    f"{heap:<6} {iterations:>13,} {allocated:>16.2f} {after.collections - before.collections:>12,}"
+                    f" {peak_rss_mib():>15.1f} {seconds / iterations * 1e9:>8.2f}"
+                )
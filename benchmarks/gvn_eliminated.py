@@ -0,0 +1,89 @@
+"""Values `gvn` eliminates, and run time of programs compiled with and without it.
+
+python benchmarks/gvn_eliminated.py --n 1000000 -O 0 2
+
+"eliminated" is the total over all functions of the pass's per-function counts (the busiest function is named);
+"instructions" counts the instructions of the lowered module's own functions (`_start` and the hoisted `_f<n>`).
+Without the pass, LLVM's own GVN still runs at -O1 and above, so the run times mostly differ at -O0.
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from execute import JitSession  # noqa: E402
+from parse import parse  # noqa: E402
+from pass_manager import PassManager, default_pipeline  # noqa: E402
+from util import SequentialNameGenerator  # noqa: E402
+from higher_order import PROGRAMS  # noqa: E402
+from match_dispatch import NESTED  # noqa: E402
+
+SOURCES = {
+    # Each iteration recomputes the same products and reads the same cell again and again.
+    "repeated": """
+        (program (n)
+          (let ((i 0) (s 0) (c (cell 0)))
+            (begin
+              (while (< i n)
+                (begin
+                  (set! s (+ s (+ (* (+ i 1) (+ i 1)) (* (+ 1 i) (^ c)))))
+                  (set! s (- s (* (^ c) (+ i 1))))
+                  (:= c (+ (^ c) (* (+ i 1) 2)))
+                  (set! i (+ i 1))))
+              (+ s (^ c)))))
+    """,
+    **PROGRAMS,
+    "match": NESTED,
+}
+
+
+def compile_with(
+    source: str,
+    numbering: bool,
+) -> tuple[str, dict[str, int]]:
+    passes = default_pipeline(SequentialNameGenerator())
+    [gvn] = [p for p in passes if p.name == "gvn"]
+    if not numbering:
+        passes.remove(gvn)
+    return str(PassManager(passes).run(parse(source))), dict(gvn.counters or {})
+
+
+def instructions(
+    llvm_ir: str,
+) -> int:
+    own = re.findall(r'define tailcc i64 @"(?:_start|_f\d+)".*?\n}', llvm_ir, re.DOTALL)
+    return sum(1 for function in own for line in function.splitlines() if line.startswith("  "))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=1_000_000, help="argument to run each program with")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per program and level; the fastest is reported")
+    parser.add_argument("-O", dest="optimization_levels", type=int, nargs="*", default=[0, 2])
+    options = parser.parse_args()
+
+    print(
+        f"{'program':<8} {'gvn':<4} {'eliminated':>10} {'busiest':<10} {'instructions':>12} {'level':<6} {'runs/s':>10}"
+    )
+    for name, source in SOURCES.items():
+        for numbering in [False, True]:
+            llvm_ir, eliminated = compile_with(source, numbering)
+            total = sum(eliminated.values())
+            busiest = max(eliminated, key=eliminated.__getitem__) if total else "-"
+            with JitSession() as session:
+                for level in options.optimization_levels:
+                    program = session.load(llvm_ir, level)
+                    seconds = float("inf")
+                    for _ in range(options.repeat):
+                        start = time.perf_counter()
+                        program(options.n)
+                        seconds = min(seconds, time.perf_counter() - start)
+                    print(
+                        f"{name:<8} {'on' if numbering else 'off':<4} {total:>10} {busiest:<10}"
+                        f" {instructions(llvm_ir):>12} {f'-O{level}':<6} {1 / seconds:>10,.1f}"
+                    )
@@ -0,0 +1,98 @@
+"""Higher-order programs with their known calls made direct, and with every call made through a closure.
+
+python benchmarks/higher_order.py --n 100000 1000000 -O 0 2
+
+The "closures" lowering closes every lambda the way `close` did before known calls: each one gets a heap closure, and
+each call loads the code pointer from its slot 0 and calls through it. Static counts are the direct and indirect
+calls in the lowered module; `allocs` are the heap tuples a run allocates.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from close_lambdas import close_statement  # noqa: E402
+from execute import JitSession  # noqa: E402
+from maltose import Program  # noqa: E402
+from parse import parse  # noqa: E402
+from pass_manager import Pass, PassManager, default_pipeline  # noqa: E402
+from util import SequentialNameGenerator  # noqa: E402
+
+PROGRAMS = {
+    # `sum` and `twice` are known everywhere; the lambdas passed to them are not.
+    "fold": """
+        (program (n)
+          (letrec ((twice (lambda (f x) (f (f x))))
+                   (sum (lambda (f i acc) (if (< i 0) acc (sum f (- i 1) (+ acc (f i)))))))
+            (let ((k 3))
+              (sum (lambda (i) (twice (lambda (x) (+ x k)) i)) n 0))))
+    """,
+    # Local helpers capturing the loop's variables, each called a few times per iteration.
+    "helpers": """
+        (program (n)
+          (let ((i 0) (s 0))
+            (begin
+              (while (< i n)
+                (let ((scale (lambda (x) (* x 3))) (offset (lambda (x) (+ x i))))
+                  (begin
+                    (set! s (+ s (offset (scale (offset 1)))))
+                    (set! i (+ i 1)))))
+              s)))
+    """,
+    "even": """
+        (program (n)
+          (letrec ((even (lambda (n) (if (= n 0) 1 (odd (- n 1)))))
+                   (odd (lambda (n) (if (= n 0) 0 (even (- n 1))))))
+            (even n)))
+    """,
+}
+
+
+def compile_with(
+    source: str,
+    known_calls: bool,
+) -> str:
+    fresh = SequentialNameGenerator()
+    passes = default_pipeline(fresh)
+    if not known_calls:
+        closures = Pass("close", lambda program: Program(program.parameters, close_statement(program.body, fresh)))
+        passes = [closures if p.name == "close" else p for p in passes]
+    return str(PassManager(passes).run(parse(source)))
+
+
+def static_counts(
+    llvm_ir: str,
+) -> tuple[int, int]:
+    """Direct and indirect calls to the program's own functions (its lambdas are all hoisted to `_f<n>`)."""
+    return llvm_ir.count('call tailcc i64 @"_f'), llvm_ir.count("call tailcc i64 %")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, nargs="*", default=[100_000, 1_000_000])
+    parser.add_argument("-O", dest="optimization_levels", type=int, nargs="*", default=[0, 2])
+    options = parser.parse_args()
+
+    header = f"{'program':<8} {'calls':<9} {'level':<6} {'direct':>6} {'indirect':>8} {'n':>9} {'allocs':>9}"
+    print(f"{header} {'n/s':>14}")
+    for name, source in PROGRAMS.items():
+        for calls, known_calls in [("closures", False), ("known", True)]:
+            llvm_ir = compile_with(source, known_calls)
+            direct, indirect = static_counts(llvm_ir)
+            with JitSession() as session:
+                for level in options.optimization_levels:
+                    program = session.load(llvm_ir, level)
+                    for n in options.n:
+                        before = program.arena().allocations
+                        start = time.perf_counter()
+                        program(n)
+                        seconds = time.perf_counter() - start
+                        allocations = program.arena().allocations - before
+                        print(
+                            f"{name:<8} {calls:<9} {f'-O{level}':<6} {direct:>6} {indirect:>8} {n:>9}"
+                            f" {allocations:>9,} {n / seconds:>14,.0f}"
+                        )
@@ -0,0 +1,62 @@
+"""Compile time, function count and run time of programs compiled at several inline budgets.
+
+python benchmarks/inline_budget.py --budgets 0 4 16 64 --n 1000000 -O 0 2
+
+A budget of 0 turns the `inline` pass off. Functions are the ones the lowered module defines for the program (the
+runtime's are not counted); compile time is the whole pipeline, LLVM optimization excluded.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from execute import JitSession  # noqa: E402
+from main import compile_to_ir  # noqa: E402
+from programs import branchy_program  # noqa: E402
+from higher_order import PROGRAMS  # noqa: E402
+
+SOURCES = {
+    # Forty conditionals, each passing its result to a lambda for the rest of the program.
+    "continuations": branchy_program(40, join_closures=True),
+    **PROGRAMS,
+}
+
+
+def functions(
+    llvm_ir: str,
+) -> int:
+    return llvm_ir.count('define tailcc i64 @"_f')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budgets", type=int, nargs="*", default=[0, 4, 16, 64])
+    parser.add_argument("--n", type=int, default=1_000_000, help="argument to run each program with")
+    parser.add_argument("--repeat", type=int, default=20, help="compiles to time per program and budget")
+    parser.add_argument("-O", dest="optimization_levels", type=int, nargs="*", default=[0, 2])
+    options = parser.parse_args()
+
+    compile_to_ir(SOURCES["fold"])  # build the parser before timing anything
+    print(f"{'program':<14} {'budget':>6} {'functions':>9} {'compile ms':>10} {'level':<6} {'runs/s':>12}")
+    for name, source in SOURCES.items():
+        for budget in options.budgets:
+            start = time.perf_counter()
+            for _ in range(options.repeat):
+                llvm_ir = compile_to_ir(source, inline_budget=budget)
+            milliseconds = (time.perf_counter() - start) / options.repeat * 1e3
+            with JitSession() as session:
+                for level in options.optimization_levels:
+                    program = session.load(llvm_ir, level)
+                    runs = 0
+                    start = time.perf_counter()
+                    while (seconds := time.perf_counter() - start) < 0.2:
+                        program(options.n)
+                        runs += 1
+                    print(
+                        f"{name:<14} {budget:>6} {functions(llvm_ir):>9} {milliseconds:>10.2f} {f'-O{level}':<6}"
+                        f" {runs / seconds:>12,.0f}"
+                    )
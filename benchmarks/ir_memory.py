@@ -0,0 +1,113 @@
+"""Memory of IR trees with slotted nodes and with a `__dict__` per node, through the whole `main.compile` pipeline.
+
+python benchmarks/ir_memory.py --tokens 4000 100000 1000000
+
+Each measurement runs in a process of its own, so its peak RSS is its own. "bytes/node" is what the parsed program
+retains (traced by `tracemalloc`) over the number of nodes in it. "traced" is the `tracemalloc` peak while
+`main.compile` compiles the program at -O0, and "peak RSS" the process's high-water mark after it; programs over
+`--compile-limit` tokens are only parsed, since the passes recurse once per binding. The `__dict__` representation
+loads the IR modules (`lactose` to `fructose`) as of the revision before their nodes were slotted, and the rest of the
+compiler on top of them.
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from programs import arithmetic_program, branchy_program  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+# In dependency order: each module imports the one before it.
+IR_MODULES = ["lactose", "maltose", "glucose", "sucrose", "fructose"]
+
+SOURCES = {
+    "arithmetic": arithmetic_program,
+    "branchy": lambda tokens: branchy_program(tokens // 20),
+}
+
+
+def install_dict_nodes() -> None:
+    """Load the IR modules as of the revision before `__slots__`, ahead of anything that imports them."""
+
+    def git(
+        *arguments: str,
+    ) -> str:
+        return subprocess.run(["git", *arguments], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+
+    revision = git("log", "-n", "1", "-S", "slots=True", "--format=%H", "--", "src/lactose.py").strip()
+    for name in IR_MODULES:
+        path = f"{revision}^:src/{name}.py"
+        module = types.ModuleType(name)
+        sys.modules[name] = module
+        exec(compile(git("show", path), path, "exec"), module.__dict__)
+
+
+def measure(
+    source: str,
+    compiled: bool,
+) -> dict[str, float | None]:
+    from main import compile
+    from parse import parse
+    from pass_manager import count_nodes
+
+    parse("(program (x) x)")  # build the parser before tracing anything
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    program = parse(source)
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    nodes = count_nodes(program)
+    del program
+    result: dict[str, float | None] = {"nodes": nodes, "bytes_per_node": retained / nodes, "traced_kib": None}
+    if compiled:
+        tracemalloc.start()
+        start = time.perf_counter()
+        compile(source)
+        result["seconds"] = time.perf_counter() - start
+        result["traced_kib"] = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+    result["peak_rss_kib"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, nargs="*", default=[4_000, 100_000, 1_000_000])
+    parser.add_argument("--compile-limit", type=int, default=5_000)
+    parser.add_argument("--child", nargs=3, metavar=("NODES", "PROGRAM", "TOKENS"), help=argparse.SUPPRESS)
+    options = parser.parse_args()
+
+    sys.setrecursionlimit(100_000)
+    if options.child:
+        representation, name, tokens = options.child
+        if representation == "dict":
+            install_dict_nodes()
+        print(json.dumps(measure(SOURCES[name](int(tokens)), int(tokens) <= options.compile_limit)))
+        sys.exit()
+
+    print(
+        f"{'program':<11} {'nodes':<6} {'tokens':>9} {'IR nodes':>9} {'bytes/node':>10} {'traced MiB':>10}"
+        f" {'peak RSS MiB':>12} {'s':>6}"
+    )
+    for tokens in options.tokens:
+        for name in SOURCES:
+            for representation in ["dict", "slots"]:
+                child = [sys.executable, __file__, "--child", representation, name, str(tokens)]
+                child += ["--compile-limit", str(options.compile_limit)]
+                result = json.loads(subprocess.run(child, capture_output=True, text=True, check=True).stdout)
+                traced, seconds = result["traced_kib"], result.get("seconds")
+                print(
+                    f"{name:<11} {representation:<6} {tokens:>9,} {result['nodes']:>9,} {result['bytes_per_node']:>10.1f}"
+                    f" {'-' if traced is None else f'{traced / 1024:.1f}':>10} {result['peak_rss_kib'] / 1024:>12.1f}"
+                    f" {'-' if seconds is None else f'{seconds:.2f}':>6}"
+                )
@@ -0,0 +1,53 @@
+"""Per-invocation latency of a compiled program: a fresh JIT per call versus a warm session.
+
+python benchmarks/jit_latency.py --sizes 100 1000 4000 --calls 1000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from execute import JitSession  # noqa: E402
+from main import compile_to_ir  # noqa: E402
+from programs import arithmetic_program  # noqa: E402
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="*", default=[100, 1_000, 4_000])
+    parser.add_argument("--calls", type=int, default=1_000)
+    parser.add_argument("--cold-calls", type=int, default=20)
+    options = parser.parse_args()
+
+    sys.setrecursionlimit(100_000)
+    print(f"{'program':<20} {'cold (us)':>10} {'main (us)':>10} {'entry (us)':>11} {'speedup':>8}")
+    for size in options.sizes:
+        llvm_ir = compile_to_ir(arithmetic_program(size))
+
+        # Cold: what execute() used to do for every call, a new target machine and engine each time.
+        start = time.perf_counter()
+        for i in range(options.cold_calls):
+            with JitSession() as session:
+                session.load(llvm_ir).main([str(i)])
+        cold = (time.perf_counter() - start) / options.cold_calls
+
+        with JitSession() as session:
+            program = session.load(llvm_ir)
+            start = time.perf_counter()
+            for i in range(options.calls):
+                program.main([str(i)])
+            warm_main = (time.perf_counter() - start) / options.calls
+
+            start = time.perf_counter()
+            for i in range(options.calls):
+                program(i)
+            warm_entry = (time.perf_counter() - start) / options.calls
+
+        print(
+            f"{f'arithmetic-{size}':<20} {cold * 1e6:>10.1f} {warm_main * 1e6:>10.1f} {warm_entry * 1e6:>11.1f}"
+            f" {cold / warm_entry:>8.0f}"
+        )
@@ -0,0 +1,53 @@
+"""Loop iterations per second for `while` loops compiled to native LLVM loops.
+
+python benchmarks/loop_throughput.py --iterations 1000000 10000000 100000000
+
+Each loop is also written as a tail-recursive `letrec` function, the self-calling closure form loops used to compile
+to.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from execute import JitSession  # noqa: E402
+from main import compile_to_ir  # noqa: E402
+from branch_allocations import static_counts  # noqa: E402
+
+PROGRAMS = {
+    "factorial": (
+        open(os.path.join(os.path.dirname(__file__), "..", "examples", "factorial.fru")).read(),
+        "(program (n) (letrec ((loop (lambda (n ans) (if (> n 0) (loop (- n 1) (* n ans)) ans)))) (loop n 1)))",
+    ),
+    "sum": (
+        "(program (n) (let ((i 0) (s 0)) (begin (while (< i n) (begin (set! s (+ s i)) (set! i (+ i 1)))) s)))",
+        "(program (n) (letrec ((loop (lambda (i s) (if (< i n) (loop (+ i 1) (+ s i)) s)))) (loop 0 0)))",
+    ),
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, nargs="*", default=[1_000_000, 10_000_000, 100_000_000])
+    parser.add_argument("-O", dest="optimization_level", type=int, default=0)
+    options = parser.parse_args()
+
+    print(f"{'program':<10} {'lowering':<9} {'functions':>9} {'sites':>8} {'iterations':>11} {'iterations/s':>14}")
+    for name, sources in PROGRAMS.items():
+        for lowering, source in zip(["loop", "recursion"], sources):
+            llvm_ir = compile_to_ir(source)
+            functions, sites = static_counts(llvm_ir)
+            with JitSession() as session:
+                program = session.load(llvm_ir, options.optimization_level)
+                for iterations in options.iterations:
+                    start = time.perf_counter()
+                    program(iterations)
+                    seconds = time.perf_counter() - start
+                    print(
+                        f"{name:<10} {lowering:<9} {functions:>9} {sites:>8} {iterations:>11}"
+                        f" {iterations / seconds:>14,.0f}"
+                    )
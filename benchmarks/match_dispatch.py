@@ -0,0 +1,93 @@
+"""Loops dispatching on `match`, with integer tests lowered to a switch and to a chain of branches.
+
+python benchmarks/match_dispatch.py --arms 4 16 64 256 --iterations 10000000 -O 0 2
+
+Each loop iteration matches `i mod arms` against one arm per residue; "nested" matches a tuple of two residues built
+for the match. The "branches" lowering is the same pipeline with `lower.SWITCH_CASES` out of reach, so every test
+is a compare and a conditional branch. `allocs` are the heap tuples a run allocates, which is none: tuples built to be
+matched are destructured as they are built.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import lower  # noqa: E402
+from execute import JitSession  # noqa: E402
+from main import compile_to_ir  # noqa: E402
+
+NESTED = """
+    (program (n)
+      (let ((i 0) (s 0))
+        (begin
+          (while (< i n)
+            (begin
+              (set! s (+ s (match (tuple (- i (* (/ i 4) 4)) (tuple (- i (* (/ i 3) 3)) i))
+                             ((tuple 0 (tuple 0 x)) x)
+                             ((tuple 0 (tuple y _)) y)
+                             ((tuple 1 (tuple _ x)) (- 0 x))
+                             ((tuple 2 (tuple 2 _)) 7)
+                             ((tuple a (tuple b _)) (* a b)))))
+              (set! i (+ i 1))))
+          s)))
+"""
+
+
+def integer_program(
+    arms: int,
+) -> str:
+    cases = " ".join(f"({k} {k * 7 + 1})" for k in range(arms))
+    return f"""
+        (program (n)
+          (let ((i 0) (s 0))
+            (begin
+              (while (< i n)
+                (begin
+                  (set! s (+ s (match (- i (* (/ i {arms}) {arms})) {cases} (_ 0))))
+                  (set! i (+ i 1))))
+              s)))
+    """
+
+
+def compile_with(
+    source: str,
+    switch: bool,
+) -> str:
+    cases = lower.SWITCH_CASES
+    lower.SWITCH_CASES = cases if switch else sys.maxsize
+    try:
+        return compile_to_ir(source)
+    finally:
+        lower.SWITCH_CASES = cases
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--arms", type=int, nargs="*", default=[4, 16, 64, 256])
+    parser.add_argument("--iterations", type=int, default=10_000_000)
+    parser.add_argument("-O", dest="optimization_levels", type=int, nargs="*", default=[0, 2])
+    options = parser.parse_args()
+
+    sys.setrecursionlimit(100_000)
+    programs = {f"int{arms}": integer_program(arms) for arms in options.arms}
+    programs["nested"] = NESTED
+    print(f"{'program':<8} {'lowering':<9} {'level':<6} {'switches':>8} {'allocs':>7} {'iterations/s':>14}")
+    for name, source in programs.items():
+        for lowering, switch in [("branches", False), ("switch", True)]:
+            llvm_ir = compile_with(source, switch)
+            with JitSession() as session:
+                for level in options.optimization_levels:
+                    program = session.load(llvm_ir, level)
+                    before = program.arena().allocations
+                    start = time.perf_counter()
+                    program(options.iterations)
+                    seconds = time.perf_counter() - start
+                    allocations = program.arena().allocations - before
+                    print(
+                        f"{name:<8} {lowering:<9} {f'-O{level}':<6} {llvm_ir.count('switch i64'):>8}"
+                        f" {allocations:>7,} {options.iterations / seconds:>14,.0f}"
+                    )
@@ -0,0 +1,77 @@
+"""Loops over `set!` variables, with their cells promoted to registers and kept in memory.
+
+python benchmarks/mutable_variables.py --iterations 10000000 100000000 -O 0 2
+
+The "memory" lowering is the same pipeline without the `promote` pass, so each mutable variable stays in a stack cell
+that every read loads and every `set!` stores. Static counts are the `alloca`, `load` and `store` instructions the
+lowered program body contains.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from execute import JitSession  # noqa: E402
+from parse import parse  # noqa: E402
+from pass_manager import PassManager, default_pipeline  # noqa: E402
+from util import SequentialNameGenerator  # noqa: E402
+
+PROGRAMS = {
+    "factorial": open(os.path.join(os.path.dirname(__file__), "..", "examples", "factorial.fru")).read(),
+    "sum": "(program (n) (let ((i 0) (s 0)) (begin (while (< i n) (begin (set! s (+ s i)) (set! i (+ i 1)))) s)))",
+    "branches": """
+        (program (n)
+          (let ((i 0) (even 0) (odd 0))
+            (begin
+              (while (< i n)
+                (begin
+                  (if (= (* (/ i 2) 2) i) (set! even (+ even i)) (set! odd (+ odd 1)))
+                  (set! i (+ i 1))))
+              (- even odd))))
+    """,
+}
+
+
+def compile_with(
+    source: str,
+    promote: bool,
+) -> str:
+    passes = [p for p in default_pipeline(SequentialNameGenerator()) if promote or p.name != "promote"]
+    return str(PassManager(passes).run(parse(source)))
+
+
+def static_counts(
+    llvm_ir: str,
+) -> tuple[int, int, int]:
+    body = llvm_ir[llvm_ir.index('@"_start"') :]
+    body = body[: body.index("\n}")]
+    return body.count(" alloca "), body.count(" load "), body.count("store ")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, nargs="*", default=[10_000_000, 100_000_000])
+    parser.add_argument("-O", dest="optimization_levels", type=int, nargs="*", default=[0, 2])
+    options = parser.parse_args()
+
+    header = f"{'program':<10} {'lowering':<9} {'level':<6} {'allocas':>7} {'loads':>6} {'stores':>6}"
+    print(f"{header} {'iterations':>11} {'iterations/s':>14}")
+    for name, source in PROGRAMS.items():
+        for lowering, promote in [("memory", False), ("registers", True)]:
+            llvm_ir = compile_with(source, promote)
+            allocas, loads, stores = static_counts(llvm_ir)
+            with JitSession() as session:
+                for level in options.optimization_levels:
+                    program = session.load(llvm_ir, level)
+                    for iterations in options.iterations:
+                        start = time.perf_counter()
+                        program(iterations)
+                        seconds = time.perf_counter() - start
+                        print(
+                            f"{name:<10} {lowering:<9} {f'-O{level}':<6} {allocas:>7} {loads:>6} {stores:>6}"
+                            f" {iterations:>11} {iterations / seconds:>14,.0f}"
+                        )
@@ -0,0 +1,51 @@
+"""Compile time and run time of the same programs at each LLVM optimization level.
+
+python benchmarks/optimization_levels.py --sizes 100 1000 4000 --rows 1000000
+"""
+
+import argparse
+import array
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from execute import JitSession  # noqa: E402
+from main import compile_to_ir  # noqa: E402
+from optimize import OPTIMIZATION_LEVELS  # noqa: E402
+from programs import arithmetic_program  # noqa: E402
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="*", default=[100, 1_000, 4_000])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    options = parser.parse_args()
+
+    sys.setrecursionlimit(100_000)
+    inputs = array.array("q", range(options.rows))
+    out = array.array("q", bytes(8 * options.rows))
+    compile_to_ir(arithmetic_program(10))  # build the parser before timing anything
+
+    print(f"{'program':<20} {'level':>5} {'compile (ms)':>13} {'jit (ms)':>9} {'ns/row':>8}")
+    for size in options.sizes:
+        source = arithmetic_program(size)
+        for level in OPTIMIZATION_LEVELS:
+            start = time.perf_counter()
+            llvm_ir = compile_to_ir(source, optimization_level=level)
+            compiled = time.perf_counter() - start
+
+            with JitSession() as session:
+                start = time.perf_counter()
+                program = session.load(llvm_ir)
+                jitted = time.perf_counter() - start
+
+                start = time.perf_counter()
+                program.batch(inputs, out)
+                run = (time.perf_counter() - start) / options.rows
+
+            print(
+                f"{f'arithmetic-{size}':<20} {level:>5} {compiled * 1000:>13.1f} {jitted * 1000:>9.1f} {run * 1e9:>8.2f}"
+            )
@@ -0,0 +1,76 @@
+"""Parse throughput and peak memory for each front end.
+
+Compares a fresh Earley parser per call (the old behaviour), the cached LALR parser, and the hand-written
+reader (`engine="fast"`).
+
+python benchmarks/parse_throughput.py --sizes 1000 10000 100000 1000000
+"""
+
+import argparse
+from collections.abc import Callable
+from functools import partial
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from lark import Lark  # noqa: E402
+from parse import AstTransformer, parse, __location__  # noqa: E402
+from programs import arithmetic_program  # noqa: E402
+
+
+def parse_uncached_earley(
+    source: str,
+) -> object:
+    parser = Lark.open(os.path.join(__location__, "./fructose.lark"), start="program")
+    return AstTransformer().transform(parser.parse(source))  # type: ignore
+
+
+def timed(
+    f: Callable[[str], object],
+    source: str,
+) -> float:
+    start = time.perf_counter()
+    f(source)
+    return time.perf_counter() - start
+
+
+def peak_memory(
+    f: Callable[[str], object],
+    source: str,
+) -> int:
+    tracemalloc.start()
+    try:
+        f(source)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="*", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--max-earley", type=int, default=100_000, help="skip the Earley baseline above this size")
+    parser.add_argument("--memory", action="store_true", help="also report tracemalloc peaks (slow)")
+    options = parser.parse_args()
+
+    sys.setrecursionlimit(1_000_000)
+    lalr = partial(parse, engine="lalr")
+    fast = partial(parse, engine="fast")
+    lalr("(program () 0)")  # build the cached parser outside the timed region
+
+    print(f"{'tokens':>10} {'earley (s)':>12} {'lalr (s)':>10} {'fast (s)':>10} {'fast tok/s':>12}", end="")
+    print(f" {'lalr MiB':>10} {'fast MiB':>10}" if options.memory else "")
+    for size in options.sizes:
+        source = arithmetic_program(size)
+        earley = timed(parse_uncached_earley, source) if size <= options.max_earley else float("nan")
+        t_lalr = timed(lalr, source)
+        t_fast = timed(fast, source)
+        print(f"{size:>10} {earley:>12.4f} {t_lalr:>10.4f} {t_fast:>10.4f} {size / t_fast:>12.0f}", end="")
+        if options.memory:
+            print(f" {peak_memory(lalr, source) / 2**20:>10.1f} {peak_memory(fast, source) / 2**20:>10.1f}")
+        else:
+            print()
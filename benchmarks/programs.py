@@ -0,0 +1,65 @@
+"""Generators for synthetic Fructose programs used by the benchmarks."""
+
+
+def arithmetic_program(
+    tokens: int,
+) -> str:
+    """A single-parameter program of roughly `tokens` tokens: a flat `let*` chain of arithmetic bindings."""
+    operators = ["+", "-", "*"]
+    bindings: list[str] = []
+    count = 11  # (program (x) (let* ( ... ) (+ x a_n)))
+    i = 0
+    while count < tokens:
+        previous = f"a{i - 1}" if i else "x"
+        bindings.append(f"(a{i} ({operators[i % len(operators)]} {previous} {i % 7 + 1}))")
+        count += 8
+        i += 1
+    last = f"a{i - 1}" if i else "x"
+    return f"(program (x) (let* ({' '.join(bindings)}) (+ x {last})))"
+
+
+def branchy_program(
+    branches: int,
+    join_closures: bool = False,
+) -> str:
+    """A single-parameter program with `branches` conditionals in sequence, each feeding the next.
+
+    With `join_closures`, each conditional passes its result to an explicit `(lambda (a_i) ...)` for the rest of the
+    program instead of binding it with `let*`.
+    """
+    conditionals: list[tuple[str, str, str]] = []
+    for i in range(branches):
+        previous = f"a{i - 1}" if i else "x"
+        conditionals.append((f"(< {previous} {i * 3})", f"(+ {previous} {i % 7 + 1})", f"(- {previous} {i % 5 + 1})"))
+    last = f"a{branches - 1}" if branches else "x"
+    if join_closures:
+        body = last
+        for i, (condition, consequent, alternative) in reversed(list(enumerate(conditionals))):
+            body = f"(let ((k{i} (lambda (a{i}) {body}))) (if {condition} (k{i} {consequent}) (k{i} {alternative})))"
+        return f"(program (x) {body})"
+    bindings = [f"(a{i} (if {c} {a} {b}))" for i, (c, a, b) in enumerate(conditionals)]
+    return f"(program (x) (let* ({' '.join(bindings)}) {last}))"
+
+
+def folding_program(
+    tokens: int,
+) -> str:
+    """A single-parameter program of roughly `tokens` tokens: one balanced arithmetic expression over `x` and constants.
+
+    Most of it folds away or reassociates: two leaves in three are constants, and the operators cycle through `+`, `*`
+    and `-` by depth.
+    """
+    operators = ["+", "*", "-"]
+    leaves = iter(range(tokens))
+
+    def expression(
+        size: int,
+        depth: int,
+    ) -> str:
+        if size <= 1:
+            i = next(leaves)
+            return "x" if i % 3 == 0 else str(i % 7 + 1)
+        half = size // 2
+        return f"({operators[depth % 3]} {expression(half, depth + 1)} {expression(size - half, depth + 1)})"
+
+    return f"(program (x) {expression(max(tokens // 4, 1), 0)})"
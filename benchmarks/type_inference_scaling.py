@@ -0,0 +1,94 @@
+"""Type inference time per node on programs of growing size, with union-find variables and with substitution dicts.
+
+python benchmarks/type_inference_scaling.py --sizes 1000 10000 100000
+
+"let*" is one `let*` binding each name from the one before; "nested" is the same chain as one `let` inside another,
+so every binding opens a scope; "letrec" is one group of functions each calling the next (and the last the first), used
+once after it. The substitution-dict version is loaded from the last revision that had it, and only run up to
+`--dict-limit` bindings: it copies the whole environment at every `let`.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+import types
+from collections.abc import Callable
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from fructose import Program, Expression, Int, Var, Add, Subtract, LessThan, If, Let, LetStar, LetRec  # noqa: E402
+from fructose import Lambda, Apply  # noqa: E402
+from pass_manager import count_nodes  # noqa: E402
+from type_inference import infer_types  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def substitution_dicts() -> Callable[[Program], object]:
+    """`infer_types` as of the revision before `free_type_vars_env` was removed."""
+
+    def git(
+        *arguments: str,
+    ) -> str:
+        return subprocess.run(["git", *arguments], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+
+    revision = git("log", "-n", "1", "-S", "free_type_vars_env", "--format=%H", "--", "src/type_inference.py")
+    path = f"{revision.strip()}^:src/type_inference.py"
+    module = types.ModuleType("baseline_type_inference")
+    exec(compile(git("show", path), path, "exec"), module.__dict__)
+    return module.infer_types
+
+
+def let_star(
+    size: int,
+) -> Expression:
+    bindings = [("x0", Var("n"))] + [(f"x{i + 1}", Add([Var(f"x{i}"), Int(1)])) for i in range(size)]
+    return LetStar(bindings, Var(f"x{size}"))
+
+
+def nested(
+    size: int,
+) -> Expression:
+    body: Expression = Var(f"x{size}")
+    for i in reversed(range(size)):
+        body = Let([(f"x{i + 1}", Add([Var(f"x{i}"), Int(1)]))], body)
+    return Let([("x0", Var("n"))], body)
+
+
+def letrec(
+    size: int,
+) -> Expression:
+    def function(
+        i: int,
+    ) -> Expression:
+        call = Apply(Var(f"f{(i + 1) % size}"), [Subtract([Var("x"), Int(1)])])
+        return Lambda(["x"], If(LessThan([Var("x"), Int(0)]), Var("x"), call))
+
+    return LetRec([(f"f{i}", function(i)) for i in range(size)], Apply(Var("f0"), [Var("n")]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="*", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--dict-limit", type=int, default=10_000)
+    options = parser.parse_args()
+
+    sys.setrecursionlimit(10_000_000)
+    versions = {"union-find": infer_types, "dicts": substitution_dicts()}
+    print(f"{'shape':<7} {'solver':<10} {'bindings':>9} {'nodes':>9} {'ms':>10} {'ns/node':>8}")
+    for size in options.sizes:
+        for shape, generate in [("let*", let_star), ("nested", nested), ("letrec", letrec)]:
+            program = Program(["n"], generate(size))
+            nodes = count_nodes(program)
+            for solver, version in versions.items():
+                if solver == "dicts" and size > options.dict_limit:
+                    continue
+                start = time.perf_counter()
+                version(program)
+                seconds = time.perf_counter() - start
+                print(
+                    f"{shape:<7} {solver:<10} {size:>9,} {nodes:>9,} {seconds * 1e3:>10.2f}"
+                    f" {seconds / nodes * 1e9:>8,.0f}"
+                )
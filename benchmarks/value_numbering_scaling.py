@@ -0,0 +1,97 @@
+"""Value numbering time per node on expressions of growing size, with interned keys and with string keys.
+
+python benchmarks/value_numbering_scaling.py --nodes 1000 10000 100000
+
+"chain" is one deep expression, each level combining the one below with a constant and a parameter; "balanced" is a
+balanced tree over the parameters and a few constants, so most of its subtrees repeat. The string-keyed version is
+loaded from the last revision that had it, and only run up to `--string-limit` nodes: it rebuilds the key of a whole
+subtree at every node, so its time per node grows with the depth of the expression.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+import types
+from collections.abc import Callable
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from glucose import Program, Expression, Int, Var, Add, Multiply  # noqa: E402
+from pass_manager import count_nodes  # noqa: E402
+from util import SequentialNameGenerator  # noqa: E402
+from value_numbering import value_numbering  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def string_keyed() -> Callable[[Program], Program]:
+    """`value_numbering` as of the revision before `_hash_expr` was removed."""
+
+    def git(
+        *arguments: str,
+    ) -> str:
+        return subprocess.run(["git", *arguments], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+
+    revision = git("log", "-n", "1", "-S", "_hash_expr", "--format=%H", "--", "src/value_numbering.py").strip() + "^"
+    path = f"{revision}:src/value_numbering.py"
+    module = types.ModuleType("baseline_value_numbering")
+    exec(compile(git("show", path), path, "exec"), module.__dict__)
+    return module.value_numbering
+
+
+def chain(
+    nodes: int,
+) -> Expression:
+    expression: Expression = Var("x")
+    for i in range(nodes // 4):
+        expression = Add(Multiply(expression, Int(i % 7 + 1)), Var("y"))
+    return expression
+
+
+def balanced(
+    nodes: int,
+) -> Expression:
+    operators = [Add, Multiply]
+    leaves = [Var("x"), Var("y"), Int(2), Int(3)]
+
+    def tree(
+        size: int,
+        depth: int,
+        offset: int,
+    ) -> Expression:
+        if size <= 1:
+            return leaves[offset % len(leaves)]
+        half = size // 2
+        return operators[depth % 2](tree(half, depth + 1, offset), tree(size - half, depth + 1, offset + half))
+
+    return tree(nodes // 2, 0, 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, nargs="*", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--string-limit", type=int, default=3_000)
+    options = parser.parse_args()
+
+    sys.setrecursionlimit(1_000_000)
+    versions = {
+        "interned": lambda program: value_numbering(program, SequentialNameGenerator()),
+        "strings": string_keyed(),
+    }
+    print(f"{'shape':<9} {'keys':<9} {'nodes':>8} {'output':>8} {'ms':>10} {'ns/node':>8}")
+    for nodes in options.nodes:
+        for shape, generate in [("chain", chain), ("balanced", balanced)]:
+            program = Program(["x", "y"], generate(nodes))
+            size = count_nodes(program.body)
+            for keys, version in versions.items():
+                if keys == "strings" and size > options.string_limit:
+                    continue
+                start = time.perf_counter()
+                result = version(program)
+                seconds = time.perf_counter() - start
+                print(
+                    f"{shape:<9} {keys:<9} {size:>8,} {count_nodes(result.body):>8,} {seconds * 1e3:>10.2f}"
+                    f" {seconds / size * 1e9:>8,.0f}"
+                )
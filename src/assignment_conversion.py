@@ -20,6 +20,7 @@ from sucrose import (
     Do,
     Lambda,
     Apply,
+    While,
     Assign,
 )
 import glucose
@@ -103,6 +104,9 @@ def convert_assignments_expression(
         case Apply(callee, arguments):
             return Apply(recur(callee), [recur(e) for e in arguments])
 
+        case While(condition, body):
+            return While(recur(condition), recur(body))
+
         case Assign(name, value):  # pragma: no branch
             return Set(Var(name), Int(0), recur(value))
 
@@ -119,8 +123,8 @@ def _wrap_vars(
     vars: set[str],
     expr: glucose.Expression,
 ) -> glucose.Expression:
-    for v in vars:
-        return Let(v, Tuple([Var(v)]), expr)
+    for v in sorted(vars):
+        expr = Let(v, Tuple([Var(v)]), expr)
     return expr
 
 
@@ -180,5 +184,8 @@ def mutable_free_variables(
         case Apply(callee, arguments):
             return recur(callee) | {mv for e in arguments for mv in recur(e)}
 
+        case While(condition, body):
+            return recur(condition) | recur(body)
+
         case Assign(name, value):  # pragma: no branch
             return recur(value) | {name}
@@ -1,4 +1,6 @@
-from collections.abc import Callable
+from collections import defaultdict
+from collections.abc import Callable, Mapping, Sequence
+from dataclasses import dataclass, field
 from functools import partial
 from maltose import (
     Program,
@@ -20,41 +22,70 @@ from maltose import (
     Set,
     Lambda,
     Copy,
+    Call,
     Statement,
     Let,
     If,
     Apply,
     Halt,
+    Join,
+    Jump,
+    Loop,
 )
 
 
+@dataclass(frozen=True)
+class KnownFunctions:
+    """What `close` knows statically about a program's lambdas, each named by the variable it is bound to.
+
+    `closures` maps every variable known to hold a lambda's closure to the lambda: the variable the lambda is bound
+    to, its `Copy` aliases, and the reads of a `letrec` cell that is only ever set to it. `codes` names the variable
+    each lambda called through one of those is given for its code. Lambdas in `lifted` never escape, so they get no
+    closure at all: their free variables are passed to them as extra arguments, in this order, ahead of their own.
+    """
+
+    closures: Mapping[str, str] = field(default_factory=dict)
+    codes: Mapping[str, str] = field(default_factory=dict)
+    lifted: Mapping[str, Sequence[str]] = field(default_factory=dict)
+
+
 def close(
     program: Program,
     fresh: Callable[[str], str],
 ) -> Program:
+    """Closure-convert every lambda, calling the ones known at a call site directly (see `known_functions`)."""
     return Program(
         program.parameters,
-        close_statement(program.body, fresh),
+        close_statement(program.body, fresh, known_functions(program, fresh)),
     )
 
 
 def close_statement(
     statement: Statement,
     fresh: Callable[[str], str],
+    known: KnownFunctions = KnownFunctions(),
 ) -> Statement:
-    stmt = partial(close_statement, fresh=fresh)
+    stmt = partial(close_statement, fresh=fresh, known=known)
     match statement:
         case Let(name, value, next):
             match value:
+                # A lifted lambda is bound to its code alone.
+                case Lambda(parameters, body) if name in known.lifted:
+                    return Let(
+                        known.codes[name],
+                        Lambda([*known.lifted[name], *parameters], stmt(body)),
+                        stmt(next),
+                    )
+
                 case Lambda(parameters, body):
-                    fvs = list(free_variables_expression(value))
                     env = fresh("t")
 
                     body: Statement = stmt(body)
+                    fvs = sorted(free_variables_statement(body) - set(parameters) - set(known.codes.values()))
                     for i, v in enumerate(fvs):
                         body = Let(v, Get(Var(env), Int(i + 1)), body)
 
-                    code = fresh("t")
+                    code = known.codes.get(name) or fresh("t")
                     return Let(
                         code,
                         Lambda([env, *parameters], body),
@@ -65,31 +96,326 @@ def close_statement(
                         ),
                     )
 
+                # Aliases of a lifted lambda have no closure to alias, and the cell that would hold it stays empty.
+                case Copy() | Get() if known.closures.get(name) in known.lifted:
+                    return stmt(next)
+
+                case Set(_, _, Var(v)) if known.closures.get(v) in known.lifted:
+                    return Let(name, Copy(Unit()), stmt(next))
+
+                case Call(Var(callee), arguments) if callee in known.closures:
+                    code, arguments = direct_call(callee, arguments, known)
+                    return Let(name, Call(code, arguments), stmt(next))
+
+                # A closure is called through the code pointer in its slot 0, with the closure itself as the
+                # environment argument.
+                case Call(callee, arguments):
+                    code = fresh("t")
+                    return Let(code, Get(callee, Int(0)), Let(name, Call(Var(code), [callee, *arguments]), stmt(next)))
+
                 case value:  # pragma: no branch
                     return Let(name, value, stmt(next))
 
         case If(condition, then, otherwise):
             return If(condition, stmt(then), stmt(otherwise))
 
+        case Apply(Var(callee), arguments) if callee in known.closures:
+            return Apply(*direct_call(callee, arguments, known))
+
         case Apply(callee, arguments):
-            if not arguments:
-                t = fresh("t")
-                return Let(t, Get(callee, Int(0)), Apply(Var(t), [callee]))
-            else:
-                k = fresh("k")
-                return Let(
-                    k,
-                    Lambda(["_t0"], Halt(Var("_t0"))),
-                    Apply(close_atom(callee, fresh), [close_atom(arg, fresh) for arg in arguments] + [Var(k)]),
-                )
-
-        case Halt(value):  # pragma: no branch
+            code = fresh("t")
+            return Let(code, Get(callee, Int(0)), Apply(Var(code), [callee, *arguments]))
+
+        case Halt(value):
             return Halt(close_atom(value, fresh))
 
+        # Join points stay in the function that binds them, so their free variables are already in scope.
+        case Join(name, parameters, body, next):
+            return Join(name, parameters, stmt(body), stmt(next))
+
+        case Jump(target, arguments):
+            return Jump(target, [close_atom(argument, fresh) for argument in arguments])
+
+        case Loop(name, parameters, arguments, body):  # pragma: no branch
+            return Loop(name, parameters, [close_atom(argument, fresh) for argument in arguments], stmt(body))
+
         case _:
             raise NotImplementedError(f"close_statement: Unhandled statement: {statement}")
 
 
+def direct_call(
+    callee: str,
+    arguments: Sequence[Atom],
+    known: KnownFunctions,
+) -> tuple[Var, list[Atom]]:
+    """Call a known lambda's code directly: with its free variables if it is lifted, otherwise with its closure."""
+    function = known.closures[callee]
+    leading = [Var(v) for v in known.lifted[function]] if function in known.lifted else [Var(callee)]
+    return Var(known.codes[function]), [*leading, *arguments]
+
+
+def known_functions(
+    program: Program,
+    fresh: Callable[[str], str],
+) -> KnownFunctions:
+    """Find the lambdas each call site is known to call, and the ones that can be lambda-lifted.
+
+    Names must be unique, as `uniqify` leaves them. A lambda escapes when a variable holding its closure is used other
+    than as a callee, the source of a `Copy`, or the value of its `letrec` cell. One that does not is lifted, unless
+    a call to it is out of the scope of one of its free variables (which only a `letrec` cell read before the lambda
+    is bound can be); the rest are still called directly when known, just with their closure.
+    """
+    lambdas: dict[str, Lambda[Statement]] = {}
+    definitions: dict[str, Expression] = {}
+    uses: defaultdict[str, list[str]] = defaultdict(list)  # "call", "copy", "read", "write", "store" or "other"
+    stores: defaultdict[str, list[str]] = defaultdict(list)  # the tuples each variable is stored in
+
+    def use(
+        atoms: Sequence[Atom],
+        kind: str = "other",
+    ) -> None:
+        for atom in atoms:
+            if isinstance(atom, Var):
+                uses[atom.name].append(kind)
+
+    def walk(
+        statement: Statement,
+    ) -> None:
+        match statement:
+            case Let(name, value, next):
+                definitions[name] = value
+                match value:
+                    case Lambda(_, body):
+                        lambdas[name] = value
+                        walk(body)
+                    case Copy(Var() as source):
+                        use([source], "copy")
+                    case Get(Var() as base, Int(0)):
+                        use([base], "read")
+                    case Set(Var() as base, Int(0), stored):
+                        use([base], "write")
+                        use([stored], "store")
+                        if isinstance(stored, Var):
+                            stores[stored.name].append(base.name)
+                    case Call(callee, arguments):
+                        use([callee], "call")
+                        use(arguments)
+                    case _:
+                        use([Var(v) for v in sorted(free_variables_expression(value))])
+                walk(next)
+
+            case If(condition, then, otherwise):
+                use([condition])
+                walk(then)
+                walk(otherwise)
+
+            case Apply(callee, arguments):
+                use([callee], "call")
+                use(arguments)
+
+            case Halt(value):
+                use([value])
+
+            case Join(_, _, body, next):
+                walk(body)
+                walk(next)
+
+            case Jump(_, arguments):
+                use(arguments)
+
+            case Loop(_, _, arguments, body):  # pragma: no branch
+                use(arguments)
+                walk(body)
+
+    walk(program.body)
+
+    def root(
+        name: str,
+    ) -> str:
+        while isinstance(value := definitions.get(name), Copy) and isinstance(value.value, Var):
+            name = value.value.name
+        return name
+
+    # A `letrec` cell starts out holding unit, and it and its aliases are only ever read, copied, and written once.
+    written: defaultdict[str, list[Atom]] = defaultdict(list)
+    for value in definitions.values():
+        if isinstance(value, Set) and isinstance(value.tuple, Var):
+            written[root(value.tuple.name)].append(value.value)
+    cells = {
+        name: written[name][0]
+        for name, value in definitions.items()
+        if isinstance(value, Tuple) and list(value.components) == [Unit()] and len(written[name]) == 1
+    }
+    for name, kinds in uses.items():
+        if not set(kinds) <= {"copy", "read", "write"}:
+            cells.pop(root(name), None)
+
+    def function(
+        name: str,
+        seen: frozenset[str] = frozenset(),
+    ) -> str | None:
+        match definitions.get(name):
+            case Lambda():
+                return name
+            case Copy(Var(source)) if source not in seen:
+                return function(source, seen | {name})
+            case Get(Var(base), Int(0)) if isinstance(stored := cells.get(root(base)), Var) and stored.name not in seen:
+                return function(stored.name, seen | {name})
+            case _:
+                return None
+
+    closures = {name: f for name in definitions if (f := function(name)) is not None}
+    escaping = {
+        closures[name]
+        for name, kinds in uses.items()
+        if name in closures
+        if not set(kinds) <= {"call", "copy", "store"} or any(root(cell) not in cells for cell in stores[name])
+    }
+    called = {closures[name] for name, kinds in uses.items() if name in closures and "call" in kinds}
+
+    lifted = {f for f in lambdas if f not in escaping}
+    while misplaced := _misplaced_calls(
+        program.body, set(program.parameters), closures, extra := _extra_parameters(program.body, closures, lifted)
+    ):
+        lifted -= misplaced
+    return KnownFunctions(closures, {f: fresh("t") for f in lambdas if f in called or f in extra}, extra)
+
+
+def _extra_parameters(
+    statement: Statement,
+    closures: Mapping[str, str],
+    lifted: set[str],
+) -> dict[str, list[str]]:
+    """The variables each lifted lambda must be passed: those its body refers to but does not bind, once its calls to
+    lifted lambdas pass theirs (a least fixed point, as lambdas can call each other)."""
+    references: defaultdict[str, set[str]] = defaultdict(set)
+    bound: defaultdict[str, set[str]] = defaultdict(set)
+    calls: defaultdict[str, set[str]] = defaultdict(set)
+
+    def walk(
+        statement: Statement,
+        enclosing: Sequence[str],
+    ) -> None:
+        def refer(
+            names: set[str],
+        ) -> None:
+            for f in enclosing:
+                references[f] |= names
+
+        def bind(
+            names: Sequence[str],
+            *lambdas: str,
+        ) -> None:
+            for f in [*enclosing, *lambdas]:
+                bound[f].update(names)
+
+        def call(
+            callee: Atom,
+            arguments: Sequence[Atom],
+        ) -> None:
+            refer({v for argument in arguments for v in free_variables_atom(argument)})
+            if isinstance(callee, Var) and closures.get(callee.name) in lifted:
+                for f in enclosing:
+                    calls[f].add(closures[callee.name])
+            else:
+                refer(free_variables_atom(callee))
+
+        match statement:
+            case Let(name, value, next):
+                match value:
+                    case Lambda(parameters, body):
+                        bind(parameters, name)
+                        walk(body, [*enclosing, name])
+                    case Copy() | Get() if closures.get(name) in lifted:
+                        pass
+                    case Set(_, _, Var(v)) if closures.get(v) in lifted:
+                        pass
+                    case Call(callee, arguments):
+                        call(callee, arguments)
+                    case _:
+                        refer(free_variables_expression(value))
+                bind([name])
+                walk(next, enclosing)
+
+            case If(condition, then, otherwise):
+                refer(free_variables_atom(condition))
+                walk(then, enclosing)
+                walk(otherwise, enclosing)
+
+            case Apply(callee, arguments):
+                call(callee, arguments)
+
+            case Halt(value):
+                refer(free_variables_atom(value))
+
+            case Join(_, parameters, body, next):
+                bind(parameters)
+                walk(body, enclosing)
+                walk(next, enclosing)
+
+            case Jump(_, arguments):
+                refer({v for argument in arguments for v in free_variables_atom(argument)})
+
+            case Loop(_, parameters, arguments, body):  # pragma: no branch
+                refer({v for argument in arguments for v in free_variables_atom(argument)})
+                bind(parameters)
+                walk(body, enclosing)
+
+    walk(statement, [])
+
+    extra: dict[str, set[str]] = {f: set() for f in lifted}
+    changed = True
+    while changed:
+        changed = False
+        for f in lifted:
+            needed = (references[f] | {v for g in calls[f] for v in extra[g]}) - bound[f]
+            if needed != extra[f]:
+                extra[f], changed = needed, True
+    return {f: sorted(extra[f]) for f in lifted}
+
+
+def _misplaced_calls(
+    statement: Statement,
+    scope: set[str],
+    closures: Mapping[str, str],
+    extra: Mapping[str, Sequence[str]],
+) -> set[str]:
+    """The lifted lambdas called somewhere one of the variables they must be passed is not in scope."""
+    recur = partial(_misplaced_calls, closures=closures, extra=extra)
+
+    def check(
+        callee: Atom,
+    ) -> set[str]:
+        if isinstance(callee, Var) and (f := closures.get(callee.name)) in extra and not set(extra[f]) <= scope:
+            return {f}
+        return set()
+
+    match statement:
+        case Let(name, Lambda(parameters, body), next):
+            return recur(body, scope | set(parameters)) | recur(next, scope | {name})
+
+        case Let(name, Call(callee, _), next):
+            return check(callee) | recur(next, scope | {name})
+
+        case Let(name, _, next):
+            return recur(next, scope | {name})
+
+        case If(_, then, otherwise):
+            return recur(then, scope) | recur(otherwise, scope)
+
+        case Apply(callee, _):
+            return check(callee)
+
+        case Join(_, parameters, body, next):
+            return recur(body, scope | set(parameters)) | recur(next, scope)
+
+        case Loop(_, parameters, _, body):
+            return recur(body, scope | set(parameters))
+
+        case _:
+            return set()
+
+
 def close_expression(
     expression: Expression | Atom,
     fresh: Callable[[str], str],
@@ -129,6 +455,8 @@ def close_expression(
 
         case Copy(expr):
             return Copy(close_atom(expr, fresh))
+        case Call(callee, arguments):
+            return Call(close_atom(callee, fresh), [close_atom(argument, fresh) for argument in arguments])
         case expr:
             return expr
 
@@ -166,9 +494,18 @@ def free_variables_statement(
         case Apply(callee, arguments):
             return atom_fv(callee) | {fv for argument in arguments for fv in atom_fv(argument)}
 
-        case Halt(value):  # pragma: no branch
+        case Halt(value):
             return atom_fv(value)
 
+        case Join(_, parameters, body, next):
+            return (recur(body) - set(parameters)) | recur(next)
+
+        case Jump(_, arguments):
+            return {fv for argument in arguments for fv in atom_fv(argument)}
+
+        case Loop(_, parameters, arguments, body):  # pragma: no branch
+            return {fv for argument in arguments for fv in atom_fv(argument)} | (recur(body) - set(parameters))
+
 
 def free_variables_expression(
     expression: Expression | Atom,
@@ -200,9 +537,12 @@ def free_variables_expression(
         case Lambda(parameters, body):
             return stmt_fv(body) - set(parameters)
 
-        case Copy(value):  # pragma: no branch
+        case Copy(value):
             return atom_fv(value)
 
+        case Call(callee, arguments):  # pragma: no branch
+            return atom_fv(callee) | {fv for argument in arguments for fv in atom_fv(argument)}
+
         case Int() | Bool() | Unit():
             return set()
 
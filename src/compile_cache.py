@@ -0,0 +1,105 @@
+from collections.abc import Mapping
+from functools import cache
+import hashlib
+import json
+import os
+import tempfile
+
+__location__ = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
+
+
+@cache
+def compiler_version() -> str:
+    """A digest of the compiler's own sources, so that any change to the compiler invalidates cached output."""
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(__location__)):
+        if name.endswith((".py", ".lark")):
+            digest.update(name.encode())
+            with open(os.path.join(__location__, name), "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+class CompileCache:
+    """A content-addressed store of compiler output on disk, bounded in size by evicting least recently used files.
+
+    Entries are keyed by a hash of the source text, the compiler version and the pipeline options; each key can
+    hold several artifacts (e.g. "ll" for LLVM IR, "o" for a native object), stored as `<key>.<kind>`.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = 256 * 2**20,
+    ) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(
+        self,
+        source: str,
+        options: Mapping[str, object] | None = None,
+    ) -> str:
+        digest = hashlib.sha256()
+        digest.update(compiler_version().encode())
+        digest.update(json.dumps(options or {}, sort_keys=True).encode())
+        digest.update(source.encode())
+        return digest.hexdigest()
+
+    def get(
+        self,
+        key: str,
+        kind: str = "ll",
+    ) -> bytes | None:
+        path = self._path(key, kind)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        os.utime(path)  # mark as recently used
+        self.hits += 1
+        return data
+
+    def put(
+        self,
+        key: str,
+        data: bytes,
+        kind: str = "ll",
+    ) -> None:
+        # Write to a temporary file and rename it into place, so concurrent readers never see partial output.
+        fd, temporary = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temporary, self._path(key, kind))
+        self._evict()
+
+    def _path(
+        self,
+        key: str,
+        kind: str,
+    ) -> str:
+        return os.path.join(self.directory, f"{key}.{kind}")
+
+    def _evict(
+        self,
+    ) -> None:
+        entries: list[tuple[float, int, str]] = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.startswith(".tmp-"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:  # pragma: no cover
+                pass  # evicted concurrently by another process
+            total -= size
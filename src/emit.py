@@ -0,0 +1,79 @@
+# type: ignore
+from typing import Literal
+import os
+import subprocess
+import tempfile
+from llvmlite import binding
+
+binding.initialize()
+binding.initialize_native_target()
+binding.initialize_native_asmprinter()
+
+type Kind = Literal["ll", "asm", "bc", "obj", "exe", "so"]
+KINDS: tuple[Kind, ...] = ("ll", "asm", "bc", "obj", "exe", "so")
+
+
+class LinkError(Exception):
+    pass
+
+
+def emit(
+    llvm_ir: str,
+    kind: Literal["ll", "asm", "bc", "obj"],
+    optimization_level: int = 0,
+) -> bytes:
+    """Translate textual LLVM IR into an artifact for the host target, ahead of time.
+
+    The IR is optimized by the pipeline already (`compile -O`); `optimization_level` selects the code generator's.
+    """
+    machine = _target_machine(optimization_level)
+    module = binding.parse_assembly(llvm_ir)
+    module.verify()
+    # The C runtime's crt1.o defines the process entry point `_start`, so ours must not be visible to the linker.
+    module.get_function("_start").linkage = binding.Linkage.internal
+    module.triple = machine.triple
+    module.data_layout = str(machine.target_data)
+
+    match kind:
+        case "ll":
+            return str(module).encode()
+        case "asm":
+            return machine.emit_assembly(module).encode()
+        case "bc":
+            return module.as_bitcode()
+        case "obj":
+            return machine.emit_object(module)
+
+
+def link(
+    llvm_ir: str,
+    output: str,
+    shared: bool = False,
+    optimization_level: int = 0,
+) -> None:
+    """Build a standalone executable (or, when `shared`, a shared library) from textual LLVM IR.
+
+    The object code is linked by the system C compiler (`$CC`, default `cc`), which supplies `malloc` and `atoi` from
+    the C library. An executable's exit status is the program's result; a shared library exports `main`, `_entry` and
+    `_batch`.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "program.o")
+        with open(path, "wb") as f:
+            f.write(emit(llvm_ir, "obj", optimization_level))
+
+        command = [os.environ.get("CC", "cc"), *(["-shared"] if shared else []), path, "-o", output]
+        try:
+            result = subprocess.run(command, capture_output=True, text=True)
+        except FileNotFoundError as e:
+            raise LinkError(f"no C compiler found to link with: {command[0]}") from e
+        if result.returncode != 0:
+            raise LinkError(f"{' '.join(command)} failed:\n{result.stderr}")
+
+
+def _target_machine(
+    optimization_level: int,
+) -> binding.TargetMachine:
+    # Position-independent code links into both PIE executables and shared libraries.
+    target = binding.Target.from_default_triple()
+    return target.create_target_machine(opt=optimization_level, reloc="pic", codemodel="default")
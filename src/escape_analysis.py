@@ -0,0 +1,286 @@
+from collections.abc import Mapping, Sequence
+from dataclasses import asdict, dataclass
+from functools import partial
+import json
+from lactose import (
+    Program,
+    Atom,
+    Expression,
+    Statement,
+    Var,
+    Int,
+    Add,
+    Subtract,
+    Multiply,
+    Div,
+    LessThan,
+    EqualTo,
+    GreaterThanOrEqualTo,
+    Tuple,
+    Alloca,
+    Get,
+    Set,
+    Copy,
+    Global,
+    Call,
+    Lambda,
+    Let,
+    If,
+    Apply,
+    Halt,
+    Join,
+    Jump,
+    Loop,
+)
+
+# The name allocation sites in the program body are reported under.
+START = "_start"
+
+
+@dataclass(frozen=True)
+class AllocationSite:
+    """Where a tuple is built and whether it can live on its function's stack; `reason` says why it cannot."""
+
+    function: str
+    name: str
+    slots: int
+    stack: bool
+    reason: str | None = None
+
+
+@dataclass(frozen=True)
+class _Uses:
+    """What a walk over one function body records: each variable's definition, the tuples written to and every use
+    that may let a value outlive the function. Arguments to calls are kept apart, since whether they escape depends on
+    the callee."""
+
+    definitions: dict[str, Expression]
+    written: set[str]
+    escapes: list[tuple[str, str]]
+    arguments: list[tuple[str, str, int]]
+
+
+def escape_analysis(
+    program: Program,
+    sites: list[AllocationSite] | None = None,
+) -> Program:
+    """Turn every `Tuple` that never leaves the function that builds it into an `Alloca`.
+
+    A tuple escapes when it is returned, passed to a tail call or a join point, stored in another tuple, or passed to
+    a function whose corresponding parameter escapes. Calls through a closure built in the same function are resolved
+    to the hoisted function in its slot 0; any other callee is assumed to let its arguments escape. When `sites` is
+    given, a record of every allocation site is appended to it.
+    """
+    functions: dict[str, tuple[Sequence[str], Statement]] = {
+        name: (function.parameters, function.body) for name, function in program.functions.items()
+    }
+    functions[START] = (program.parameters, program.body)
+    uses = {name: _collect(body) for name, (_, body) in functions.items()}
+
+    # Start by assuming no parameter escapes and grow the summaries until they hold for every function.
+    summaries = {name: [False for _ in parameters] for name, (parameters, _) in functions.items()}
+    changed = True
+    while changed:
+        changed = False
+        for name, (parameters, _) in functions.items():
+            escaping = _escaping(uses[name], summaries)
+            summary = [parameter in escaping for parameter in parameters]
+            if summary != summaries[name]:
+                summaries[name] = summary
+                changed = True
+
+    decisions = {name: _escaping(uses[name], summaries) for name in functions}
+    if sites is not None:
+        for function, (_, body) in functions.items():
+            for name, value in uses[function].definitions.items():
+                if isinstance(value, Tuple):
+                    reason = decisions[function].get(name)
+                    sites.append(AllocationSite(function, name, len(value.components), reason is None, reason))
+
+    return Program(
+        parameters=program.parameters,
+        body=allocate_statement(program.body, decisions[START]),
+        functions={
+            name: Lambda(function.parameters, allocate_statement(function.body, decisions[name]))
+            for name, function in program.functions.items()
+        },
+    )
+
+
+def allocate_statement(
+    statement: Statement,
+    escaping: Mapping[str, str],
+) -> Statement:
+    recur = partial(allocate_statement, escaping=escaping)
+
+    match statement:
+        case Let(name, Tuple(components), next) if name not in escaping:
+            return Let(name, Alloca(components), recur(next))
+
+        case Let(name, value, next):
+            return Let(name, value, recur(next))
+
+        case If(condition, consequent, alternative):
+            return If(condition, recur(consequent), recur(alternative))
+
+        case Join(name, parameters, body, next):
+            return Join(name, parameters, recur(body), recur(next))
+
+        case Loop(name, parameters, arguments, body):
+            return Loop(name, parameters, arguments, recur(body))
+
+        case Apply() | Halt() | Jump():  # pragma: no branch
+            return statement
+
+
+def _collect(
+    statement: Statement,
+) -> _Uses:
+    uses = _Uses({}, set(), [], [])
+    stack = [statement]
+    while stack:
+        match stack.pop():
+            case Let(name, value, next):
+                uses.definitions[name] = value
+                _collect_expression(value, uses)
+                stack.append(next)
+
+            case If(_, consequent, alternative):
+                stack.extend([consequent, alternative])
+
+            case Join(_, _, body, next):
+                stack.extend([body, next])
+
+            case Loop(_, _, arguments, body):
+                _escape(arguments, "carried around a loop", uses)
+                stack.append(body)
+
+            case Jump(_, arguments):
+                _escape(arguments, "passed to a join point", uses)
+
+            case Apply(callee, arguments):
+                _escape([callee, *arguments], "passed to a tail call", uses)
+
+            case Halt(value):  # pragma: no branch
+                _escape([value], "returned", uses)
+    return uses
+
+
+def _collect_expression(
+    expression: Expression,
+    uses: _Uses,
+) -> None:
+    match expression:
+        # Reading and writing through a tuple, or naming it again, does not let it escape.
+        case Get(_, index):
+            _escape([index], "used as an integer", uses)
+
+        case Set(base, index, value):
+            if isinstance(base, Var):
+                uses.written.add(base.name)
+            _escape([index], "used as an integer", uses)
+            _escape([value], "stored in a tuple", uses)
+
+        case Copy():
+            pass
+
+        case Tuple(components) | Alloca(components):
+            _escape(components, "stored in a tuple", uses)
+
+        case Call(Var(callee), arguments):
+            for index, argument in enumerate(arguments):
+                if isinstance(argument, Var):
+                    uses.arguments.append((argument.name, callee, index))
+
+        case Call(_, arguments):
+            _escape(arguments, "passed to an unknown function", uses)
+
+        case (
+            Add(x, y)
+            | Subtract(x, y)
+            | Multiply(x, y)
+            | Div(x, y)
+            | LessThan(x, y)
+            | EqualTo(x, y)
+            | GreaterThanOrEqualTo(x, y)
+        ):
+            _escape([x, y], "used as an integer", uses)
+
+        case Global():  # pragma: no branch
+            pass
+
+
+def _escape(
+    atoms: Sequence[Atom],
+    reason: str,
+    uses: _Uses,
+) -> None:
+    uses.escapes.extend((atom.name, reason) for atom in atoms if isinstance(atom, Var))
+
+
+def _escaping(
+    uses: _Uses,
+    summaries: Mapping[str, Sequence[bool]],
+) -> dict[str, str]:
+    """The variables (roots of `Copy` chains) whose value escapes, each with the first reason found."""
+    root = partial(_root, definitions=uses.definitions)
+    escaping: dict[str, str] = {}
+    for name, reason in uses.escapes:
+        escaping.setdefault(root(name), reason)
+    for name, callee, index in uses.arguments:
+        match _known_function(callee, uses):
+            case None:
+                escaping.setdefault(root(name), "passed to an unknown function")
+            case function if function not in summaries or summaries[function][index]:
+                escaping.setdefault(root(name), f"passed to {function}")
+            case _:
+                pass
+    return escaping
+
+
+def _root(
+    name: str,
+    definitions: Mapping[str, Expression],
+) -> str:
+    while isinstance(value := definitions.get(name), Copy) and isinstance(value.value, Var):
+        name = value.value.name
+    return name
+
+
+def _known_function(
+    callee: str,
+    uses: _Uses,
+) -> str | None:
+    """The hoisted function `callee` is bound to: a `Global`, or slot 0 of a closure built in this function and never
+    written to."""
+    root = partial(_root, definitions=uses.definitions)
+    match uses.definitions.get(root(callee)):
+        case Global(name):
+            return name
+
+        case Get(Var(closure), Int(0)) if root(closure) not in {root(name) for name in uses.written}:
+            match uses.definitions.get(root(closure)):
+                case Tuple([Var(code), *_]):
+                    match uses.definitions.get(root(code)):
+                        case Global(name):
+                            return name
+
+    return None
+
+
+def format_allocation_sites(
+    sites: Sequence[AllocationSite],
+) -> str:
+    lines = [f"{'function':<12} {'site':<12} {'slots':>5} {'allocation':<10} {'reason'}"]
+    for s in sites:
+        lines.append(
+            f"{s.function:<12} {s.name:<12} {s.slots:>5} {'stack' if s.stack else 'heap':<10} {s.reason or ''}"
+        )
+    lines.append(f"{sum(s.stack for s in sites)} of {len(sites)} sites on the stack")
+    return "\n".join(lines)
+
+
+def allocation_sites_json(
+    sites: Sequence[AllocationSite],
+) -> str:
+    return json.dumps([asdict(s) for s in sites])
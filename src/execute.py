@@ -1,28 +1,228 @@
 # type: ignore
-from collections.abc import Sequence
+from collections.abc import Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+import array
+import hashlib
+from typing import Self
 from llvmlite import binding
-from ctypes import CFUNCTYPE, POINTER, c_int32, c_char_p
+from lower import ARENA_COUNTERS
+from optimize import optimize
+from ctypes import CFUNCTYPE, POINTER, c_int64, c_char_p, c_void_p, addressof
 
 binding.initialize()
 binding.initialize_native_target()
 binding.initialize_native_asmprinter()
 
+_MAIN = CFUNCTYPE(c_int64, c_int64, POINTER(c_char_p))
+_ENTRY = CFUNCTYPE(c_int64, POINTER(c_int64))
+_BATCH = CFUNCTYPE(None, c_void_p, c_void_p, c_int64)
+
+
+class BatchError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class ArenaStatistics:
+    """Totals over every run of a program: bytes and tuples allocated, chunks the arena took from `malloc`, and the
+    times a program compiled with `--gc` collected its heap."""
+
+    bytes: int
+    allocations: int
+    chunks: int
+    collections: int
+
+
+@dataclass(frozen=True)
+class JitProgram:
+    """A program finalized into native code; calling it does not touch the JIT again.
+
+    Heap tuples come from an arena in the program's own globals, which every call and every batch row resets. A
+    program must therefore not be called from several threads at once; `batch` gives each extra worker a copy of the
+    program, with an arena of its own.
+    """
+
+    arity: int
+    _main: _MAIN
+    _entry: _ENTRY
+    _batch: _BATCH
+    _counters: Sequence[int]  # addresses of the arena's counters, in `ARENA_COUNTERS` order
+    _copy: Callable[[], "JitProgram"]
+    _copies: list["JitProgram"] = field(default_factory=list)
+
+    def main(
+        self,
+        args: Sequence[str],
+    ) -> int:
+        argv = (c_char_p * (len(args) + 2))(*[a.encode() for a in ["program", *args]], None)
+        return self._main(len(args) + 1, argv)
+
+    def __call__(
+        self,
+        *args: int,
+    ) -> int:
+        if len(args) != self.arity:
+            raise TypeError(f"program takes {self.arity} arguments, got {len(args)}")
+        return self._entry((c_int64 * max(self.arity, 1))(*args))
+
+    def arena(
+        self,
+    ) -> ArenaStatistics:
+        """The arena's counters, summed over this program and the copies its batch workers ran on."""
+        totals = [
+            sum(c_int64.from_address(program._counters[i]).value for program in [self, *self._copies])
+            for i, _ in enumerate(ARENA_COUNTERS)
+        ]
+        return ArenaStatistics(*totals)
+
+    def batch(
+        self,
+        inputs: object,
+        out: object | None = None,
+        workers: int = 1,
+    ) -> object:
+        """Run the program once per row of `inputs`, a C-contiguous buffer of int64 arguments (a 2-D `rows` x `arity`
+        memoryview or NumPy array, or a flat `array("q")`), writing row `i`'s result to `out[i]`.
+
+        Rows are handed to native code in one call per chunk, so no Python objects are created per row. With
+        `workers` > 1 the rows are split into that many chunks run on threads; native calls release the GIL, so the
+        chunks run in parallel. Each worker past the first runs on a copy of the program, compiled the first time it
+        is needed. Returns `out`, or a new `array("q")` when `out` is not given.
+        """
+        source = _int64_view(inputs, "inputs")
+        if source.ndim == 2 and source.shape[1] != self.arity:
+            raise BatchError(f"inputs have {source.shape[1]} columns but the program takes {self.arity} arguments")
+        if source.ndim == 2 or (source.ndim == 1 and self.arity == 1):
+            rows = source.shape[0]
+        elif source.ndim == 1 and self.arity > 1 and len(source) % self.arity == 0:
+            rows = len(source) // self.arity
+        else:
+            raise BatchError(f"cannot split inputs of shape {source.shape} into rows of {self.arity} arguments")
+
+        if out is None:
+            out = array.array("q", bytes(8 * rows))
+        target = _int64_view(out, "out")
+        if target.readonly or target.nbytes < 8 * rows:
+            raise BatchError(f"out must be a writable buffer of at least {rows} int64 values")
+
+        # Read-only inputs (bytes, frozen arrays) cannot be addressed through ctypes, so those are copied once.
+        flat = source.cast("B")
+        table_type = c_int64 * (flat.nbytes // 8)
+        table = table_type.from_buffer_copy(flat) if flat.readonly else table_type.from_buffer(flat)
+        results = (c_int64 * rows).from_buffer(target.cast("B"))
+
+        def run(
+            program: JitProgram,
+            first: int,
+            count: int,
+        ) -> None:
+            program._batch(addressof(table) + 8 * self.arity * first, addressof(results) + 8 * first, count)
+
+        if workers <= 1 or rows <= 1:
+            run(self, 0, rows)
+        else:
+            size = -(-rows // workers)
+            firsts = range(0, rows, size)
+            while len(self._copies) < len(firsts) - 1:
+                self._copies.append(self._copy())
+            with ThreadPoolExecutor(workers) as pool:
+                counts = [min(size, rows - first) for first in firsts]
+                list(pool.map(run, [self, *self._copies], firsts, counts))
+        return out
+
+
+class JitSession:
+    """One target machine and MCJIT engine shared by every program run through it.
+
+    Programs are keyed by a hash of their IR text, so each distinct module is parsed, verified and compiled to native
+    code once; later loads return the same finalized function pointers. Every module defines the same symbols (`main`,
+    `_start`, the arena's globals, ...), so the definitions in each one are renamed apart before it joins the engine.
+    """
+
+    def __init__(
+        self,
+    ) -> None:
+        machine = binding.Target.from_default_triple().create_target_machine()
+        self._engine = binding.create_mcjit_compiler(binding.parse_assembly(""), machine)
+        self._programs: dict[str, JitProgram] = {}
+        self._modules = 0
+
+    def load(
+        self,
+        source: str,
+        optimization_level: int = 0,
+    ) -> JitProgram:
+        key = f"{hashlib.sha256(source.encode()).hexdigest()}-O{optimization_level}"
+        if (program := self._programs.get(key)) is None:
+            program = self._programs[key] = self._compile(source, optimization_level)
+        return program
+
+    def _compile(
+        self,
+        source: str,
+        optimization_level: int,
+    ) -> JitProgram:
+        module = optimize(binding.parse_assembly(source), optimization_level)
+        suffix = f".{self._modules}"
+        self._modules += 1
+        for value in [*module.functions, *module.global_variables]:
+            if not value.is_declaration:
+                value.name += suffix
+        arity = len(list(module.get_function(f"_start{suffix}").arguments))
+
+        self._engine.add_module(module)
+        self._engine.finalize_object()
+        self._engine.run_static_constructors()
+        return JitProgram(
+            arity,
+            _MAIN(self._engine.get_function_address(f"main{suffix}")),
+            _ENTRY(self._engine.get_function_address(f"_entry{suffix}")),
+            _BATCH(self._engine.get_function_address(f"_batch{suffix}")),
+            [self._engine.get_global_value_address(f"{name}{suffix}") for name in ARENA_COUNTERS],
+            lambda: self._compile(source, optimization_level),
+        )
+
+    def close(
+        self,
+    ) -> None:
+        self._engine.close()
+        self._programs.clear()
+
+    def __enter__(
+        self,
+    ) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        *exc_info: object,
+    ) -> None:
+        self.close()
+
+
+_session: JitSession | None = None
+
 
 def execute(
     source: str,
     args: Sequence[str],
+    optimization_level: int = 0,
 ) -> int:
-    machine = binding.Target.from_default_triple().create_target_machine()
-    module = binding.parse_assembly(source)
-    module.verify()
-
-    with binding.create_mcjit_compiler(module, machine) as engine:
-        engine.finalize_object()
-        engine.run_static_constructors()
+    """Run a module's `main` with `args` as its command line, through a process-wide session."""
+    global _session
+    if _session is None:
+        _session = JitSession()
+    return _session.load(source, optimization_level).main(args)
 
-        argc = len(args) + 1
-        argv = (c_char_p * argc)(*[a.encode() for a in ["program", *args]])
 
-        f_ptr = engine.get_function_address("main")
-        cfunc = CFUNCTYPE(c_int32, c_int32, POINTER(c_char_p))(f_ptr)
-        return cfunc(argc, argv)
+def _int64_view(
+    buffer: object,
+    name: str,
+) -> memoryview:
+    view = memoryview(buffer)  # type: ignore
+    if view.itemsize != 8 or view.format.lstrip("@=<") not in ("q", "l"):
+        raise BatchError(f"{name} must hold int64 values, not {view.format!r}")
+    if not view.c_contiguous:
+        raise BatchError(f"{name} must be C-contiguous")
+    return view
@@ -21,9 +21,10 @@ from glucose import (
     Do,
     Lambda,
     Apply,
+    While,
 )
 import maltose
-from maltose import Copy, Halt
+from maltose import Call, Copy, Halt, Join, Jump, Loop
 
 
 def explicate_control(
@@ -32,7 +33,7 @@ def explicate_control(
 ) -> maltose.Program:
     return maltose.Program(
         parameters=program.parameters,
-        body=explicate_control_expression(program.body, lambda v: Halt(v), fresh),
+        body=explicate_control_expression(program.body, Halt, fresh),
     )
 
 
@@ -82,10 +83,9 @@ def explicate_control_expression(
             t = fresh("t")
             return expr(
                 x,
-                lambda x_val: expr(  # Renamed to avoid clash if x, y are Vars
+                lambda x: expr(
                     y,
-                    # Corrected line:
-                    lambda y_val: Let(t, Copy(Div(x_val, y_val)), m(Var(t))),
+                    lambda y: Let(t, Div(x, y), m(Var(t))),
                 ),
             )
 
@@ -102,20 +102,39 @@ def explicate_control_expression(
             return m(expression)
 
         case If(condition, consequent, alternative):
-            j = fresh("j")
+            if m is Halt:
+                # In tail position both branches simply return, so there is nothing to join.
+                return expr(condition, lambda condition: If(condition, expr(consequent, m), expr(alternative, m)))
+
+            # The join point is bound before the condition is computed, so a chain of conditionals (as `match`
+            # compiles to) stays a chain of tests. Where the rest of the program only passes the value on to another
+            # join point, the branches jump there directly.
             t = fresh("t")
-            return Let(
-                j,
-                Lambda([t], m(Var(t))),
-                expr(
-                    condition,
-                    lambda condition: If(
+            match m(Var(t)):
+                case Jump(target, [Var(x)]) if x == t:
+                    return expr(
                         condition,
-                        expr(consequent, lambda consequent: Apply(Var(j), [consequent])),
-                        expr(alternative, lambda alternative: Apply(Var(j), [alternative])),
-                    ),
-                ),
-            )
+                        lambda condition: If(
+                            condition,
+                            expr(consequent, lambda consequent: Jump(target, [consequent])),
+                            expr(alternative, lambda alternative: Jump(target, [alternative])),
+                        ),
+                    )
+                case rest:
+                    j = fresh("j")
+                    return Join(
+                        j,
+                        [t],
+                        rest,
+                        expr(
+                            condition,
+                            lambda condition: If(
+                                condition,
+                                expr(consequent, lambda consequent: Jump(j, [consequent])),
+                                expr(alternative, lambda alternative: Jump(j, [alternative])),
+                            ),
+                        ),
+                    )
 
         case LessThan(x, y):
             t = fresh("t")
@@ -183,29 +202,40 @@ def explicate_control_expression(
         case Do(first, second):
             return expr(
                 first,
-                lambda _: expr(second, lambda second: m(second)),
+                lambda _: expr(second, m),
             )
 
         case Lambda(parameters, body):
             t = fresh("t")
-            k = fresh("k")
-            return Let(
-                t,
-                Lambda([*parameters, k], expr(body, lambda body: Apply(Var(k), [body]))),
-                m(Var(t)),
+            return Let(t, Lambda(parameters, expr(body, Halt)), m(Var(t)))
+
+        case While(condition, body):
+            # The loop's exit is the else branch, so the rest of the program is lowered inside the loop statement.
+            loop = fresh("loop")
+            return Loop(
+                loop,
+                [],
+                [],
+                expr(
+                    condition,
+                    lambda condition: If(
+                        condition,
+                        expr(body, lambda _: Jump(loop, [])),
+                        m(Unit()),
+                    ),
+                ),
             )
 
         case Apply(callee, arguments):  # pragma: no branch
+            # A call in tail position (its continuation is the function's own return) becomes a tail call; any other
+            # returns to its caller, which carries on in the same function.
             t = fresh("t")
-            k = fresh("k")
             return expr(
                 callee,
                 lambda callee: exprs(
                     arguments,
-                    lambda arguments: Let(
-                        k,
-                        Lambda([t], m(Var(t))),
-                        Apply(callee, [*arguments, Var(k)]),
+                    lambda arguments: (
+                        Apply(callee, arguments) if m is Halt else Let(t, Call(callee, arguments), m(Var(t)))
                     ),
                 ),
             )
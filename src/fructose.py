@@ -45,78 +45,78 @@ type Expression = Union[
 ]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Add[Operand]:
     operands: Sequence[Operand]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Subtract[Operand]:
     operands: Sequence[Operand]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Multiply[Operand]:
     operands: Sequence[Operand]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Div[Operand]:
     operands: Sequence[Operand]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Let[Value, Body]:
     bindings: Sequence[tuple[str, Value]]
     body: Body
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class LetStar[Value, Body]:
     bindings: Sequence[tuple[str, Value]]
     body: Body
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class LetRec[Value, Body]:
     bindings: Sequence[tuple[str, Value]]
     body: Body
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Not[Operand]:
     operand: Operand
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class And[Operand]:
     operands: Sequence[Operand]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Or[Operand]:
     operands: Sequence[Operand]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Cond[Condition, Consequent, Default]:
     arms: Sequence[tuple[TypingAny, TypingAny]]
     default: TypingAny
     __match_args__ = ("arms", "default")
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Do:
     operands: Sequence[TypingAny]
     __match_args__ = ("operands",)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class LessThanOrEqualTo[Operand]:
     operands: Sequence[Operand]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class LessThan[Operand]:
     operands: Sequence[TypingAny]
     __match_args__ = ("x", "y")
@@ -130,7 +130,7 @@ class LessThan[Operand]:
         return self.operands[1] if len(self.operands) >= 2 else None
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EqualTo[Operand]:
     operands: Sequence[TypingAny]
     __match_args__ = ("x", "y")
@@ -144,7 +144,7 @@ class EqualTo[Operand]:
         return self.operands[1] if len(self.operands) >= 2 else None
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class GreaterThan[Operand]:
     operands: Sequence[TypingAny]
     __match_args__ = ("x", "y")
@@ -158,7 +158,7 @@ class GreaterThan[Operand]:
         return self.operands[1] if len(self.operands) >= 2 else None
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class GreaterThanOrEqualTo[Operand]:
     operands: Sequence[TypingAny]
     __match_args__ = ("x", "y")
@@ -168,124 +168,124 @@ class GreaterThanOrEqualTo[Operand]:
         return self.operands[0] if len(self.operands) >= 1 else None
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Cell[Operand]:
     value: Operand
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Get[Operand]:
     cell: Operand
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Set[Operand]:
     cell: Operand
     value: Operand
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Begin[Operand]:
     operands: Sequence[Operand]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class While[Condition, Body]:
     condition: Condition
     body: Body
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Program:
     parameters: Sequence[str]
     body: Expression
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Sum:
     operands: Sequence[TypingAny]
     __match_args__ = ("operands",)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Difference:
     operands: Sequence[TypingAny]
     __match_args__ = ("operands",)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Product:
     operands: Sequence[TypingAny]
     __match_args__ = ("operands",)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class NonDescending:
     operands: Sequence[TypingAny]
     __match_args__ = ("operands",)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Ascending:
     operands: Sequence[TypingAny]
     __match_args__ = ("operands",)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Same:
     operands: Sequence[TypingAny]
     __match_args__ = ("operands",)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Descending:
     operands: Sequence[TypingAny]
     __match_args__ = ("operands",)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class NonAscending:
     operands: Sequence[TypingAny]
     __match_args__ = ("operands",)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Match:
     expr: TypingAny
     arms: Sequence[tuple[TypingAny, TypingAny]]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class PatternVar:
     name: str
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class PatternInt:
     value: int
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class PatternTrue:
     pass
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class PatternFalse:
     pass
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class PatternUnit:
     pass
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class PatternWildcard:
     pass
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class PatternCons:
     constructor: str
     patterns: Sequence[TypingAny]
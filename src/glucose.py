@@ -42,22 +42,23 @@ type Expression = Union[
     Do[Expression, Expression],
     Lambda[Expression],
     Apply[Expression],
+    While[Expression, Expression],
 ]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Do[Effect, Value]:
     effect: Effect
     value: Value
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
+class While[Condition, Body]:
+    condition: Condition
+    body: Body
+
+
+@dataclass(frozen=True, slots=True)
 class Program:
     parameters: Sequence[str]
     body: Expression
-
-
-@dataclass(frozen=True)
-class Div[Operand]:
-    x: Operand
-    y: Operand
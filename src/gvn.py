@@ -0,0 +1,260 @@
+from collections import Counter
+from collections.abc import Callable, Sequence
+from lactose import (
+    Program,
+    Atom,
+    Expression,
+    Statement,
+    Var,
+    Int,
+    Bool,
+    Unit,
+    Add,
+    Subtract,
+    Multiply,
+    Div,
+    LessThan,
+    EqualTo,
+    GreaterThanOrEqualTo,
+    Tuple,
+    Alloca,
+    Get,
+    Set,
+    Copy,
+    Global,
+    Call,
+    Lambda,
+    Let,
+    If,
+    Apply,
+    Halt,
+    Join,
+    Jump,
+    Loop,
+)
+from escape_analysis import START
+from util import ScopedTable
+
+# Operators whose value does not depend on the order of their operands.
+COMMUTATIVE = (Add, Multiply, EqualTo)
+
+
+def gvn(
+    program: Program,
+    eliminated: dict[str, int] | None = None,
+) -> Program:
+    """Compute each value once per path through a function: global value numbering over the main body (`START`) and
+    every hoisted function.
+
+    A `let` whose value some variable in scope already holds is dropped, and its uses refer to that variable instead;
+    copies are propagated the same way. Reads of tuples are numbered with the state of memory they read, which every
+    `Set` and call replaces, so a read is shared only while no write can have come between (and a read of what a `Set`
+    just wrote is the value written). What a branch, join point or loop body computes is only shared within it. When
+    `eliminated` is given, the number of computations dropped from each function is recorded in it.
+    """
+    counts = Counter[str]()
+    functions = {
+        name: Lambda(function.parameters, gvn_body(function.parameters, function.body, name, counts))
+        for name, function in program.functions.items()
+    }
+    body = gvn_body(program.parameters, program.body, START, counts)
+    if eliminated is not None:
+        eliminated.update({name: counts[name] for name in [START, *program.functions]})
+    return Program(parameters=program.parameters, body=body, functions=functions)
+
+
+def gvn_body(
+    parameters: Sequence[str],
+    body: Statement,
+    name: str,
+    counts: Counter[str],
+) -> Statement:
+    names = _bound(body)
+    if len(set(names)) != len(names) or set(names) & set(parameters):
+        return body  # numbering relies on every variable being bound once
+    numbering = _Numbering(lambda: counts.update([name]))
+    for parameter in parameters:
+        numbering.define(parameter)
+    return numbering.statement(body, numbering.unique())
+
+
+class _Numbering:
+    def __init__(
+        self,
+        eliminate: Callable[[], None],
+    ) -> None:
+        self.eliminate = eliminate
+        self.numbers: dict[tuple[object, ...], int] = {}
+        # The value number of each variable, and the atom that holds each value number.
+        self.values = ScopedTable[str, int]()
+        self.leaders = ScopedTable[int, Atom]()
+
+    def number(
+        self,
+        key: tuple[object, ...],
+    ) -> int:
+        return self.numbers.setdefault(key, len(self.numbers))
+
+    def unique(self) -> int:
+        return self.number((None, len(self.numbers)))
+
+    def define(
+        self,
+        name: str,
+    ) -> None:
+        n = self.unique()
+        self.values[name] = n
+        self.leaders[n] = Var(name)
+
+    def atom(
+        self,
+        atom: Atom,
+    ) -> tuple[Atom, int]:
+        """The leader of `atom`'s value, and its value number."""
+        match atom:
+            case Var(name):
+                if name not in self.values:
+                    self.define(name)
+                n = self.values[name]
+                return self.leaders.get(n, atom), n
+            case Int(value):
+                n = self.number((Int, value))
+            case Bool(value):
+                n = self.number((Bool, value))
+            case _:
+                n = self.number((Unit,))
+        # A constant leads its own value, so copies of it are propagated.
+        if n not in self.leaders:
+            self.leaders[n] = atom
+        return self.leaders[n], n
+
+    def atoms(
+        self,
+        atoms: Sequence[Atom],
+    ) -> list[Atom]:
+        return [self.atom(atom)[0] for atom in atoms]
+
+    def expression(
+        self,
+        expression: Expression,
+        memory: int,
+    ) -> tuple[Expression, int | None, int]:
+        """`expression` with its operands replaced by their leaders, the value number of its result (None where it is
+        a fresh value) and the state of memory after it."""
+        match expression:
+            case (
+                Add(x, y)
+                | Subtract(x, y)
+                | Multiply(x, y)
+                | Div(x, y)
+                | LessThan(x, y)
+                | EqualTo(x, y)
+                | GreaterThanOrEqualTo(x, y)
+            ):
+                (a, na), (b, nb) = self.atom(x), self.atom(y)
+                kind = type(expression)
+                key = (kind, *sorted((na, nb))) if kind in COMMUTATIVE else (kind, na, nb)
+                return kind(a, b), self.number(key), memory
+
+            case Copy(value):
+                value, n = self.atom(value)
+                return Copy(value), n, memory
+
+            case Global(name):
+                return expression, self.number((Global, name)), memory
+
+            case Get(base, index):
+                (base, nb), (index, ni) = self.atom(base), self.atom(index)
+                return Get(base, index), self.number((Get, nb, ni, memory)), memory
+
+            case Set(base, index, value):
+                (base, nb), (index, ni), (value, _) = self.atom(base), self.atom(index), self.atom(value)
+                written = self.unique()
+                # Until memory changes again, reading the field back gives the value just written.
+                self.leaders[self.number((Get, nb, ni, written))] = value
+                return Set(base, index, value), None, written
+
+            case Tuple(components):
+                return Tuple(self.atoms(components)), None, memory
+
+            case Alloca(components):
+                return Alloca(self.atoms(components)), None, memory
+
+            case Call(callee, arguments):  # pragma: no branch
+                callee, _ = self.atom(callee)
+                return Call(callee, self.atoms(arguments)), None, self.unique()
+
+    def statement(
+        self,
+        statement: Statement,
+        memory: int,
+    ) -> Statement:
+        match statement:
+            case Let(name, value, next):
+                value, n, memory = self.expression(value, memory)
+                if n is None:
+                    self.define(name)
+                    return Let(name, value, self.statement(next, memory))
+                self.values[name] = n
+                if n in self.leaders:
+                    if not isinstance(value, Copy):
+                        self.eliminate()
+                    return self.statement(next, memory)
+                self.leaders[n] = Var(name)
+                return Let(name, value, self.statement(next, memory))
+
+            case If(condition, consequent, alternative):
+                condition, _ = self.atom(condition)
+                return If(condition, self.scope(consequent, memory), self.scope(alternative, memory))
+
+            case Join(name, parameters, body, next):
+                return Join(name, parameters, self.scope(body, self.unique(), parameters), self.statement(next, memory))
+
+            case Jump(target, arguments):
+                return Jump(target, self.atoms(arguments))
+
+            case Loop(name, parameters, arguments, body):
+                return Loop(name, parameters, self.atoms(arguments), self.scope(body, self.unique(), parameters))
+
+            case Apply(callee, arguments):
+                callee, _ = self.atom(callee)
+                return Apply(callee, self.atoms(arguments))
+
+            case Halt(value):  # pragma: no branch
+                return Halt(self.atom(value)[0])
+
+    def scope(
+        self,
+        statement: Statement,
+        memory: int,
+        parameters: Sequence[str] = (),
+    ) -> Statement:
+        """`statement` numbered in a scope of its own, entered with `parameters` bound to values not known here."""
+        with self.values.scope(), self.leaders.scope():
+            for parameter in parameters:
+                self.define(parameter)
+            return self.statement(statement, memory)
+
+
+def _bound(
+    statement: Statement,
+) -> list[str]:
+    """Every variable `statement` binds, as often as it binds it."""
+    names: list[str] = []
+    stack = [statement]
+    while stack:
+        match stack.pop():
+            case Let(name, _, next):
+                names.append(name)
+                stack.append(next)
+            case If(_, consequent, alternative):
+                stack.extend([consequent, alternative])
+            case Join(_, parameters, body, next):
+                names.extend(parameters)
+                stack.extend([body, next])
+            case Loop(_, parameters, _, body):
+                names.extend(parameters)
+                stack.append(body)
+            case _:
+                pass
+    return names
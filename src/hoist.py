@@ -1,4 +1,4 @@
-from collections.abc import Callable, Mapping
+from collections.abc import Callable, Mapping, Sequence
 from functools import partial
 import maltose
 from maltose import (
@@ -7,19 +7,37 @@ from maltose import (
     If,
     Apply,
     Halt,
+    Join,
+    Jump,
+    Loop,
 )
 import lactose
 from lactose import Global
+from close_lambdas import free_variables_statement
+
 
 def hoist(
     program: maltose.Program,
     fresh: Callable[[str], str],
 ) -> lactose.Program:
+    """Move every lambda to a top-level function, bound where it was defined to that function's `Global`.
+
+    A variable bound to a lambda's code can also be referred to from other functions, when `close` calls the lambda
+    directly; each function (and the program body) that does so binds the variable to the `Global` itself.
+    """
     body, functions = hoist_statement(program.body, fresh)
+    codes = {
+        name: f
+        for statement in [body, *(function.body for function in functions.values())]
+        for name, f in _globals(statement).items()
+    }
     return lactose.Program(
         parameters=program.parameters,
-        body=body,
-        functions=functions,
+        body=_bind_globals(body, program.parameters, codes),
+        functions={
+            name: Lambda(function.parameters, _bind_globals(function.body, function.parameters, codes))
+            for name, function in functions.items()
+        },
     )
 
 
@@ -47,8 +65,51 @@ def hoist_statement(
             otherwise, fs2 = recur(otherwise)
             return If(condition, then, otherwise), {**fs1, **fs2}
 
-        case Apply():
+        case Join(name, parameters, body, next):
+            body, fs1 = recur(body)
+            next, fs2 = recur(next)
+            return Join(name, parameters, body, next), {**fs1, **fs2}
+
+        case Loop(name, parameters, arguments, body):
+            body, fs = recur(body)
+            return Loop(name, parameters, arguments, body), fs
+
+        case Apply() | Jump():
             return statement, {}
 
         case Halt():  # pragma: no branch
             return statement, {}
+
+
+def _globals(
+    statement: lactose.Statement,
+) -> dict[str, str]:
+    """The variables a statement binds to a `Global`, and the function each refers to."""
+    match statement:
+        case Let(name, Global(f), next):
+            return {name: f, **_globals(next)}
+
+        case Let(_, _, next):
+            return _globals(next)
+
+        case If(_, then, otherwise):
+            return {**_globals(then), **_globals(otherwise)}
+
+        case Join(_, _, body, next):
+            return {**_globals(body), **_globals(next)}
+
+        case Loop(_, _, _, body):
+            return _globals(body)
+
+        case _:
+            return {}
+
+
+def _bind_globals(
+    body: lactose.Statement,
+    parameters: Sequence[str],
+    codes: Mapping[str, str],
+) -> lactose.Statement:
+    for name in sorted((free_variables_statement(body) - set(parameters)) & codes.keys(), reverse=True):
+        body = Let(name, Global(codes[name]), body)
+    return body
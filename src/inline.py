@@ -0,0 +1,501 @@
+from collections.abc import Callable, Mapping, Sequence
+from dataclasses import asdict, dataclass
+from functools import partial
+import json
+from lactose import (
+    Program,
+    Atom,
+    Expression,
+    Statement,
+    Var,
+    Add,
+    Subtract,
+    Multiply,
+    Div,
+    LessThan,
+    EqualTo,
+    GreaterThanOrEqualTo,
+    Tuple,
+    Alloca,
+    Get,
+    Set,
+    Copy,
+    Global,
+    Call,
+    Lambda,
+    Let,
+    If,
+    Apply,
+    Halt,
+    Join,
+    Jump,
+    Loop,
+)
+from escape_analysis import START
+from close_lambdas import free_variables_statement
+
+# The largest function body, in statements (see `size`), inlined at every call site.
+INLINE_BUDGET = 16
+
+
+@dataclass(frozen=True)
+class InlineSite:
+    """A direct call from one function to another and whether it was inlined; `reason` says why not."""
+
+    caller: str
+    callee: str
+    size: int
+    inlined: bool
+    reason: str | None = None
+
+
+def inline(
+    program: Program,
+    fresh: Callable[[str], str],
+    budget: int = INLINE_BUDGET,
+    sites: list[InlineSite] | None = None,
+) -> Program:
+    """Substitute hoisted functions for the direct calls to them, smallest first.
+
+    A call is direct when its callee is a variable bound to a `Global`. Functions are inlined bottom-up, so the size
+    compared to `budget` is a callee's once its own calls have been inlined. A call is inlined when that size is
+    within budget, or when it is the only call to a function whose address is never taken (a budget of 0 inlines
+    nothing); never when it is recursive, directly or through other functions. Functions no longer referred to are
+    dropped. When `sites` is given, a record of every direct call site is appended to it.
+    """
+    functions: dict[str, Lambda[Statement]] = {**program.functions, START: Lambda(program.parameters, program.body)}
+    calls = {name: _direct_calls(function.body) for name, function in functions.items()}
+    taken = {f for function in functions.values() for f in _taken(function.body)}
+    counts = {name: sum(callees.count(name) for callees in calls.values()) for name in functions}
+
+    def reachable(
+        name: str,
+    ) -> set[str]:
+        seen: set[str] = set()
+        stack = [name]
+        while stack:
+            for callee in calls.get(stack.pop(), []):
+                if callee not in seen:
+                    seen.add(callee)
+                    stack.append(callee)
+        return seen
+
+    recursive = {name: reachable(name) for name in functions}
+    inlined: dict[str, Lambda[Statement]] = {}
+
+    def decide(
+        caller: str,
+        callee: str,
+        arity: int,
+    ) -> InlineSite:
+        body = inlined.get(callee, functions[callee]).body
+        n = size(body)
+        if callee in recursive[callee] or caller in recursive[callee]:
+            return InlineSite(caller, callee, n, False, "recursive")
+        if len(functions[callee].parameters) != arity:
+            return InlineSite(caller, callee, n, False, "arity mismatch")
+        if budget > 0 and (n <= budget or (counts[callee] == 1 and callee not in taken)):
+            return InlineSite(caller, callee, n, True)
+        return InlineSite(caller, callee, n, False, "over budget")
+
+    def visit(
+        name: str,
+        visiting: set[str],
+    ) -> None:
+        if name in inlined or name in visiting:
+            return
+        visiting.add(name)
+        for callee in calls[name]:
+            visit(callee, visiting)
+
+        def inlinable(
+            callee: str,
+            arity: int,
+        ) -> bool:
+            site = decide(name, callee, arity)
+            if sites is not None:
+                sites.append(site)
+            return site.inlined
+
+        function = functions[name]
+        body = inline_statement(
+            function.body,
+            _globals(function.body),
+            inlinable,
+            lambda callee: inlined.get(callee, functions[callee]),
+            fresh,
+        )
+        inlined[name] = Lambda(function.parameters, _drop_unused_globals(body))
+
+    for name in functions:
+        visit(name, set())
+
+    live = _referenced(inlined)
+    return Program(
+        parameters=program.parameters,
+        body=inlined[START].body,
+        functions={name: function for name, function in inlined.items() if name != START and name in live},
+    )
+
+
+def inline_statement(
+    statement: Statement,
+    globals: Mapping[str, str],
+    inlinable: Callable[[str, int], bool],
+    function: Callable[[str], Lambda[Statement]],
+    fresh: Callable[[str], str],
+) -> Statement:
+    """Inline the direct calls `inlinable` accepts, given the function each variable bound to a `Global` refers to.
+
+    A tail call becomes the callee's body. Any other call continues with the rest of the caller where the callee
+    would have returned: directly, when the body is straight-line code, otherwise at a join point each return jumps
+    to (and each tail call the body makes becomes a call that returns to it).
+    """
+    recur = partial(inline_statement, globals=globals, inlinable=inlinable, function=function, fresh=fresh)
+
+    def copy(
+        callee: str,
+        arguments: Sequence[Atom],
+    ) -> Statement:
+        called = function(callee)
+        return _rename(called.body, dict(zip(called.parameters, arguments)), {}, fresh)
+
+    match statement:
+        case Let(name, Call(Var(callee), arguments), next) if callee in globals and inlinable(
+            globals[callee], len(arguments)
+        ):
+            inlined, rest = copy(globals[callee], arguments), recur(next)
+            if _straight(inlined):
+                return _splice(inlined, lambda value: Let(name, value, rest))
+            j = fresh("j")
+
+            def jump(
+                value: Expression,
+            ) -> Statement:
+                if isinstance(value, Copy):
+                    return Jump(j, [value.value])
+                t = fresh("t")
+                return Let(t, value, Jump(j, [Var(t)]))
+
+            return Join(j, [name], rest, _splice(inlined, jump))
+
+        case Let(name, value, next):
+            return Let(name, value, recur(next))
+
+        case If(condition, consequent, alternative):
+            return If(condition, recur(consequent), recur(alternative))
+
+        case Join(name, parameters, body, next):
+            return Join(name, parameters, recur(body), recur(next))
+
+        case Loop(name, parameters, arguments, body):
+            return Loop(name, parameters, arguments, recur(body))
+
+        case Apply(Var(callee), arguments) if callee in globals and inlinable(globals[callee], len(arguments)):
+            return copy(globals[callee], arguments)
+
+        case Apply() | Halt() | Jump():  # pragma: no branch
+            return statement
+
+
+def size(
+    statement: Statement,
+) -> int:
+    """The number of statements in a function body, each `let` included."""
+    match statement:
+        case Let(_, _, next):
+            return 1 + size(next)
+        case If(_, consequent, alternative):
+            return 1 + size(consequent) + size(alternative)
+        case Join(_, _, body, next):
+            return 1 + size(body) + size(next)
+        case Loop(_, _, _, body):
+            return 1 + size(body)
+        case _:
+            return 1
+
+
+def format_inline_sites(
+    sites: Sequence[InlineSite],
+) -> str:
+    lines = [f"{'caller':<12} {'callee':<12} {'size':>5} {'decision':<10} {'reason'}"]
+    for s in sites:
+        lines.append(
+            f"{s.caller:<12} {s.callee:<12} {s.size:>5} {'inlined' if s.inlined else 'called':<10} {s.reason or ''}"
+        )
+    lines.append(f"{sum(s.inlined for s in sites)} of {len(sites)} call sites inlined")
+    return "\n".join(lines)
+
+
+def inline_sites_json(
+    sites: Sequence[InlineSite],
+) -> str:
+    return json.dumps([asdict(s) for s in sites])
+
+
+def _globals(
+    statement: Statement,
+) -> dict[str, str]:
+    """The variables a function body binds to a `Global`, and the function each refers to."""
+    match statement:
+        case Let(name, Global(f), next):
+            return {name: f, **_globals(next)}
+        case Let(_, _, next):
+            return _globals(next)
+        case If(_, consequent, alternative):
+            return {**_globals(consequent), **_globals(alternative)}
+        case Join(_, _, body, next):
+            return {**_globals(body), **_globals(next)}
+        case Loop(_, _, _, body):
+            return _globals(body)
+        case _:
+            return {}
+
+
+def _direct_calls(
+    statement: Statement,
+) -> list[str]:
+    """The function each direct call in a body calls, once per call site."""
+    globals = _globals(statement)
+
+    def walk(
+        statement: Statement,
+    ) -> list[str]:
+        match statement:
+            case Let(_, Call(Var(callee), _), next) if callee in globals:
+                return [globals[callee], *walk(next)]
+            case Let(_, _, next):
+                return walk(next)
+            case If(_, consequent, alternative):
+                return walk(consequent) + walk(alternative)
+            case Join(_, _, body, next):
+                return walk(body) + walk(next)
+            case Loop(_, _, _, body):
+                return walk(body)
+            case Apply(Var(callee), _) if callee in globals:
+                return [globals[callee]]
+            case _:
+                return []
+
+    return walk(statement)
+
+
+def _taken(
+    statement: Statement,
+) -> set[str]:
+    """The functions whose address a body uses other than to call them (to build a closure, say)."""
+    globals = _globals(statement)
+
+    def used(
+        atoms: Sequence[Atom],
+    ) -> set[str]:
+        return {globals[atom.name] for atom in atoms if isinstance(atom, Var) and atom.name in globals}
+
+    def walk(
+        statement: Statement,
+    ) -> set[str]:
+        match statement:
+            case Let(_, Call(_, arguments), next):
+                return used(arguments) | walk(next)
+            case Let(_, value, next):
+                return used(_atoms(value)) | walk(next)
+            case If(condition, consequent, alternative):
+                return used([condition]) | walk(consequent) | walk(alternative)
+            case Join(_, _, body, next):
+                return walk(body) | walk(next)
+            case Loop(_, _, arguments, body):
+                return used(arguments) | walk(body)
+            case Apply(_, arguments) | Jump(_, arguments):
+                return used(arguments)
+            case Halt(value):
+                return used([value])
+            case _:
+                return set()
+
+    return walk(statement)
+
+
+def _referenced(
+    functions: Mapping[str, Lambda[Statement]],
+) -> set[str]:
+    """The functions the program body refers to, directly or through the functions it refers to."""
+    seen = {START}
+    stack = [START]
+    while stack:
+        for f in _globals(functions[stack.pop()].body).values():
+            if f not in seen:
+                seen.add(f)
+                stack.append(f)
+    return seen
+
+
+def _drop_unused_globals(
+    statement: Statement,
+) -> Statement:
+    """Drop the bindings of functions every call to which was inlined, so those functions are no longer referred to."""
+    recur = _drop_unused_globals
+    match statement:
+        case Let(name, Global(), next) if name not in free_variables_statement(next):
+            return recur(next)
+        case Let(name, value, next):
+            return Let(name, value, recur(next))
+        case If(condition, consequent, alternative):
+            return If(condition, recur(consequent), recur(alternative))
+        case Join(name, parameters, body, next):
+            return Join(name, parameters, recur(body), recur(next))
+        case Loop(name, parameters, arguments, body):
+            return Loop(name, parameters, arguments, recur(body))
+        case _:
+            return statement
+
+
+def _straight(
+    statement: Statement,
+) -> bool:
+    """Whether a body is a run of `let`s ending in a return or tail call."""
+    while isinstance(statement, Let):
+        statement = statement.body
+    return isinstance(statement, Halt | Apply)
+
+
+def _splice(
+    statement: Statement,
+    k: Callable[[Expression], Statement],
+) -> Statement:
+    """Replace each return in a body, and each tail call, with `k` of the value it would return."""
+    recur = partial(_splice, k=k)
+    match statement:
+        case Let(name, value, next):
+            return Let(name, value, recur(next))
+        case If(condition, consequent, alternative):
+            return If(condition, recur(consequent), recur(alternative))
+        case Join(name, parameters, body, next):
+            return Join(name, parameters, recur(body), recur(next))
+        case Loop(name, parameters, arguments, body):
+            return Loop(name, parameters, arguments, recur(body))
+        case Apply(callee, arguments):
+            return k(Call(callee, arguments))
+        case Halt(value):
+            return k(Copy(value))
+        case _:
+            return statement
+
+
+def _rename(
+    statement: Statement,
+    variables: Mapping[str, Atom],
+    labels: Mapping[str, str],
+    fresh: Callable[[str], str],
+) -> Statement:
+    """A copy of a body with every variable and label it binds renamed, and `variables` substituted."""
+    recur = partial(_rename, fresh=fresh)
+
+    def atom(
+        atom: Atom,
+    ) -> Atom:
+        return variables.get(atom.name, atom) if isinstance(atom, Var) else atom
+
+    def atoms(
+        atoms: Sequence[Atom],
+    ) -> list[Atom]:
+        return [atom(a) for a in atoms]
+
+    match statement:
+        case Let(name, value, next):
+            t = fresh("t")
+            return Let(t, _substitute(value, atom), recur(next, {**variables, name: Var(t)}, labels))
+
+        case If(condition, consequent, alternative):
+            return If(atom(condition), recur(consequent, variables, labels), recur(alternative, variables, labels))
+
+        case Join(name, parameters, body, next):
+            j = fresh("j")
+            renamed = {p: Var(fresh("t")) for p in parameters}
+            return Join(
+                j,
+                [v.name for v in renamed.values()],
+                recur(body, {**variables, **renamed}, labels),
+                recur(next, variables, {**labels, name: j}),
+            )
+
+        case Jump(target, arguments):
+            return Jump(labels[target], atoms(arguments))
+
+        case Loop(name, parameters, arguments, body):
+            loop = fresh("loop")
+            renamed = {p: Var(fresh("t")) for p in parameters}
+            return Loop(
+                loop,
+                [v.name for v in renamed.values()],
+                atoms(arguments),
+                recur(body, {**variables, **renamed}, {**labels, name: loop}),
+            )
+
+        case Apply(callee, arguments):
+            return Apply(atom(callee), atoms(arguments))
+
+        case Halt(value):  # pragma: no branch
+            return Halt(atom(value))
+
+
+def _substitute(
+    expression: Expression,
+    atom: Callable[[Atom], Atom],
+) -> Expression:
+    match expression:
+        case Add(x, y):
+            return Add(atom(x), atom(y))
+        case Subtract(x, y):
+            return Subtract(atom(x), atom(y))
+        case Multiply(x, y):
+            return Multiply(atom(x), atom(y))
+        case Div(x, y):
+            return Div(atom(x), atom(y))
+        case LessThan(x, y):
+            return LessThan(atom(x), atom(y))
+        case EqualTo(x, y):
+            return EqualTo(atom(x), atom(y))
+        case GreaterThanOrEqualTo(x, y):
+            return GreaterThanOrEqualTo(atom(x), atom(y))
+        case Tuple(components):
+            return Tuple([atom(c) for c in components])
+        case Alloca(components):
+            return Alloca([atom(c) for c in components])
+        case Get(base, index):
+            return Get(atom(base), atom(index))
+        case Set(base, index, value):
+            return Set(atom(base), atom(index), atom(value))
+        case Copy(value):
+            return Copy(atom(value))
+        case Call(callee, arguments):
+            return Call(atom(callee), [atom(a) for a in arguments])
+        case _:
+            return expression  # a `Global`
+
+
+def _atoms(
+    expression: Expression,
+) -> list[Atom]:
+    match expression:
+        case (
+            Add(x, y)
+            | Subtract(x, y)
+            | Multiply(x, y)
+            | Div(x, y)
+            | LessThan(x, y)
+            | EqualTo(x, y)
+            | GreaterThanOrEqualTo(x, y)
+        ):
+            return [x, y]
+        case Tuple(components) | Alloca(components):
+            return list(components)
+        case Get(base, index):
+            return [base, index]
+        case Set(base, index, value):
+            return [base, index, value]
+        case Copy(value):
+            return [value]
+        case Call(callee, arguments):
+            return [callee, *arguments]
+        case _:
+            return []  # a `Global`
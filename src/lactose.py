@@ -10,22 +10,22 @@ type Atom = Union[
 ]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Int:
     value: int
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Var:
     name: str
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Bool:
     value: bool
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Unit:
     pass
 
@@ -43,119 +43,161 @@ type Expression = Union[
     Set[Atom],
     Copy[Atom],
     Global,
+    Call[Atom],
+    Alloca[Atom],
 ]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Add[Operand]:
     x: Operand
     y: Operand
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Subtract[Operand]:
     x: Operand
     y: Operand
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Multiply[Operand]:
     x: Operand
     y: Operand
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Div[Operand]:
     x: Operand
     y: Operand
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class LessThan[Operand]:
     x: Operand
     y: Operand
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EqualTo[Operand]:
     x: Operand
     y: Operand
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class GreaterThanOrEqualTo[Operand]:
     x: Operand
     y: Operand
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Tuple[Operand]:
     components: Sequence[Operand]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Get[Operand]:
     tuple: Operand
     index: Operand
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Set[Operand]:
     tuple: Operand
     index: Operand
     value: Operand
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Lambda[Body]:
     parameters: Sequence[str]
     body: Body
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Global:
     name: str
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Copy[Value]:
     value: Value
 
 
+# A call that returns to its caller, as opposed to `Apply`, which is a tail call.
+@dataclass(frozen=True, slots=True)
+class Call[Operand]:
+    callee: Operand
+    arguments: Sequence[Operand]
+
+
+# A tuple that never outlives the function that builds it, so it can live in that function's stack frame.
+@dataclass(frozen=True, slots=True)
+class Alloca[Operand]:
+    components: Sequence[Operand]
+
+
 type Statement = Union[
     Let[Expression, Statement],
     If[Atom, Statement, Statement],
     Apply[Atom],
     Halt[Atom],
+    Join[Statement, Statement],
+    Jump[Atom],
+    Loop[Atom, Statement],
 ]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Let[Value, Body]:
     name: str
     value: Value
     body: Body
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class If[Condition, Consequent, Alternative]:
     condition: Condition
     consequent: Consequent
     alternative: Alternative
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Apply[Operand]:
     callee: Operand
     arguments: Sequence[Operand]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Halt[Value]:
     value: Value
 
 
-@dataclass(frozen=True)
+# A join point: a local continuation `name` that is only ever jumped to, never passed around, so it needs no closure.
+@dataclass(frozen=True, slots=True)
+class Join[Body, Next]:
+    name: str
+    parameters: Sequence[str]
+    body: Body
+    next: Next
+
+
+@dataclass(frozen=True, slots=True)
+class Jump[Operand]:
+    target: str
+    arguments: Sequence[Operand]
+
+
+# A loop: a join point entered with `arguments` that its own body may also jump back to.
+@dataclass(frozen=True, slots=True)
+class Loop[Operand, Body]:
+    name: str
+    parameters: Sequence[str]
+    arguments: Sequence[Operand]
+    body: Body
+
+
+@dataclass(frozen=True, slots=True)
 class Program:
     parameters: Sequence[str]
     body: Statement
@@ -1,5 +1,7 @@
-from collections.abc import Mapping
+from collections.abc import Callable, Iterator, Mapping, Sequence, Set as AbstractSet
+from dataclasses import dataclass
 from functools import partial
+from itertools import count
 from llvmlite import ir  # type:ignore
 
 from lactose import (
@@ -21,70 +23,716 @@ from lactose import (
     Set,
     Copy,
     Global,
+    Call,
+    Alloca,
     Unit,
     Let,
     If,
     Apply,
     Halt,
+    Join,
+    Jump,
+    Loop,
 )
 
-# Our target types: 1-bit for booleans and 64-bit for everything else.
+# Our target types: 1-bit for booleans and 64-bit for everything else. A boolean a function computes and branches on is
+# kept as an i1; it is widened to an i64 (tagged, under `--gc`) only where it is stored, passed or returned.
 i1: ir.IntType = ir.IntType(1)
 i64: ir.IntType = ir.IntType(64)
 
+# A join point lowers to a basic block whose phi nodes take the arguments of every jump to it (under `--gc`, the frame
+# slots its parameters live in). The last element is the number of stack slots live where it is defined: slots
+# allocated after that are dead once control jumps to it.
+type JoinPoint = tuple[ir.Block, Sequence[ir.Value], int]
+
+# A stack-allocated tuple, as the i8* and size in bytes its lifetime markers take.
+type StackSlot = tuple[ir.Value, int]
+
+# Heap tuples are bump-allocated from an arena that grows by chunks of at least this many bytes. Each chunk starts with
+# a header holding the previous chunk and the chunk's own size.
+ARENA_CHUNK_BYTES = 1 << 20
+ARENA_HEADER_BYTES = 16
+
+# Running totals kept by the arena, in the order `execute.ArenaStatistics` reads them. Only the collector emitted for
+# `--gc` ever collects; the plain arena leaves that counter at zero.
+ARENA_COUNTERS = ("_arena_bytes", "_arena_allocations", "_arena_chunks", "_arena_collections")
+
+# A chain of at least this many tests of one variable against integer constants is lowered to a `switch`, which LLVM
+# turns into a jump table when the constants are dense enough.
+SWITCH_CASES = 3
+
+# Booleans as tagged under `--gc`, where unit is tagged as false.
+TRUE = ir.Constant(i64, 3)
+FALSE = ir.Constant(i64, 1)
+
+# Under `--gc` each heap tuple is preceded by a header word, `fields << 1 | 1`, which the collector overwrites with the
+# tuple's new (even) address once it has copied it.
+GC_HEADER_BYTES = 8
+
+
+@dataclass(frozen=True)
+class Frame:
+    """A function's shadow-stack frame under `--gc`, an array of i64 slots on the native stack.
+
+    Slot 0 links to the caller's frame and slot 1 holds the number of slots after it. Those hold every variable the
+    function binds, and the fields of every tuple it stack-allocates, so the collector can find the heap tuples they
+    point to and update them when it moves them. Variables are therefore loaded from their slots at each use.
+    """
+
+    base: ir.Value
+    slots: Iterator[int]
+
+    def slot(
+        self,
+        builder: ir.IRBuilder,
+    ) -> ir.Value:
+        return builder.gep(self.base, [ir.Constant(i64, next(self.slots))])  # type: ignore
+
+    def bind(
+        self,
+        value: ir.Value,
+        builder: ir.IRBuilder,
+    ) -> ir.Value:
+        slot = self.slot(builder)
+        builder.store(value, slot)
+        return slot
+
 
 def lower(
     program: Program,
+    gc: bool = False,
 ) -> ir.Module:
+    """Lower a program to an LLVM module.
+
+    With `gc`, heap tuples are garbage collected rather than held until the run ends: integers, booleans and unit are
+    tagged as `n << 1 | 1`, so the collector can tell them from pointers, and every function keeps its variables in a
+    shadow-stack `Frame`. The entry points tag the program's arguments and untag its result.
+    """
     module = ir.Module()
 
     # Declare external functions.
-    ir.Function(module, ir.FunctionType(i64.as_pointer(), [i64]), "malloc")
     atoi = ir.Function(module, ir.FunctionType(i64, [ir.IntType(8).as_pointer()]), "atoi")
+    reset = lower_collector(module) if gc else lower_runtime(module)
 
-    # Lower each defined function in the program.
+    # Declare every defined function before lowering any, since each can call any other directly.
+    functions = {}
+    for name, abs in program.functions.items():
+        functions[name] = ir.Function(module, ir.FunctionType(i64, [i64 for _ in abs.parameters]), name)  # type: ignore
+        functions[name].calling_convention = "tailcc"
     for name, abs in program.functions.items():
-        fun = ir.Function(module, ir.FunctionType(i64, [i64 for _ in abs.parameters]), name)  # type: ignore
-        fun.calling_convention = "tailcc"
-        env = {p: v for p, v in zip(abs.parameters, fun.args, strict=True)}
-        lower_statement(abs.body, env, ir.IRBuilder(fun.append_basic_block()))
+        lower_body(functions[name], abs.parameters, abs.body, gc)
 
     # Lower the main program body.
     start = ir.Function(module, ir.FunctionType(i64, [i64 for _ in program.parameters]), "_start")  # type: ignore
     start.calling_convention = "tailcc"
-    env = {p: a for p, a in zip(program.parameters, start.args, strict=True)}
-    lower_statement(program.body, env, ir.IRBuilder(start.append_basic_block()))
-
+    lower_body(start, program.parameters, program.body, gc)
+
+    def run(
+        builder: ir.IRBuilder,
+        arguments: Sequence[ir.Value],
+    ) -> ir.Value:
+        if gc:
+            arguments = [tag(argument, builder) for argument in arguments]
+        result = builder.call(start, arguments, cconv="tailcc")  # type: ignore
+        return untag(result, builder) if gc else result
+
+    # Every entry point releases the run's heap once the program returns.
     main = ir.Function(module, ir.FunctionType(i64, [i64, ir.IntType(8).as_pointer().as_pointer()]), "main")
     builder = ir.IRBuilder(main.append_basic_block())
     _argc, argv = main.args
-    builder.ret(  # type:ignore
-        builder.call(  # type:ignore
-            start,
-            [
-                builder.call(atoi, [builder.load(builder.gep(argv, [ir.Constant(i64, i + 1)]))])
-                for i, _ in enumerate(program.parameters)
-            ],
-        )
+    result = run(
+        builder,
+        [
+            builder.call(atoi, [builder.load(builder.gep(argv, [ir.Constant(i64, i + 1)]))])
+            for i, _ in enumerate(program.parameters)
+        ],
+    )
+    builder.call(reset, [])
+    builder.ret(result)  # type:ignore
+
+    # A C-callable entry point taking the program's arguments as native integers, so a host can skip argv parsing.
+    entry = ir.Function(module, ir.FunctionType(i64, [i64.as_pointer()]), "_entry")
+    builder = ir.IRBuilder(entry.append_basic_block())
+    (arguments,) = entry.args
+    result = run(
+        builder, [builder.load(builder.gep(arguments, [ir.Constant(i64, i)])) for i, _ in enumerate(program.parameters)]
     )
+    builder.call(reset, [])
+    builder.ret(result)  # type:ignore
+
+    lower_batch(module, run, reset, len(program.parameters))
     return module
 
 
+def lower_body(
+    function: ir.Function,
+    parameters: Sequence[str],
+    body: Expression,
+    gc: bool,
+) -> None:
+    """Lower a function's body; under `gc`, first push its frame and store its arguments there."""
+    builder = ir.IRBuilder(function.append_basic_block())
+    if not gc:
+        env = {p: a for p, a in zip(parameters, function.args, strict=True)}
+        return lower_statement(body, env, builder, booleans=boolean_variables(body))
+
+    size = len(parameters) + frame_size(body)
+    slots = builder.alloca(ir.ArrayType(i64, size + 2))  # type: ignore
+    builder.store(
+        ir.Constant(ir.ArrayType(i64, size + 2), None), slots
+    )  # nothing in a fresh frame looks like a pointer
+    frame = Frame(builder.bitcast(slots, i64.as_pointer()), count())  # type: ignore
+    top = builder.module.get_global("_gc_top")
+    builder.store(builder.load(top), frame.slot(builder))  # type: ignore
+    builder.store(ir.Constant(i64, size), frame.slot(builder))
+    builder.store(builder.ptrtoint(frame.base, i64), top)  # type: ignore
+    env = {p: frame.bind(a, builder) for p, a in zip(parameters, function.args, strict=True)}
+    lower_statement(body, env, builder, frame=frame)
+
+
+def boolean_variables(
+    body: Expression,
+) -> set[str]:
+    """The variables of a function body that only ever hold booleans: those bound to comparisons or boolean constants,
+    copies of them, and the parameters of join points and loops every jump to which passes one."""
+    # What each variable may be bound to: an atom, or None for any other value.
+    sources: dict[str, list[Atom | None]] = {}
+    parameters: dict[str, Sequence[str]] = {}
+    stack = [body]
+    while stack:
+        match stack.pop():
+            case Let(name, LessThan() | EqualTo() | GreaterThanOrEqualTo(), next):
+                sources.setdefault(name, []).append(Bool(True))
+                stack.append(next)
+            case Let(name, Copy(value), next):
+                sources.setdefault(name, []).append(value)
+                stack.append(next)
+            case Let(name, _, next):
+                sources.setdefault(name, []).append(None)
+                stack.append(next)
+            case If(_, then, otherwise):
+                stack.extend([then, otherwise])
+            case Join(name, names, join, next):
+                parameters[name] = names
+                stack.extend([join, next])
+            case Loop(name, names, arguments, loop):
+                parameters[name] = names
+                for parameter, argument in zip(names, arguments):
+                    sources.setdefault(parameter, []).append(argument)
+                stack.append(loop)
+            case Jump(target, arguments):
+                for parameter, argument in zip(parameters[target], arguments):
+                    sources.setdefault(parameter, []).append(argument)
+            case _:
+                pass
+
+    # Optimistically every variable, less those some source shows may hold anything else, until none is left.
+    booleans = set(sources)
+    changed = True
+    while changed:
+        changed = False
+        for name in list(booleans):
+            if not all(isinstance(v, Bool) or (isinstance(v, Var) and v.name in booleans) for v in sources[name]):
+                booleans.discard(name)
+                changed = True
+    return booleans
+
+
+def frame_size(
+    statement: Expression,
+) -> int:
+    """The number of frame slots a function body binds: one per variable, plus one per stack-allocated tuple field."""
+    match statement:
+        case Let(_, Alloca(components), next):
+            return 1 + len(components) + frame_size(next)
+        case Let(_, Global(), next):
+            return frame_size(next)
+        case Let(_, _, next):
+            return 1 + frame_size(next)
+        case If(_, then, otherwise):
+            return frame_size(then) + frame_size(otherwise)
+        case Join(_, parameters, body, next):
+            return len(parameters) + frame_size(body) + frame_size(next)
+        case Loop(_, parameters, _, body):
+            return len(parameters) + frame_size(body)
+        case _:
+            return 0
+
+
+def pop_frame(
+    frame: Frame,
+    builder: ir.IRBuilder,
+) -> None:
+    """Unlink a frame from the shadow stack, before its function returns or tail-calls."""
+    builder.store(builder.load(frame.base), builder.module.get_global("_gc_top"))  # type: ignore
+
+
+def widen(
+    flag: ir.Value,
+    builder: ir.IRBuilder,
+    frame: Frame | None = None,
+) -> ir.Value:
+    """An i1 as the i64 boolean it stands for, tagged under `--gc`."""
+    value = builder.zext(flag, typ=i64)  # type: ignore
+    return value if frame is None else tag(value, builder)
+
+
+def tag(
+    value: ir.Value,
+    builder: ir.IRBuilder,
+) -> ir.Value:
+    return builder.or_(builder.shl(value, ir.Constant(i64, 1)), ir.Constant(i64, 1))  # type: ignore
+
+
+def untag(
+    value: ir.Value,
+    builder: ir.IRBuilder,
+) -> ir.Value:
+    return builder.ashr(value, ir.Constant(i64, 1))  # type: ignore
+
+
+def lower_runtime(
+    module: ir.Module,
+) -> ir.Function:
+    """Emit the arena allocator heap tuples come from and return its `_arena_reset`.
+
+    `_arena_alloc(size)` bumps a pointer through the current chunk and falls back to `_arena_refill`, which mallocs a
+    new chunk, when the request does not fit. `_arena_reset()` frees every chunk but the first and rewinds into it, so
+    a program run over and over reuses the same memory.
+    """
+    i8_pointer = ir.IntType(8).as_pointer()
+    malloc = ir.Function(module, ir.FunctionType(i64.as_pointer(), [i64]), "malloc")
+    free = ir.Function(module, ir.FunctionType(ir.VoidType(), [i8_pointer]), "free")
+
+    cursor, end, chunk = (runtime_variable(module, name) for name in ["_arena_next", "_arena_end", "_arena_chunk"])
+    total, allocations, chunks, _collections = (runtime_variable(module, name) for name in ARENA_COUNTERS)
+
+    # _arena_refill(size): start a new chunk, big enough for `size`, and allocate from it.
+    refill = ir.Function(module, ir.FunctionType(i64.as_pointer(), [i64]), "_arena_refill")
+    refill.attributes.add("noinline")
+    (size,) = refill.args
+    builder = ir.IRBuilder(refill.append_basic_block())
+    needed = builder.add(size, ir.Constant(i64, ARENA_HEADER_BYTES))
+    minimum = ir.Constant(i64, ARENA_CHUNK_BYTES)
+    capacity = builder.select(builder.icmp_unsigned(">", needed, minimum), needed, minimum)
+    header = builder.call(malloc, [capacity])
+    builder.store(builder.load(chunk), header)
+    builder.store(capacity, builder.gep(header, [ir.Constant(i64, 1)]))
+    base = builder.ptrtoint(header, i64)
+    builder.store(base, chunk)
+    increment(builder, chunks, ir.Constant(i64, 1))
+    data = builder.add(base, ir.Constant(i64, ARENA_HEADER_BYTES))
+    builder.store(builder.add(data, size), cursor)
+    builder.store(builder.add(base, capacity), end)
+    builder.ret(builder.inttoptr(data, i64.as_pointer()))
+
+    # _arena_alloc(size): the fast path, a bounds check and a bump.
+    alloc = ir.Function(module, ir.FunctionType(i64.as_pointer(), [i64]), "_arena_alloc")
+    (size,) = alloc.args
+    builder = ir.IRBuilder(alloc.append_basic_block())
+    increment(builder, total, size)
+    increment(builder, allocations, ir.Constant(i64, 1))
+    pointer = builder.load(cursor)
+    bumped = builder.add(pointer, size)
+    with builder.if_then(builder.icmp_unsigned(">", bumped, builder.load(end)), likely=False):
+        builder.ret(builder.call(refill, [size]))
+    builder.store(bumped, cursor)
+    builder.ret(builder.inttoptr(pointer, i64.as_pointer()))
+
+    # _arena_reset(): free chunks newest first, keeping the first one, and start allocating from its beginning again.
+    reset = ir.Function(module, ir.FunctionType(ir.VoidType(), []), "_arena_reset")
+    reset.attributes.add("noinline")
+    entry, loop, release, keep, done = (
+        reset.append_basic_block(name) for name in ["entry", "loop", "free", "keep", "done"]
+    )
+    builder = ir.IRBuilder(entry)
+    first = builder.load(chunk)
+    builder.branch(loop)
+
+    builder.position_at_end(loop)
+    current = builder.phi(i64)
+    current.add_incoming(first, entry)
+    header = builder.inttoptr(current, i64.as_pointer())
+    builder.cbranch(builder.icmp_unsigned("==", current, ir.Constant(i64, 0)), done, release)
+
+    builder.position_at_end(release)
+    previous = builder.load(header)
+    with builder.if_then(builder.icmp_unsigned("==", previous, ir.Constant(i64, 0))):
+        builder.branch(keep)
+    builder.call(free, [builder.bitcast(header, i8_pointer)])
+    current.add_incoming(previous, builder.block)
+    builder.branch(loop)
+
+    builder.position_at_end(keep)
+    builder.store(current, chunk)
+    builder.store(builder.add(current, ir.Constant(i64, ARENA_HEADER_BYTES)), cursor)
+    builder.store(builder.add(current, builder.load(builder.gep(header, [ir.Constant(i64, 1)]))), end)
+    builder.ret_void()
+
+    builder.position_at_end(done)
+    builder.ret_void()
+    return reset
+
+
+def lower_collector(
+    module: ir.Module,
+) -> ir.Function:
+    """Emit the copying collector heap tuples come from under `--gc` and return its `_arena_reset`.
+
+    The heap is two equal semispaces, the current one bump-allocated like the arena's chunks. `_arena_alloc(size)`
+    writes the tuple's header and falls back to `_gc_collect` when the current space is full, which copies every tuple
+    reachable from the shadow stack into the other space (Cheney's algorithm) and swaps the two. When the survivors
+    fill more than half a space, both are replaced by spaces twice as big, so memory stays proportional to the live
+    data however much a program allocates. `_arena_reset()` empties the current space and keeps both.
+    """
+    i8_pointer = ir.IntType(8).as_pointer()
+    malloc = ir.Function(module, ir.FunctionType(i64.as_pointer(), [i64]), "malloc")
+    free = ir.Function(module, ir.FunctionType(ir.VoidType(), [i8_pointer]), "free")
+    copy = module.declare_intrinsic("llvm.memcpy", [i8_pointer, i8_pointer, i64])
+
+    cursor, end, space = (runtime_variable(module, name) for name in ["_arena_next", "_arena_end", "_arena_chunk"])
+    total, allocations, chunks, collections = (runtime_variable(module, name) for name in ARENA_COUNTERS)
+    # The other semispace and the size of each, the innermost frame, and the end of the copies made so far.
+    spare, size, top, copied = (
+        runtime_variable(module, name) for name in ["_gc_spare", "_gc_size", "_gc_top", "_gc_copied"]
+    )
+    zero, one, header_bytes = ir.Constant(i64, 0), ir.Constant(i64, 1), ir.Constant(i64, GC_HEADER_BYTES)
+
+    def word(
+        builder: ir.IRBuilder,
+        address: ir.Value,
+        i: int | ir.Value,
+    ) -> ir.Value:
+        base = builder.inttoptr(address, i64.as_pointer())
+        return builder.gep(base, [ir.Constant(i64, i) if isinstance(i, int) else i])  # type: ignore
+
+    # _gc_forward(slot): if the slot holds a pointer into the current space, copy the tuple it points to (unless that
+    # was done already) and point the slot at the copy.
+    forward = ir.Function(module, ir.FunctionType(ir.VoidType(), [i64.as_pointer()]), "_gc_forward")
+    (slot,) = forward.args
+    entry, heap, move, done = (forward.append_basic_block(name) for name in ["entry", "heap", "move", "done"])
+    builder = ir.IRBuilder(entry)
+    value = builder.load(slot)
+    pointer = builder.and_(
+        builder.icmp_unsigned("==", builder.and_(value, one), zero),
+        builder.and_(
+            builder.icmp_unsigned(">=", value, builder.load(space)),
+            builder.icmp_unsigned("<", value, builder.load(end)),
+        ),
+    )
+    builder.cbranch(pointer, heap, done)
+
+    builder.position_at_end(heap)
+    original = builder.sub(value, header_bytes)
+    header = builder.load(word(builder, original, 0))
+    with builder.if_then(builder.icmp_unsigned("==", builder.and_(header, one), zero)):
+        builder.store(header, slot)  # already copied: the header is the copy's address
+        builder.branch(done)
+    builder.branch(move)
+
+    builder.position_at_end(move)
+    length = builder.add(builder.lshr(header, ir.Constant(i64, 1)), one)
+    bytes = builder.mul(length, ir.Constant(i64, 8))
+    target = builder.load(copied)
+    builder.call(
+        copy,
+        [builder.inttoptr(target, i8_pointer), builder.inttoptr(original, i8_pointer), bytes, ir.Constant(i1, False)],
+    )
+    moved = builder.add(target, header_bytes)
+    builder.store(moved, word(builder, original, 0))
+    builder.store(builder.add(target, bytes), copied)
+    builder.store(moved, slot)
+    builder.branch(done)
+
+    builder.position_at_end(done)
+    builder.ret_void()
+
+    # _gc_evacuate(to): copy everything reachable from the shadow stack into the space at `to` and allocate from there.
+    evacuate = ir.Function(module, ir.FunctionType(ir.VoidType(), [i64]), "_gc_evacuate")
+    (to,) = evacuate.args
+    entry, frames, frame, roots, root, next_frame, scan, tuple, fields, field, next_tuple, done = (
+        evacuate.append_basic_block(name)
+        for name in [
+            "entry",
+            "frames",
+            "frame",
+            "roots",
+            "root",
+            "next_frame",
+            "scan",
+            "tuple",
+            "fields",
+            "field",
+            "next_tuple",
+            "done",
+        ]
+    )
+    builder = ir.IRBuilder(entry)
+    builder.store(to, copied)
+    first = builder.load(top)
+    builder.branch(frames)
+
+    # The roots: every slot of every frame on the shadow stack.
+    builder.position_at_end(frames)
+    current = builder.phi(i64)
+    current.add_incoming(first, entry)
+    builder.cbranch(builder.icmp_unsigned("==", current, zero), scan, frame)
+
+    builder.position_at_end(frame)
+    count = builder.load(word(builder, current, 1))
+    builder.branch(roots)
+
+    builder.position_at_end(roots)
+    i = builder.phi(i64)
+    i.add_incoming(zero, frame)
+    builder.cbranch(builder.icmp_unsigned("<", i, count), root, next_frame)
+
+    builder.position_at_end(root)
+    builder.call(forward, [word(builder, current, builder.add(i, ir.Constant(i64, 2)))])
+    i.add_incoming(builder.add(i, one), root)
+    builder.branch(roots)
+
+    builder.position_at_end(next_frame)
+    current.add_incoming(builder.load(word(builder, current, 0)), next_frame)
+    builder.branch(frames)
+
+    # Then every field of every copy, in the order they were made, until the copies catch up with the scan.
+    builder.position_at_end(scan)
+    scanned = builder.phi(i64)
+    scanned.add_incoming(to, frames)
+    builder.cbranch(builder.icmp_unsigned("<", scanned, builder.load(copied)), tuple, done)
+
+    builder.position_at_end(tuple)
+    length = builder.lshr(builder.load(word(builder, scanned, 0)), ir.Constant(i64, 1))
+    builder.branch(fields)
+
+    builder.position_at_end(fields)
+    j = builder.phi(i64)
+    j.add_incoming(one, tuple)
+    builder.cbranch(builder.icmp_unsigned("<=", j, length), field, next_tuple)
+
+    builder.position_at_end(field)
+    builder.call(forward, [word(builder, scanned, j)])
+    j.add_incoming(builder.add(j, one), field)
+    builder.branch(fields)
+
+    builder.position_at_end(next_tuple)
+    scanned.add_incoming(builder.add(scanned, builder.mul(builder.add(length, one), ir.Constant(i64, 8))), next_tuple)
+    builder.branch(scan)
+
+    builder.position_at_end(done)
+    builder.store(to, space)
+    builder.store(builder.load(copied), cursor)
+    increment(builder, collections, one)
+    builder.ret_void()
+
+    # _gc_collect(size): the slow path of an allocation, which collects and, if that freed too little, grows the heap.
+    collect = ir.Function(module, ir.FunctionType(i64.as_pointer(), [i64]), "_gc_collect")
+    collect.attributes.add("noinline")
+    (request,) = collect.args
+    entry, swap, check, grow, allocate = (
+        collect.append_basic_block(name) for name in ["entry", "swap", "check", "grow", "allocate"]
+    )
+    builder = ir.IRBuilder(entry)
+    needed = builder.add(request, header_bytes)
+    builder.cbranch(builder.icmp_unsigned("==", builder.load(spare), zero), check, swap)  # no heap yet
+
+    builder.position_at_end(swap)
+    old = builder.load(space)
+    other = builder.load(spare)
+    builder.call(evacuate, [other])
+    builder.store(builder.add(other, builder.load(size)), end)
+    builder.store(old, spare)
+    builder.branch(check)
+
+    builder.position_at_end(check)
+    occupied = builder.add(builder.sub(builder.load(cursor), builder.load(space)), needed)
+    capacity = builder.load(size)
+    builder.cbranch(builder.icmp_unsigned(">", builder.mul(occupied, ir.Constant(i64, 2)), capacity), grow, allocate)
+
+    builder.position_at_end(grow)
+    wanted = builder.mul(
+        builder.select(builder.icmp_unsigned(">", occupied, capacity), occupied, capacity), ir.Constant(i64, 2)
+    )
+    minimum = ir.Constant(i64, ARENA_CHUNK_BYTES)
+    grown = builder.select(builder.icmp_unsigned(">", wanted, minimum), wanted, minimum)
+    builder.call(free, [builder.inttoptr(builder.load(spare), i8_pointer)])
+    old = builder.load(space)
+    bigger = builder.ptrtoint(builder.call(malloc, [grown]), i64)
+    builder.call(evacuate, [bigger])
+    builder.store(builder.add(bigger, grown), end)
+    builder.call(free, [builder.inttoptr(old, i8_pointer)])
+    builder.store(builder.ptrtoint(builder.call(malloc, [grown]), i64), spare)
+    builder.store(grown, size)
+    increment(builder, chunks, ir.Constant(i64, 2))
+    builder.branch(allocate)
+
+    builder.position_at_end(allocate)
+    builder.ret(bump(builder, cursor, request))
+
+    # _arena_alloc(size): the fast path, as for the arena.
+    alloc = ir.Function(module, ir.FunctionType(i64.as_pointer(), [i64]), "_arena_alloc")
+    (request,) = alloc.args
+    builder = ir.IRBuilder(alloc.append_basic_block())
+    increment(builder, total, request)
+    increment(builder, allocations, one)
+    bumped = builder.add(builder.add(builder.load(cursor), request), header_bytes)
+    with builder.if_then(builder.icmp_unsigned(">", bumped, builder.load(end)), likely=False):
+        builder.ret(builder.call(collect, [request]))
+    builder.ret(bump(builder, cursor, request))
+
+    # _arena_reset(): everything the run allocated is garbage once it returns.
+    reset = ir.Function(module, ir.FunctionType(ir.VoidType(), []), "_arena_reset")
+    reset.attributes.add("noinline")
+    builder = ir.IRBuilder(reset.append_basic_block())
+    builder.store(builder.load(space), cursor)
+    builder.store(zero, top)
+    builder.ret_void()
+    return reset
+
+
+def bump(
+    builder: ir.IRBuilder,
+    cursor: ir.GlobalVariable,
+    size: ir.Value,
+) -> ir.Value:
+    """Allocate a collected tuple of `size` bytes at the cursor, which must have room for it, and write its header."""
+    start = builder.load(cursor)  # type: ignore
+    builder.store(builder.add(builder.add(start, size), ir.Constant(i64, GC_HEADER_BYTES)), cursor)  # type: ignore
+    header = builder.or_(builder.lshr(size, ir.Constant(i64, 2)), ir.Constant(i64, 1))  # fields << 1 | 1
+    builder.store(header, builder.inttoptr(start, i64.as_pointer()))  # type: ignore
+    return builder.inttoptr(builder.add(start, ir.Constant(i64, GC_HEADER_BYTES)), i64.as_pointer())  # type: ignore
+
+
+def runtime_variable(
+    module: ir.Module,
+    name: str,
+) -> ir.GlobalVariable:
+    """An i64 global of the runtime's, starting at zero."""
+    variable = ir.GlobalVariable(module, i64, name)
+    variable.initializer = ir.Constant(i64, 0)
+    return variable
+
+
+def increment(
+    builder: ir.IRBuilder,
+    counter: ir.GlobalVariable,
+    amount: ir.Value,
+) -> None:
+    builder.store(builder.add(builder.load(counter), amount), counter)  # type: ignore
+
+
+def lower_batch(
+    module: ir.Module,
+    run: Callable[[ir.IRBuilder, Sequence[ir.Value]], ir.Value],
+    reset: ir.Function,
+    arity: int,
+) -> None:
+    """Emit `_batch(inputs, outputs, rows)`, which runs the program once per row of a row-major `rows` x `arity`
+    table of arguments and stores each result in `outputs`, so a host can evaluate a whole table in one call. The
+    arena is reset after every row."""
+    batch = ir.Function(module, ir.FunctionType(ir.VoidType(), [i64.as_pointer(), i64.as_pointer(), i64]), "_batch")
+    inputs, outputs, rows = batch.args
+    entry, loop, body, done = (batch.append_basic_block(name) for name in ["entry", "loop", "body", "done"])
+    builder = ir.IRBuilder(entry)
+    builder.branch(loop)
+
+    builder.position_at_end(loop)
+    row = builder.phi(i64)
+    row.add_incoming(ir.Constant(i64, 0), entry)
+    builder.cbranch(builder.icmp_signed("<", row, rows), body, done)
+
+    builder.position_at_end(body)
+    base = builder.mul(row, ir.Constant(i64, arity))
+    arguments = [builder.load(builder.gep(inputs, [builder.add(base, ir.Constant(i64, i))])) for i in range(arity)]
+    builder.store(run(builder, arguments), builder.gep(outputs, [row]))  # type: ignore
+    builder.call(reset, [])
+    row.add_incoming(builder.add(row, ir.Constant(i64, 1)), body)
+    builder.branch(loop)
+
+    builder.position_at_end(done)
+    builder.ret_void()
+
+
 def lower_statement(
     statement: Expression,  # In our uniform representation our body is an expression.
     env: Mapping[str, ir.Value],
     builder: ir.IRBuilder,
+    joins: Mapping[str, JoinPoint] = {},
+    slots: Sequence[StackSlot] = (),
+    frame: Frame | None = None,
+    booleans: AbstractSet[str] = frozenset(),
 ) -> None:
-    atom = partial(lower_atom, env=env, builder=builder)
-    recur = partial(lower_statement, env=env, builder=builder)
-    expr = partial(lower_expression, env=env, builder=builder)
+    """Lower a function body. The parameters of join points and loops in `booleans` are i1 phis (never under `--gc`,
+    where parameters live in frame slots)."""
+    atom = partial(lower_atom, env=env, builder=builder, frame=frame)
+    flag = partial(lower_flag, env=env, builder=builder, frame=frame)
+    recur = partial(lower_statement, env=env, builder=builder, joins=joins, slots=slots, frame=frame, booleans=booleans)
+    expr = partial(lower_expression, env=env, builder=builder, frame=frame)
+
+    def phi(
+        parameter: str,
+    ) -> ir.PhiInstr:
+        return builder.phi(i1 if parameter in booleans else i64, parameter)  # type: ignore
 
     match statement:
+        # A variable bound to a function holds the function itself, so calls through it are direct and its address is
+        # a constant (which, never pointing into the heap, needs no frame slot under --gc).
+        case Let(name, Global(function), next):
+            return recur(next, env={**env, name: builder.module.get_global(function)})
+
+        # A chain of tests of one variable against integer constants (what `match` compiles to) is a single switch. In
+        # each case the tests made before it are known to be false and its own true, so none of them are computed.
+        case Let(_, EqualTo(Var(), Int()), If()) if len((chain := switch_chain(statement))[1]) >= SWITCH_CASES:
+            scrutinee, cases, default = chain
+            false, true = ir.Constant(i1, False), ir.Constant(i1, True)
+            otherwise = builder.append_basic_block("default")
+            switch = builder.switch(atom(Var(scrutinee)), otherwise)  # type: ignore
+            tests = [test for test, _, _ in cases]
+            for i, (test, value, then) in enumerate(cases):
+                block = builder.append_basic_block("case")
+                switch.add_case(atom(Int(value)), block)
+                builder.position_at_end(block)
+                recur(then, env={**env, **dict.fromkeys(tests[:i], false), test: true})
+            builder.position_at_end(otherwise)
+            recur(default, env={**env, **dict.fromkeys(tests, false)})
+
+        # Booleans are i1s, which never point into the heap, so they need no frame slot under --gc.
+        case Let(name, LessThan() | EqualTo() | GreaterThanOrEqualTo() | Copy(Bool()) as value, next):
+            return recur(next, env={**env, name: flag(value)})
+
+        case Let(name, Copy(Var(x)), next) if env[x].type == i1:
+            return recur(next, env={**env, name: env[x]})
+
+        # Under --gc a stack-allocated tuple is a run of frame slots, so the collector sees its fields.
+        case Let(name, Alloca(components), next) if frame is not None:
+            fields = [frame.slot(builder) for _ in components]
+            for field, component in zip(fields, components):
+                builder.store(atom(component), field)
+            value = builder.ptrtoint(fields[0], typ=i64) if fields else ir.Constant(i64, 0)  # type: ignore
+            return recur(next, env={**env, name: frame.bind(value, builder)})
+
+        case Let(name, value, next) if frame is not None:
+            return recur(next, env={**env, name: frame.bind(expr(value), builder)})
+
+        # The slot is allocated once, in the entry block, and its lifetime starts each time the tuple is built.
+        case Let(name, Alloca(components), next):
+            size = len(components) * 8
+            with builder.goto_block(builder.function.entry_basic_block):  # type: ignore
+                slot = builder.alloca(ir.ArrayType(i64, len(components)))  # type: ignore
+            marker = builder.bitcast(slot, ir.IntType(8).as_pointer())  # type: ignore
+            builder.call(lifetime(builder.module, "start"), [ir.Constant(i64, size), marker])  # type: ignore
+            base = builder.bitcast(slot, i64.as_pointer())  # type: ignore
+            for i, component in enumerate(components):
+                builder.store(value=atom(component), ptr=builder.gep(base, [ir.Constant(i64, i)]))  # type: ignore
+            value = builder.ptrtoint(base, typ=i64)  # type: ignore
+            return recur(next, env={**env, name: value}, slots=[*slots, (marker, size)])
+
         case Let(name, value, next):
             return recur(next, env={**env, name: expr(value)})
 
         case If(condition, then, otherwise):
-            with builder.if_else(builder.trunc(atom(condition), i1)) as (
+            with builder.if_else(flag(condition)) as (
                 ifTrue,
                 ifFalse,
             ):  # type: ignore
@@ -95,78 +743,186 @@ def lower_statement(
             builder.unreachable()
 
         case Apply(callee, arguments):
+            fn = function_pointer(callee, len(arguments), env, builder, frame)
+            values = [atom(argument) for argument in arguments]
+            end_lifetimes(slots, builder)
+            if frame is not None:
+                pop_frame(frame, builder)
             builder.ret(  # type: ignore
                 builder.call(  # type: ignore
-                    fn=builder.inttoptr(  # type: ignore
-                        atom(callee),
-                        ir.FunctionType(i64, [i64 for _ in arguments]).as_pointer(),
-                    ),
-                    args=[atom(argument) for argument in arguments],
-                    tail="musttail",  # type: ignore
+                    fn=fn,
+                    args=values,
+                    tail="tail",  # guaranteed under tailcc, even when caller and callee differ in arity
                     cconv="tailcc",
                 )
             )
 
-        case Halt(value):  # pragma: no branch
-            builder.ret(atom(value))  # type: ignore
+        case Halt(value):
+            result = atom(value)
+            end_lifetimes(slots, builder)
+            if frame is not None:
+                pop_frame(frame, builder)
+            builder.ret(result)  # type: ignore
+
+        # Under --gc, parameters live in frame slots that every jump stores its arguments to, instead of in phis.
+        case Join(name, parameters, body, next):
+            block = builder.append_basic_block(name)
+            if frame is None:
+                with builder.goto_block(block):
+                    phis = [phi(parameter) for parameter in parameters]
+            else:
+                phis = [frame.slot(builder) for _ in parameters]
+            recur(next, joins={**joins, name: (block, phis, len(slots))})
+            builder.position_at_end(block)
+            recur(body, env={**env, **dict(zip(parameters, phis))})
+
+        case Jump(target, arguments):
+            block, phis, live = joins[target]
+            values = [
+                flag(argument) if p.type == i1 else atom(argument) for p, argument in zip(phis, arguments, strict=True)
+            ]
+            end_lifetimes(slots[live:], builder)
+            for phi, value in zip(phis, values, strict=True):
+                if frame is None:
+                    phi.add_incoming(value, builder.block)  # type: ignore
+                else:
+                    builder.store(value, phi)
+            builder.branch(block)
+
+        # The loop header holds a phi per loop-carried variable; jumps back to it from the body are the latches.
+        case Loop(name, parameters, arguments, body):  # pragma: no branch
+            values = [
+                flag(argument) if frame is None and parameter in booleans else atom(argument)
+                for parameter, argument in zip(parameters, arguments, strict=True)
+            ]
+            entry = builder.block
+            header = builder.append_basic_block(name)
+            if frame is not None:
+                phis = [frame.bind(value, builder) for value in values]
+                builder.branch(header)
+                builder.position_at_end(header)
+            else:
+                builder.branch(header)
+                builder.position_at_end(header)
+                phis = [phi(parameter) for parameter in parameters]
+                for p, value in zip(phis, values, strict=True):
+                    p.add_incoming(value, entry)
+            recur(
+                body,
+                env={**env, **dict(zip(parameters, phis))},
+                joins={**joins, name: (header, phis, len(slots))},
+            )
         case _:
             pass
 
 
+def switch_chain(
+    statement: Expression,
+) -> tuple[str, Sequence[tuple[str, int, Expression]], Expression]:
+    """The variable a chain of `Let(test, EqualTo(Var(x), Int(k)), If(Var(test), then, ...))` compares, each test's
+    name, constant and consequent, and what the chain does when every test fails.
+
+    The chain stops at the first comparison with another variable, or with a constant already tested.
+    """
+    scrutinee = None
+    cases: list[tuple[str, int, Expression]] = []
+    while True:
+        match statement:
+            case Let(test, EqualTo(Var(x), Int(value)), If(Var(condition), then, otherwise)) if (
+                test == condition and x != test and scrutinee in (None, x) and value not in [k for _, k, _ in cases]
+            ):
+                scrutinee = x
+                cases.append((test, value, then))
+                statement = otherwise
+            case _:
+                return scrutinee or "", cases, statement
+
+
+def lifetime(
+    module: ir.Module,
+    marker: str,
+) -> ir.Function:
+    """The `llvm.lifetime.start` or `llvm.lifetime.end` intrinsic, declared on first use."""
+    name = f"llvm.lifetime.{marker}.p0i8"
+    if name in module.globals:
+        return module.globals[name]
+    return ir.Function(module, ir.FunctionType(ir.VoidType(), [i64, ir.IntType(8).as_pointer()]), name)
+
+
+def end_lifetimes(
+    slots: Sequence[StackSlot],
+    builder: ir.IRBuilder,
+) -> None:
+    for marker, size in reversed(slots):
+        builder.call(lifetime(builder.module, "end"), [ir.Constant(i64, size), marker])  # type: ignore
+
+
 def lower_expression(
     expression: Expression,
     env: Mapping[str, ir.Value],
     builder: ir.IRBuilder,
+    frame: Frame | None = None,
 ) -> ir.Value:
     # If the expression is an Atom, lower it directly.
     if isinstance(expression, (Int, Var, Bool, Unit)):
-        return lower_atom(expression, env, builder)
-    atom = partial(lower_atom, env=env, builder=builder)
-
+        return lower_atom(expression, env, builder, frame)
+    atom = partial(lower_atom, env=env, builder=builder, frame=frame)
+    one = ir.Constant(i64, 1)
+
+    def index(
+        i: Atom,
+    ) -> ir.Value:
+        match i:
+            case Int(n):
+                return ir.Constant(i64, n)
+            case _:
+                return atom(i) if frame is None else untag(atom(i), builder)
+
+    # Tagged operands (2a + 1 and 2b + 1) need their tags adjusted, or removed, around the native instruction.
     match expression:
         case Add(x, y):
-            return builder.add(atom(x), atom(y))  # type: ignore
+            total = builder.add(atom(x), atom(y))  # type: ignore
+            return total if frame is None else builder.sub(total, one)  # type: ignore
 
         case Subtract(x, y):
-            return builder.sub(atom(x), atom(y))  # type: ignore
+            difference = builder.sub(atom(x), atom(y))  # type: ignore
+            return difference if frame is None else builder.add(difference, one)  # type: ignore
 
         case Multiply(x, y):
-            return builder.mul(atom(x), atom(y))  # type: ignore
+            if frame is None:
+                return builder.mul(atom(x), atom(y))  # type: ignore
+            return builder.add(builder.mul(untag(atom(x), builder), builder.sub(atom(y), one)), one)  # type: ignore
 
         case Div(x, y):
-            return builder.sdiv(atom(x), atom(y))  # type: ignore
-
-        case LessThan(x, y):
-            return builder.zext(builder.icmp_signed("<", atom(x), atom(y)), typ=i64)  # type: ignore
+            if frame is None:
+                return builder.sdiv(atom(x), atom(y))  # type: ignore
+            return tag(builder.sdiv(untag(atom(x), builder), untag(atom(y), builder)), builder)  # type: ignore
 
-        case EqualTo(x, y):
-            return builder.zext(builder.icmp_signed("==", atom(x), atom(y)), typ=i64)  # type: ignore
-
-        case GreaterThanOrEqualTo(x, y):
-            return builder.zext(builder.icmp_signed(">=", atom(x), atom(y)), typ=i64)  # type: ignore
+        case LessThan() | EqualTo() | GreaterThanOrEqualTo():
+            return widen(lower_flag(expression, env, builder, frame), builder, frame)
 
         case Tuple(xs):
-            base = builder.call(builder.module.get_global("malloc"), [ir.Constant(i64, len(xs) * 8)])  # type: ignore
+            base = builder.call(builder.module.get_global("_arena_alloc"), [ir.Constant(i64, len(xs) * 8)])  # type: ignore
 
             for i, x in enumerate(xs):
                 builder.store(value=atom(x), ptr=builder.gep(base, [ir.Constant(i64, i)]))  # type: ignore
 
             return builder.ptrtoint(base, typ=i64)  # type: ignore
 
-        case Get(base, index):
+        case Get(base, i):
             # Cast the integer base address to a pointer of type i64
             cast_ptr = builder.inttoptr(atom(base), i64.as_pointer(), "cast_ptr")
             # Compute the address of the desired element with inbounds GEP
-            gep_ptr = builder.gep(cast_ptr, [atom(index)], inbounds=True, source_etype=i64)
+            gep_ptr = builder.gep(cast_ptr, [index(i)], inbounds=True, source_etype=i64)
             # Load the value with explicit type
             return builder.load(gep_ptr, name="load_val", typ=i64)  # type: ignore
 
-        case Set(base, index, value):
+        case Set(base, i, value):
             builder.store(  # type: ignore
                 atom(value),
-                builder.gep(builder.inttoptr(atom(base), i64.as_pointer()), [atom(index)]),  # type: ignore
+                builder.gep(builder.inttoptr(atom(base), i64.as_pointer()), [index(i)]),  # type: ignore
             )
-            return ir.Constant(i64, 0)
+            return atom(Unit())
 
         case Copy(value):
             return atom(value)
@@ -174,21 +930,84 @@ def lower_expression(
         case Global(name):
             return builder.ptrtoint(builder.module.get_global(name), typ=i64)  # type: ignore
 
+        case Call(callee, arguments):
+            return builder.call(  # type: ignore
+                fn=function_pointer(callee, len(arguments), env, builder, frame),
+                args=[atom(argument) for argument in arguments],
+                cconv="tailcc",
+            )
+
+
+def function_pointer(
+    callee: Atom,
+    arity: int,
+    env: Mapping[str, ir.Value],
+    builder: ir.IRBuilder,
+    frame: Frame | None = None,
+) -> ir.Value:
+    """The function a call with `arity` arguments calls: the one `callee` is bound to, if it is known and takes that
+    many, otherwise whatever the code pointer it holds points to."""
+    match callee:
+        case Var(name) if isinstance(function := env[name], ir.Function) and len(function.args) == arity:
+            return function
+        case _:
+            return builder.inttoptr(  # type: ignore
+                lower_atom(callee, env, builder, frame),
+                ir.FunctionType(i64, [i64 for _ in range(arity)]).as_pointer(),
+            )
+
+
+def lower_flag(
+    expression: Expression,
+    env: Mapping[str, ir.Value],
+    builder: ir.IRBuilder,
+    frame: Frame | None = None,
+) -> ir.Value:
+    """A comparison, or an atom holding a boolean, as an i1."""
+    atom = partial(lower_atom, env=env, builder=builder, frame=frame)
+    match expression:
+        case LessThan(x, y):
+            return builder.icmp_signed("<", atom(x), atom(y))  # type: ignore
+        case EqualTo(x, y):
+            return builder.icmp_signed("==", atom(x), atom(y))  # type: ignore
+        case GreaterThanOrEqualTo(x, y):
+            return builder.icmp_signed(">=", atom(x), atom(y))  # type: ignore
+        case Copy(value):
+            return lower_flag(value, env, builder, frame)
+        case Bool(b):
+            return ir.Constant(i1, b)
+        case Var(name) if env[name].type == i1:
+            return env[name]
+        case _:
+            value = atom(expression)  # type: ignore
+            if frame is None:
+                return builder.trunc(value, i1)  # type: ignore
+            return builder.icmp_unsigned("!=", value, FALSE)  # type: ignore
+
 
 def lower_atom(
     atom: Atom,
     env: Mapping[str, ir.Value],
     builder: ir.IRBuilder,
+    frame: Frame | None = None,
 ) -> ir.Value:
     match atom:
         case Int(i):
-            return ir.Constant(i64, i)
+            return ir.Constant(i64, i if frame is None else i << 1 | 1)
+
+        case Var(name) if isinstance(env[name], ir.Function):
+            return env[name].ptrtoint(i64)  # type: ignore
+
+        case Var(name) if env[name].type == i1:
+            return widen(env[name], builder, frame)
 
         case Var(name):
-            return env[name]
+            return env[name] if frame is None else builder.load(env[name])  # type: ignore
 
         case Bool(b):
-            return builder.zext(ir.Constant(i1, b), typ=i64)  # type: ignore
+            if frame is not None:
+                return TRUE if b else FALSE
+            return ir.Constant(i64, int(b))
 
         case Unit():
-            return ir.Constant(i64, 0)
+            return ir.Constant(i64, 0) if frame is None else FALSE
@@ -1,59 +1,221 @@
 from llvmlite.ir import Module  # type: ignore
-from llvmlite.binding import parse_assembly, ModuleRef, PipelineTuningOptions  # type: ignore
-from parse import parse
-from simplify import simplify
-from assignment_conversion import convert_assignments
-from uniqify import uniqify
-from opt import opt
-from explicate_control import explicate_control
-from close_lambdas import close
-from hoist import hoist
-from lower import lower
-from constant_folding import constant_fold
-from value_numbering import value_numbering
-from type_inference import infer_types, TypeError as TypeInferenceError
+from llvmlite.binding import ModuleRef  # type: ignore
+from parse import parse, parse_many
+import fructose
+from compile_cache import CompileCache
+from pass_manager import PassManager, PassStatistics, default_pipeline, format_statistics, statistics_json
+from type_inference import TypeError as TypeInferenceError
+from optimize import OPTIMIZATION_LEVELS
+from emit import KINDS, emit, link
+from escape_analysis import AllocationSite, allocation_sites_json, format_allocation_sites
+from inline import INLINE_BUDGET, InlineSite, format_inline_sites, inline_sites_json
 
 from util import SequentialNameGenerator
 
 
-def compile(source: str) -> Module:
+def compile(
+    source: str,
+    statistics: list[PassStatistics] | None = None,
+    optimization_level: int = 0,
+    allocation_sites: list[AllocationSite] | None = None,
+    gc: bool = False,
+    inline_budget: int = INLINE_BUDGET,
+    inline_sites: list[InlineSite] | None = None,
+) -> Module | ModuleRef:
+    return compile_program(
+        parse(source), statistics, optimization_level, allocation_sites, gc, inline_budget, inline_sites
+    )
+
+
+def compile_program(
+    program: fructose.Program,
+    statistics: list[PassStatistics] | None = None,
+    optimization_level: int = 0,
+    allocation_sites: list[AllocationSite] | None = None,
+    gc: bool = False,
+    inline_budget: int = INLINE_BUDGET,
+    inline_sites: list[InlineSite] | None = None,
+) -> Module | ModuleRef:
+    """Run the whole pipeline; when `statistics` is given, each pass is instrumented and its record appended.
+
+    At `optimization_level` 0 the result is the lowered `ir.Module`; above that, the module LLVM optimized. When
+    `allocation_sites` is given, escape analysis appends whether each tuple is allocated on the stack or the heap.
+    With `gc`, heap tuples are garbage collected as the program runs. Functions of up to `inline_budget` statements
+    are inlined; when `inline_sites` is given, whether each direct call was inlined is appended to it.
+    """
     fresh = SequentialNameGenerator()
-    program = parse(source)
-    # Type inference phase
+    pipeline = default_pipeline(fresh, optimization_level, allocation_sites, gc, inline_budget, inline_sites)
+    manager = PassManager(pipeline, instrument=statistics is not None)
     try:
-        infer_types(program)
+        return manager.run(program)
     except TypeInferenceError as e:
         print(f"Type error: {e}")
         exit(1)
-    program = simplify(program, fresh)
-    program = convert_assignments(program)
-    program = uniqify(program, fresh)
-    program = opt(program)
-    program = explicate_control(program, fresh)
-    program = close(program, fresh)
-    program = hoist(program, fresh)
-    program = constant_fold(program)
-    program = value_numbering(program)
-    return lower(program)
+    finally:
+        if statistics is not None:
+            statistics.extend(manager.statistics)
+
+
+def compile_to_ir(
+    source: str | fructose.Program,
+    cache: CompileCache | None = None,
+    statistics: list[PassStatistics] | None = None,
+    optimization_level: int = 0,
+    allocation_sites: list[AllocationSite] | None = None,
+    gc: bool = False,
+    inline_budget: int = INLINE_BUDGET,
+    inline_sites: list[InlineSite] | None = None,
+) -> str:
+    """Compile to textual LLVM IR, consulting `cache` (when given) before any pass runs.
+
+    Sources are keyed by their text; already-parsed programs (as from --batch) by their repr.
+    """
+
+    def build() -> str:
+        program = parse(source) if isinstance(source, str) else source
+        return str(
+            compile_program(program, statistics, optimization_level, allocation_sites, gc, inline_budget, inline_sites)
+        )
+
+    if cache is None:
+        return build()
+
+    key = cache.key(
+        source if isinstance(source, str) else repr(source),
+        {"O": optimization_level, "gc": gc, "inline": inline_budget},
+    )
+    if (cached := cache.get(key)) is not None:
+        return cached.decode()
+    text = build()
+    cache.put(key, text.encode())
+    return text
 
 
 if __name__ == "__main__":
     import argparse
+    import sys
 
     parser = argparse.ArgumentParser(prog="471c")
-    parser.add_argument("input", type=argparse.FileType("r"))
+    parser.add_argument("input", type=argparse.FileType("rb"))
     parser.add_argument("-o", "--output", type=argparse.FileType("w"), default="-")
     parser.add_argument("--run", action="store_true")
     parser.add_argument("--args", default=[], action="extend", nargs="*", type=str, help="")
+    parser.add_argument("--batch", action="store_true", help="compile every program in a file of concatenated programs")
+    parser.add_argument("--time-passes", action="store_true", help="print per-pass statistics to stderr")
+    parser.add_argument("--stats", choices=["text", "json"], help="print per-pass statistics to stderr in this format")
+    parser.add_argument(
+        "--allocation-sites",
+        choices=["text", "json"],
+        help="print whether each tuple is allocated on the stack or the heap to stderr in this format",
+    )
+    parser.add_argument("--gc", action="store_true", help="garbage collect heap tuples while the program runs")
+    parser.add_argument(
+        "--inline-budget",
+        type=int,
+        default=INLINE_BUDGET,
+        help="inline functions of up to this many statements at their call sites (0 to inline none)",
+    )
+    parser.add_argument(
+        "--inline-report",
+        choices=["text", "json"],
+        help="print whether each direct call was inlined to stderr in this format",
+    )
+    parser.add_argument("--cache-dir", help="reuse compiled output stored in this directory")
+    parser.add_argument("--cache-size", type=int, default=256, help="cache size limit in MiB")
+    parser.add_argument(
+        "-O",
+        dest="optimization_level",
+        type=int,
+        choices=OPTIMIZATION_LEVELS,
+        default=0,
+        help="LLVM optimization level",
+    )
+    parser.add_argument("--emit", choices=KINDS, default="ll", help="kind of output to write (exe and so need -o)")
     options = parser.parse_args()
+    if options.emit in ("exe", "so") and options.output is sys.stdout:
+        parser.error(f"--emit={options.emit} needs an output file (-o)")
+    if options.emit != "ll" and options.batch:
+        parser.error(f"--emit={options.emit} cannot be combined with --batch")
+    if options.time_passes and options.stats is None:
+        options.stats = "text"
+    statistics: list[PassStatistics] | None = [] if options.stats else None
+    allocation_sites: list[AllocationSite] | None = [] if options.allocation_sites else None
+    inline_sites: list[InlineSite] | None = [] if options.inline_report else None
+    cache = CompileCache(options.cache_dir, options.cache_size * 2**20) if options.cache_dir else None
 
     with options.input as input:
-        module = compile(input.read())
+        if options.batch:
+            programs = (
+                (
+                    offset,
+                    compile_to_ir(
+                        program,
+                        cache,
+                        statistics,
+                        options.optimization_level,
+                        allocation_sites,
+                        options.gc,
+                        options.inline_budget,
+                        inline_sites,
+                    ),
+                )
+                for offset, program in parse_many(input)
+            )
+        else:
+            source = input.read().decode()
+            programs = [
+                (
+                    0,
+                    compile_to_ir(
+                        source,
+                        cache,
+                        statistics,
+                        options.optimization_level,
+                        allocation_sites,
+                        options.gc,
+                        options.inline_budget,
+                        inline_sites,
+                    ),
+                )
+            ]
+
+        for offset, llvm_ir in programs:
+            match options.emit:
+                case "ll":
+                    if options.batch:
+                        print(f"; program at byte {offset}", file=options.output)
+                    print(llvm_ir, file=options.output)
+                case "asm" | "bc" | "obj":
+                    options.output.buffer.write(emit(llvm_ir, options.emit, options.optimization_level))
+                    options.output.flush()
+                case "exe" | "so":
+                    options.output.close()
+                    link(llvm_ir, options.output.name, options.emit == "so", options.optimization_level)
+
+            if statistics:
+                report = format_statistics(statistics) if options.stats == "text" else statistics_json(statistics)
+                print(report, file=sys.stderr)
+                statistics.clear()
+
+            if allocation_sites:
+                if options.allocation_sites == "text":
+                    print(format_allocation_sites(allocation_sites), file=sys.stderr)
+                else:
+                    print(allocation_sites_json(allocation_sites), file=sys.stderr)
+                allocation_sites.clear()
+
+            if inline_sites:
+                if options.inline_report == "text":
+                    print(format_inline_sites(inline_sites), file=sys.stderr)
+                else:
+                    print(inline_sites_json(inline_sites), file=sys.stderr)
+                inline_sites.clear()
 
-        print(module, file=options.output)
+            if options.run:
+                from execute import execute
 
-        if options.run:
-            from execute import execute
+                result = execute(llvm_ir, options.args)
+                print(result)
 
-            result = execute(str(module), options.args)
-            print(result)
+    if cache is not None:
+        print(f"cache: {cache.hits} hits, {cache.misses} misses", file=sys.stderr)
@@ -17,11 +17,15 @@ from lactose import (
     Get,
     Lambda,
     Copy,
+    Call,
     Set,
     Let,
     If,
     Apply,
     Halt,
+    Join,
+    Jump,
+    Loop,
 )
 
 type Atom = Union[
@@ -44,6 +48,7 @@ type Expression = Union[
     Set[Atom],
     Lambda[Statement],
     Copy[Atom],
+    Call[Atom],
 ]
 
 
@@ -52,10 +57,13 @@ type Statement = Union[
     If[Atom, Statement, Statement],
     Apply[Atom],
     Halt[Atom],
+    Join[Statement, Statement],
+    Jump[Atom],
+    Loop[Atom, Statement],
 ]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Program:
     parameters: Sequence[str]
     body: Statement
@@ -0,0 +1,274 @@
+from collections import Counter
+from collections.abc import Callable, Iterator, Mapping, Sequence
+from dataclasses import dataclass
+from typing import Union
+from fructose import PatternVar, PatternInt, PatternTrue, PatternFalse, PatternUnit, PatternWildcard, PatternCons
+import sucrose
+from sucrose import Int, Var, Unit, Tuple, Do, Let, If, EqualTo, Get, Lambda, Apply
+
+type Pattern = Union[PatternVar, PatternInt, PatternTrue, PatternFalse, PatternUnit, PatternWildcard, PatternCons]
+
+type DecisionTree = Union[Leaf, Fail, Switch, Branch, Destructure]
+
+
+@dataclass(frozen=True)
+class Leaf:
+    """Arm `arm` matched, with each of its pattern variables bound to the occurrence it names."""
+
+    arm: int
+    bindings: Mapping[str, str]
+
+
+@dataclass(frozen=True)
+class Fail:
+    """No arm matched."""
+
+
+@dataclass(frozen=True)
+class Switch:
+    """Compare an integer occurrence against each case in turn."""
+
+    occurrence: str
+    cases: Sequence[tuple[int, DecisionTree]]
+    default: DecisionTree
+
+
+@dataclass(frozen=True)
+class Branch:
+    occurrence: str
+    then: DecisionTree
+    otherwise: DecisionTree
+
+
+@dataclass(frozen=True)
+class Destructure:
+    """Bind each field of a tuple occurrence to a new occurrence."""
+
+    occurrence: str
+    fields: Sequence[str]
+    next: DecisionTree
+
+
+@dataclass(frozen=True)
+class Row:
+    patterns: Sequence[Pattern]
+    bindings: Mapping[str, str]
+    arm: int
+
+
+def compile_match(
+    scrutinee: sucrose.Expression,
+    arms: Sequence[tuple[Pattern, sucrose.Expression]],
+    fresh: Callable[[str], str],
+) -> sucrose.Expression:
+    """A `match` over simplified expressions, as a decision tree that evaluates the scrutinee once.
+
+    Each test is made once on the path it guards, however many arms depend on it: the arms still possible after a test
+    are matched against what remains of their patterns. An arm reached from more than one leaf is bound to a lambda the
+    leaves call (which `close` turns into a direct call), rather than copied into each of them. A match no arm covers
+    evaluates to unit.
+    """
+    occurrence = scrutinee.name if isinstance(scrutinee, Var) else fresh("match")
+
+    # A tuple built just to be matched is destructured as it is built: its fields are bound to variables first and
+    # matching reads those, so the tuple itself is only built if an arm binds it whole. This looks through `begin`.
+    constructed: dict[str, list[str]] = {}
+
+    def construct(
+        name: str,
+        value: sucrose.Expression,
+    ) -> list[tuple[str, sucrose.Expression]]:
+        if isinstance(value, Do):
+            return [(fresh("effect"), value.effect), *construct(name, value.value)]
+        if not isinstance(value, Tuple):
+            return [(name, value)]
+        constructed[name] = [fresh("field") for _ in value.components]
+        lets = [let for f, c in zip(constructed[name], value.components) for let in construct(f, c)]
+        return [*lets, (name, Tuple([Var(f) for f in constructed[name]]))]
+
+    scrutinees = [] if isinstance(scrutinee, Var) else construct(occurrence, scrutinee)
+    tree = decision_tree([occurrence], [Row([pattern], {}, i) for i, (pattern, _) in enumerate(arms)], fresh)
+    uses = Counter(leaf.arm for leaf in leaves(tree))
+    shared = {arm: fresh("arm") for arm, n in uses.items() if n > 1}
+    parameters = [list(dict.fromkeys(variables(pattern))) for pattern, _ in arms]
+
+    # The fields of a constructed tuple are the variables bound to its components, and the arms bind the rest.
+    sources: dict[str, str] = {}
+    bound: set[str] = set()
+
+    def source(
+        occurrence: str,
+    ) -> str:
+        return source(sources[occurrence]) if occurrence in sources else occurrence
+
+    def emit(
+        tree: DecisionTree,
+    ) -> sucrose.Expression:
+        match tree:
+            case Leaf(arm, bindings):
+                bindings = {name: source(occurrence) for name, occurrence in bindings.items()}
+                bound.update(bindings.values())
+                if arm in shared:
+                    return Apply(Var(shared[arm]), [Var(bindings[name]) for name in parameters[arm]])
+                body = arms[arm][1]
+                for name, occurrence in reversed(bindings.items()):
+                    body = Let(name, Var(occurrence), body)
+                return body
+            case Fail():
+                return Unit()
+            case Switch(occurrence, cases, default):
+                body = emit(default)
+                for value, case in reversed(cases):
+                    body = If(EqualTo(Var(source(occurrence)), Int(value)), emit(case), body)
+                return body
+            case Branch(occurrence, then, otherwise):
+                return If(Var(source(occurrence)), emit(then), emit(otherwise))
+            case Destructure(occurrence, fields, next) if source(occurrence) in constructed:
+                sources.update(zip(fields, constructed[source(occurrence)]))
+                return emit(next)
+            case Destructure(occurrence, fields, next):  # pragma: no branch
+                body = emit(next)
+                for i, field in reversed(list(enumerate(fields))):
+                    body = Let(field, Get(Var(source(occurrence)), Int(i)), body)
+                return body
+
+    body = emit(tree)
+    for arm, name in reversed(shared.items()):
+        body = Let(name, Lambda(parameters[arm], arms[arm][1]), body)
+    # Outer tuples come after the tuples they contain, so whether those are needed is known when they are reached.
+    for name, value in reversed(scrutinees):
+        if name in constructed and name not in bound:
+            continue
+        bound.update(constructed.get(name, []))
+        body = Let(name, value, body)
+    return body
+
+
+def decision_tree(
+    occurrences: Sequence[str],
+    rows: Sequence[Row],
+    fresh: Callable[[str], str],
+) -> DecisionTree:
+    """Match `rows`, in order, against the values named by `occurrences` (one per pattern column).
+
+    The tree tests the first column whose pattern in the first row can fail, so the first row either matches outright
+    or is ruled out as early as possible.
+    """
+    if not rows:
+        return Fail()
+    first = rows[0]
+    refutable = [i for i, pattern in enumerate(first.patterns) if not irrefutable(pattern)]
+    if not refutable:
+        bound = {p.name: o for p, o in zip(first.patterns, occurrences) if isinstance(p, PatternVar)}
+        return Leaf(first.arm, {**first.bindings, **bound})
+
+    column = refutable[0]
+    occurrence = occurrences[column]
+    rows = [_bind(row, column, occurrence) for row in rows]
+    rest = [*occurrences[:column], *occurrences[column + 1 :]]
+    match first.patterns[column]:
+        case PatternCons("tuple", patterns):
+            fields = [fresh("field") for _ in patterns]
+            expanded = [_expand(row, column, len(fields)) for row in rows]
+            return Destructure(
+                occurrence,
+                fields,
+                decision_tree([*occurrences[:column], *fields, *occurrences[column + 1 :]], expanded, fresh),
+            )
+        case PatternTrue() | PatternFalse():
+            return Branch(
+                occurrence,
+                decision_tree(rest, _specialize(rows, column, PatternTrue()), fresh),
+                decision_tree(rest, _specialize(rows, column, PatternFalse()), fresh),
+            )
+        case PatternInt():
+            values = dict.fromkeys(p.value for row in rows if isinstance(p := row.patterns[column], PatternInt))
+            return Switch(
+                occurrence,
+                [(value, decision_tree(rest, _specialize(rows, column, PatternInt(value)), fresh)) for value in values],
+                decision_tree(rest, _specialize(rows, column, PatternWildcard()), fresh),
+            )
+        case pattern:
+            raise NotImplementedError(f"Pattern not supported: {pattern}")
+
+
+def irrefutable(
+    pattern: Pattern,
+) -> bool:
+    return isinstance(pattern, (PatternVar, PatternWildcard, PatternUnit))
+
+
+def variables(
+    pattern: Pattern,
+) -> Iterator[str]:
+    match pattern:
+        case PatternVar(name):
+            yield name
+        case PatternCons(_, patterns):
+            for p in patterns:
+                yield from variables(p)
+        case _:
+            pass
+
+
+def leaves(
+    tree: DecisionTree,
+) -> Iterator[Leaf]:
+    match tree:
+        case Leaf():
+            yield tree
+        case Switch(_, cases, default):
+            for _, case in cases:
+                yield from leaves(case)
+            yield from leaves(default)
+        case Branch(_, then, otherwise):
+            yield from leaves(then)
+            yield from leaves(otherwise)
+        case Destructure(_, _, next):
+            yield from leaves(next)
+        case Fail():
+            pass
+
+
+def _bind(
+    row: Row,
+    column: int,
+    occurrence: str,
+) -> Row:
+    """Replace a variable (or unit) pattern in the tested column by a wildcard, remembering what the variable names."""
+    match row.patterns[column]:
+        case PatternVar(name):
+            bindings = {**row.bindings, name: occurrence}
+        case PatternUnit():
+            bindings = row.bindings
+        case _:
+            return row
+    return Row([*row.patterns[:column], PatternWildcard(), *row.patterns[column + 1 :]], bindings, row.arm)
+
+
+def _specialize(
+    rows: Sequence[Row],
+    column: int,
+    head: Pattern,
+) -> list[Row]:
+    """The rows that still match once the tested column is known to be `head` (a wildcard for none of the heads)."""
+    return [
+        Row([*row.patterns[:column], *row.patterns[column + 1 :]], row.bindings, row.arm)
+        for row in rows
+        if row.patterns[column] in (head, PatternWildcard())
+    ]
+
+
+def _expand(
+    row: Row,
+    column: int,
+    arity: int,
+) -> Row:
+    match row.patterns[column]:
+        case PatternCons("tuple", patterns) if len(patterns) == arity:
+            fields = list(patterns)
+        case PatternWildcard():
+            fields = [PatternWildcard() for _ in range(arity)]
+        case pattern:
+            raise NotImplementedError(f"Pattern does not match a {arity}-tuple: {pattern}")
+    return Row([*row.patterns[:column], *fields, *row.patterns[column + 1 :]], row.bindings, row.arm)
@@ -1,4 +1,3 @@
-from functools import partial
 from glucose import (
     Program,
     Expression,
@@ -17,177 +16,174 @@ from glucose import (
     Unit,
     Tuple,
     Get,
-    Set,
-    Do,
-    Lambda,
-    Apply,
+    While,
 )
+from rewrite import RuleSet
 
 
 class CompileError(Exception):
-    pass
+    """Raised on a compile-time division by zero."""
+
+
+RULES = RuleSet()
 
 
 def opt(
     program: Program,
 ) -> Program:
-    return Program(
-        parameters=program.parameters,
-        body=opt_expr(program.body),
-    )
+    body = opt_expr(program.body)
+    return program if body is program.body else Program(parameters=program.parameters, body=body)
 
 
 def opt_expr(
     expr: Expression,
 ) -> Expression:
-    recur = partial(opt_expr)
+    return RULES.rewrite(expr)
+
+
+@RULES.rule(Add)
+def add(
+    expr: Add,
+) -> Expression | None:
+    match expr:
+        case Add(Int(0), e2):
+            return e2
+        case Add(e1, Int(0)):
+            return e1
+        case Add(Int(i1), Int(i2)):
+            return Int(i1 + i2)
+        case Add(Int(i1), Add(Int(i2), e2)):
+            return Add(Int(i1 + i2), e2)
+        case Add(Add(Int(i1), e1), Add(Int(i2), e2)):
+            return Add(Int(i1 + i2), Add(e1, e2))
+        case Add(e1, Int() as e2):
+            return Add(e2, e1)
+    return None
+
+
+@RULES.rule(Subtract)
+def subtract(
+    expr: Subtract,
+) -> Expression | None:
+    match expr:
+        case Subtract(Int(i1), Int(i2)):
+            return Int(i1 - i2)
+        case Subtract(e1, Int(0)):
+            return e1
+    return None
+
+
+@RULES.rule(Multiply)
+def multiply(
+    expr: Multiply,
+) -> Expression | None:
+    match expr:
+        case Multiply(Int(0), _) | Multiply(_, Int(0)):
+            return Int(0)
+        case Multiply(Int(1), e2):
+            return e2
+        case Multiply(e1, Int(1)):
+            return e1
+        case Multiply(Int(i1), Int(i2)):
+            return Int(i1 * i2)
+        case Multiply(Int(i1), Multiply(Int(i2), e2)):
+            return Multiply(Int(i1 * i2), e2)
+        case Multiply(Multiply(Int(i1), e1), Multiply(Int(i2), e2)):
+            return Multiply(Int(i1 * i2), Multiply(e1, e2))
+        case Multiply(e1, Int() as e2):
+            return Multiply(e2, e1)
+    return None
+
+
+@RULES.rule(Div, ready=0)
+def flatten_division(
+    expr: Div,
+) -> Expression | None:
+    """Nested divisions become one, before their operands are folded: a/b / c/d is (a*d) / (b*c)."""
+
+    def num_den(
+        expr: Expression,
+    ) -> tuple[Expression, Expression]:
+        if isinstance(expr, Div):
+            n, d = num_den(expr.x)
+            n2, d2 = num_den(expr.y)
+            return Multiply(n, d2), Multiply(d, n2)
+        return expr, Int(1)
+
+    if not isinstance(expr.x, Div) and not isinstance(expr.y, Div):
+        return None
+    return Div(*num_den(expr))
+
+
+@RULES.rule(Div)
+def divide(
+    expr: Div,
+) -> Expression | None:
+    match expr:
+        case Div(Int(0), Int(0)):
+            return Int(0)
+        case Div(_, Int(0)):
+            raise CompileError("division by zero at compile time")
+        case Div(Int(i1), Int(i2)):
+            return Int(i1 // i2)
+        case Div(e1, Int(1)):
+            return e1
+        case Div(Int(0), _):
+            return Int(0)
+    return None
+
+
+@RULES.rule(Let)
+def let(
+    expr: Let,
+) -> Expression | None:
+    match expr:
+        case Let(x, value, Var(y)) if x == y:
+            return value
+    return None
+
+
+@RULES.rule(If, ready=1)
+def if_constant(
+    expr: If,
+) -> Expression | None:
+    match expr:
+        case If(Bool(b), consequent, alternative):
+            return consequent if b else alternative
+    return None
+
+
+@RULES.rule(LessThan, EqualTo, GreaterThanOrEqualTo)
+def compare(
+    expr: LessThan | EqualTo | GreaterThanOrEqualTo,
+) -> Expression | None:
+    match expr:
+        case LessThan(Int(i1), Int(i2)):
+            return Bool(i1 < i2)
+        case EqualTo(Int(i1), Int(i2)):
+            return Bool(i1 == i2)
+        case EqualTo(Bool(b1), Bool(b2)):
+            return Bool(b1 == b2)
+        case GreaterThanOrEqualTo(Int(i1), Int(i2)):
+            return Bool(i1 >= i2)
+    return None
+
+
+@RULES.rule(Get)
+def get(
+    expr: Get,
+) -> Expression | None:
+    match expr:
+        case Get(Tuple(components), Int(i)) if i in range(len(components)):
+            return components[i]
+    return None
+
 
+@RULES.rule(While, ready=1)
+def while_false(
+    expr: While,
+) -> Expression | None:
     match expr:
-        case Int():
-            return expr
-
-        case Add(e1, e2):
-            match recur(e1), recur(e2):
-                case [Int(0), e2]:
-                    return e2
-                case [e1, Int(0)]:
-                    return e1
-                case [Int(i1), Int(i2)]:
-                    return Int(i1 + i2)
-                case [Int(i1), Add(Int(i2), e2)]:
-                    return Add(Int(i1 + i2), e2)
-                case [Add(Int(i1), e1), Add(Int(i2), e2)]:
-                    return Add(Int(i1 + i2), Add(e1, e2))
-                case [e1, Int() as e2]:
-                    return Add(e2, e1)
-                case [e1, e2]:  # pragma: no branch
-                    return Add(e1, e2)
-
-        case Subtract(e1, e2):
-            match recur(e1), recur(e2):
-                case [Int(i1), Int(i2)]:
-                    return Int(i1 - i2)
-                case [e1, e2]:  # pragma: no branch
-                    return Subtract(e1, e2)
-
-        case Multiply(e1, e2):
-            match recur(e1), recur(e2):
-                case [Int(0), e2]:
-                    return Int(0)
-                case [e1, Int(0)]:
-                    return Int(0)
-                case [Int(1), e2]:
-                    return e2
-                case [e1, Int(1)]:
-                    return e1
-                case [Int(i1), Int(i2)]:
-                    return Int(i1 * i2)
-                case [Int(i1), Multiply(Int(i2), e2)]:
-                    return Multiply(Int(i1 * i2), e2)
-                case [Multiply(Int(i1), e1), Multiply(Int(i2), e2)]:
-                    return Multiply(Int(i1 * i2), Multiply(e1, e2))
-                case [e1, Int() as e2]:
-                    return Multiply(e2, e1)
-                case [e1, e2]:  # pragma: no branch
-                    return Multiply(e1, e2)
-
-        case Div(e1, e2):
-            # Flatten nested divisions once
-            def get_num_den(expr):
-                if type(expr).__name__ == "Div":
-                    n, d = get_num_den(expr.x)
-                    n2, d2 = get_num_den(expr.y)
-                    return Multiply(n, d2), Multiply(d, n2)
-                else:
-                    return expr, Int(1)
-
-            num, den = get_num_den(Div(e1, e2))
-            num = recur(num)
-            den = recur(den)
-
-            # Constant folding and error handling after flattening and recursion
-            if isinstance(num, Int) and isinstance(den, Int):
-                if num.value == 0 and den.value == 0:
-                    return Int(0)
-                if den.value == 0:
-                    raise CompileError("division by zero at compile time")
-                return Int(num.value // den.value)
-            if isinstance(den, Int):
-                if den.value == 0:
-                    raise CompileError("division by zero at compile time")
-                if den.value == 1:
-                    return num
-            if isinstance(num, Int) and num.value == 0:
-                return Int(0)
-
-            return Div(num, den)
-
-        case Let(x, value, body):
-            match recur(body):
-                case Var(y) if x == y:
-                    return recur(value)
-                case body:  # pragma: no branch
-                    return Let(x, recur(value), body)
-
-        case Var():
-            return expr
-
-        case Bool():
-            return expr
-
-        case If(condition, consequent, alternative):
-            match recur(condition):
-                case Bool(True):
-                    return recur(consequent)
-                case Bool(False):
-                    return recur(alternative)
-                case condition:  # pragma: no branch
-                    return If(condition, recur(consequent), recur(alternative))
-
-        case LessThan(e1, e2):
-            match recur(e1), recur(e2):
-                case [Int(i1), Int(i2)]:
-                    return Bool(i1 < i2)
-                case [e1, e2]:  # pragma: no branch
-                    return LessThan(e1, e2)
-
-        case EqualTo(e1, e2):
-            match recur(e1), recur(e2):
-                case [Int(i1), Int(i2)]:
-                    return Bool(i1 == i2)
-                case [Bool(b1), Bool(b2)]:
-                    return Bool(b1 == b2)
-                case [e1, e2]:  # pragma: no branch
-                    return EqualTo(e1, e2)
-
-        case GreaterThanOrEqualTo(e1, e2):
-            match recur(e1), recur(e2):
-                case [Int(i1), Int(i2)]:
-                    return Bool(i1 >= i2)
-                case [e1, e2]:  # pragma: no branch
-                    return GreaterThanOrEqualTo(e1, e2)
-
-        case Unit():
-            return expr
-
-        case Tuple(components):
-            return Tuple([recur(component) for component in components])
-
-        case Get(tuple, index):
-            match recur(tuple), recur(index):
-                case [Tuple(components), Int(i)] if i in range(len(components)):
-                    return components[i]
-                case tuple, index:  # pragma: no branch
-                    return Get(tuple, index)
-
-        case Set(tuple, index, value):
-            return Set(recur(tuple), index, recur(value))
-
-        case Do(effect, value):
-            return Do(recur(effect), recur(value))
-
-        case Lambda(parameters, body):
-            return Lambda(parameters, recur(body))
-
-        case Apply(callee, arguments):  # pragma no branch
-            return Apply(recur(callee), [recur(argument) for argument in arguments])
+        case While(Bool(False), _):
+            return Unit()
+    return None
@@ -0,0 +1,30 @@
+# type: ignore
+from llvmlite import binding, ir
+
+binding.initialize()
+binding.initialize_native_target()
+binding.initialize_native_asmprinter()
+
+OPTIMIZATION_LEVELS = (0, 1, 2, 3)
+
+
+def optimize(
+    module: ir.Module | binding.ModuleRef,
+    level: int,
+) -> binding.ModuleRef:
+    """Run LLVM's default `-O<level>` module pipeline (inlining, SROA/mem2reg, GVN, tail-call elimination, ...)."""
+    if level not in OPTIMIZATION_LEVELS:
+        raise ValueError(f"unknown optimization level {level}")
+    if isinstance(module, ir.Module):
+        module = binding.parse_assembly(str(module))
+    module.verify()
+    if level == 0:
+        return module
+
+    machine = binding.Target.from_default_triple().create_target_machine(opt=level)
+    module.triple = machine.triple
+    module.data_layout = str(machine.target_data)
+    options = binding.create_pipeline_tuning_options(speed_level=level, size_level=0)
+    builder = binding.create_pass_builder(machine, options)
+    builder.getModulePassManager().run(module, builder)
+    return module
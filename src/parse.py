@@ -1,6 +1,8 @@
-from collections.abc import Sequence
+from collections.abc import Iterator, Sequence
+from functools import cache
+import mmap
 import os
-from typing import Any
+from typing import Any, BinaryIO, Literal
 from lark import (
     Lark,
     ParseTree,
@@ -8,6 +10,7 @@ from lark import (
     Transformer,
     v_args,  # type: ignore
 )
+from lark.exceptions import UnexpectedInput
 from fructose import (
     Program,
     Expression,
@@ -49,6 +52,11 @@ from fructose import (
     PatternWildcard,
     PatternCons,
 )
+from reader import read_program, read_expr, split_forms
+
+
+class _MalformedArm(Exception):
+    """A `cond` item before the default that is not a (condition consequent) pair."""
 
 
 @v_args(inline=True)
@@ -199,6 +207,22 @@ class AstTransformer(Transformer[Token, Any]):
         default: Expression,
     ) -> Cond[Expression, Expression, Expression]:
         return Cond(arms, default)
+
+    @v_args(inline=False)
+    def cond_items_expr(
+        self,
+        items: Sequence[Expression],
+    ) -> Cond[Expression, Expression, Expression]:
+        # The LALR grammar's `cond`: every item but the last is an arm, parsed as a one-argument application.
+        *items, default = items
+        arms = []
+        for item in items:
+            match item:
+                case Apply(condition, [consequent]):
+                    arms.append((condition, consequent))
+                case _:
+                    raise _MalformedArm(item)
+        return Cond(arms, default)
     # PATTERN MATCHING 
     def match_expr(
         self,
@@ -369,20 +393,69 @@ class AstTransformer(Transformer[Token, Any]):
 
 __location__ = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
 
+# When set, the LALR tables are persisted to (and loaded from) this file between runs.
+PARSER_CACHE = os.environ.get("FRUCTOSE_PARSER_CACHE")
+
+type Engine = Literal["lalr", "earley", "fast"]
+
+
+@cache
+def _parser(
+    engine: Literal["lalr", "earley"],
+) -> Lark:
+    match engine:
+        case "lalr":
+            # The transformer runs inside the LALR parser, so no intermediate parse tree is built.
+            return Lark.open(
+                os.path.join(__location__, "./fructose_lalr.lark"),
+                start=["program", "expr"],
+                parser="lalr",
+                lexer="contextual",
+                transformer=AstTransformer(),
+                cache=PARSER_CACHE or False,
+            )
+        case "earley":  # pragma: no branch
+            return Lark.open(
+                os.path.join(__location__, "./fructose.lark"),
+                start=["program", "expr"],
+            )
+
+
+def _parse(
+    source: str,
+    start: str,
+    engine: Engine,
+) -> Any:
+    if engine == "fast":
+        return read_program(source) if start == "program" else read_expr(source)
+    if engine == "lalr":
+        try:
+            return _parser("lalr").parse(source, start=start)
+        except (UnexpectedInput, _MalformedArm):
+            # Fall back to Earley for inputs outside the LALR variant of the grammar.
+            pass
+    tree: ParseTree = _parser("earley").parse(source, start=start)
+    return AstTransformer().transform(tree)  # type: ignore
+
 
 def parse(
     source: str,
+    engine: Engine = "lalr",
 ) -> Program:
-    with open(os.path.join(__location__, "./fructose.lark"), "r") as f:
-        parser = Lark(f, start="program")
-        tree: ParseTree = parser.parse(source)
-        return AstTransformer().transform(tree)  # type: ignore
+    return _parse(source, "program", engine)
 
 
 def parse_expr(
     source: str,
+    engine: Engine = "lalr",
 ) -> Expression:
-    with open(os.path.join(__location__, "./fructose.lark"), "r") as f:
-        parser = Lark(f, start="expr")
-        tree: ParseTree = parser.parse(source)
-        return AstTransformer().transform(tree)  # type: ignore
+    return _parse(source, "expr", engine)
+
+
+def parse_many(
+    stream: BinaryIO | mmap.mmap,
+    engine: Engine = "lalr",
+) -> Iterator[tuple[int, Program]]:
+    """Parse a stream of concatenated programs lazily, yielding each with its byte offset."""
+    for offset, form in split_forms(stream):
+        yield offset, parse(form.decode(), engine)
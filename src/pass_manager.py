@@ -0,0 +1,175 @@
+from collections.abc import Callable, Mapping, Sequence
+from dataclasses import asdict, dataclass, field, fields, is_dataclass
+from functools import partial
+import json
+import time
+import tracemalloc
+from typing import Any
+from llvmlite import binding, ir  # type: ignore
+
+import fructose
+from simplify import simplify
+from assignment_conversion import convert_assignments
+from uniqify import uniqify
+from opt import opt
+from value_numbering import value_numbering
+from explicate_control import explicate_control
+from close_lambdas import close
+from hoist import hoist
+from inline import INLINE_BUDGET, InlineSite, inline
+from escape_analysis import AllocationSite, escape_analysis
+from promote import promote
+from gvn import gvn
+from lower import lower
+from type_inference import infer_types
+from optimize import optimize
+
+
+@dataclass(frozen=True)
+class Pass:
+    name: str
+    run: Callable[[Any], Any]
+    # Filled in by the pass as it runs, and reported with its statistics.
+    counters: dict[str, int] | None = None
+
+
+@dataclass(frozen=True)
+class PassStatistics:
+    name: str
+    seconds: float
+    peak_bytes: int
+    nodes_before: int
+    nodes_after: int
+    counters: Mapping[str, int] = field(default_factory=dict)
+
+
+class PassManager:
+    """Runs a pipeline of passes in order, optionally recording time, peak memory and IR size for each one."""
+
+    def __init__(
+        self,
+        passes: Sequence[Pass],
+        instrument: bool = False,
+    ) -> None:
+        self.passes = list(passes)
+        self.instrument = instrument
+        self.statistics: list[PassStatistics] = []
+
+    def run(
+        self,
+        program: Any,
+    ) -> Any:
+        for p in self.passes:
+            if self.instrument:
+                program = self._run_instrumented(p, program)
+            else:
+                program = p.run(program)
+        return program
+
+    def _run_instrumented(
+        self,
+        p: Pass,
+        program: Any,
+    ) -> Any:
+        nodes_before = count_nodes(program)
+        if p.counters is not None:
+            p.counters.clear()
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+        else:
+            tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            program = p.run(program)
+        finally:
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] - baseline
+            if not tracing:
+                tracemalloc.stop()
+        counters = dict(p.counters or {})
+        self.statistics.append(PassStatistics(p.name, seconds, peak, nodes_before, count_nodes(program), counters))
+        return program
+
+
+def default_pipeline(
+    fresh: Callable[[str], str],
+    optimization_level: int = 0,
+    allocation_sites: list[AllocationSite] | None = None,
+    gc: bool = False,
+    inline_budget: int = INLINE_BUDGET,
+    inline_sites: list[InlineSite] | None = None,
+) -> list[Pass]:
+    """The compiler's passes in order; `escape_analysis` appends its per-site decisions to `allocation_sites`, and
+    `gc` lowers heap tuples to a garbage-collected heap instead of the per-run arena. `inline` substitutes functions
+    of up to `inline_budget` statements for the calls to them, appending its decisions to `inline_sites`."""
+    eliminated: dict[str, int] = {}
+    passes = [
+        Pass("infer_types", _check_types),
+        Pass("simplify", partial(simplify, fresh=fresh)),
+        Pass("convert_assignments", convert_assignments),
+        Pass("uniqify", partial(uniqify, fresh=fresh)),
+        Pass("opt", opt),
+        Pass("value_numbering", partial(value_numbering, fresh=fresh)),
+        Pass("explicate_control", partial(explicate_control, fresh=fresh)),
+        Pass("close", partial(close, fresh=fresh)),
+        Pass("hoist", partial(hoist, fresh=fresh)),
+        Pass("inline", partial(inline, fresh=fresh, budget=inline_budget, sites=inline_sites)),
+        Pass("escape_analysis", partial(escape_analysis, sites=allocation_sites)),
+        Pass("promote", partial(promote, fresh=fresh)),
+        Pass("gvn", partial(gvn, eliminated=eliminated), eliminated),
+        Pass("lower", partial(lower, gc=gc)),
+    ]
+    if optimization_level > 0:
+        passes.append(Pass("llvm_optimize", partial(optimize, level=optimization_level)))
+    return passes
+
+
+def _check_types(
+    program: fructose.Program,
+) -> fructose.Program:
+    infer_types(program)
+    return program
+
+
+def count_nodes(
+    program: Any,
+) -> int:
+    """The size of an IR: dataclass nodes for the Python IRs, instructions for an LLVM module."""
+    if isinstance(program, ir.Module):
+        return sum(len(block.instructions) for function in program.functions for block in function.blocks)  # type: ignore
+    if isinstance(program, binding.ModuleRef):
+        return sum(len(list(block.instructions)) for function in program.functions for block in function.blocks)  # type: ignore
+
+    count = 0
+    stack = [program]
+    while stack:
+        value = stack.pop()
+        if is_dataclass(value):
+            count += 1
+            stack.extend(getattr(value, field.name) for field in fields(value))
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)  # type: ignore
+        elif isinstance(value, Mapping):
+            stack.extend(value.values())  # type: ignore
+    return count
+
+
+def format_statistics(
+    statistics: Sequence[PassStatistics],
+) -> str:
+    lines = [f"{'pass':<20} {'time (ms)':>10} {'peak (KiB)':>11} {'nodes in':>9} {'nodes out':>10}"]
+    for s in statistics:
+        lines.append(
+            f"{s.name:<20} {s.seconds * 1000:>10.3f} {s.peak_bytes / 1024:>11.1f} {s.nodes_before:>9} {s.nodes_after:>10}"
+        )
+        lines.extend(f"  {name:<18} {count:>10}" for name, count in s.counters.items())
+    lines.append(f"{'total':<20} {sum(s.seconds for s in statistics) * 1000:>10.3f}")
+    return "\n".join(lines)
+
+
+def statistics_json(
+    statistics: Sequence[PassStatistics],
+) -> str:
+    return json.dumps([asdict(s) for s in statistics])
@@ -0,0 +1,265 @@
+from collections.abc import Callable, Mapping, Sequence
+from functools import partial
+from lactose import (
+    Program,
+    Atom,
+    Expression,
+    Statement,
+    Var,
+    Int,
+    Unit,
+    Add,
+    Subtract,
+    Multiply,
+    Div,
+    LessThan,
+    EqualTo,
+    GreaterThanOrEqualTo,
+    Tuple,
+    Alloca,
+    Get,
+    Set,
+    Copy,
+    Global,
+    Call,
+    Lambda,
+    Let,
+    If,
+    Apply,
+    Halt,
+    Join,
+    Jump,
+    Loop,
+)
+
+
+def promote(
+    program: Program,
+    fresh: Callable[[str], str],
+) -> Program:
+    """Keep the fields of stack-allocated tuples in variables instead of memory (LLVM's mem2reg, on lactose).
+
+    An `Alloca` qualifies when its only uses, and its `Copy` aliases' only uses, are reads and writes at constant
+    indices; that covers the cell of every `set!` variable no lambda captures. Each read becomes a `Copy` of the
+    field's current value and each write rebinds it. Join points and loops whose jumps may follow a write take the
+    fields written as extra parameters, so the values merge in phi nodes once lowered.
+    """
+    return Program(
+        parameters=program.parameters,
+        body=promote_body(program.body, fresh),
+        functions={
+            name: Lambda(function.parameters, promote_body(function.body, fresh))
+            for name, function in program.functions.items()
+        },
+    )
+
+
+def promote_body(
+    statement: Statement,
+    fresh: Callable[[str], str],
+) -> Statement:
+    return promote_statement(statement, _promotable(statement), {}, {}, fresh)
+
+
+def promote_statement(
+    statement: Statement,
+    aliases: Mapping[str, str],
+    fields: Mapping[str, Sequence[Atom]],
+    carried: Mapping[str, Sequence[str]],
+    fresh: Callable[[str], str],
+) -> Statement:
+    """Rewrite a statement given, for each promoted tuple in scope, the current value of its fields, and for each
+    join point or loop in scope, the tuples whose fields its jumps pass along."""
+    recur = partial(promote_statement, aliases=aliases, fields=fields, carried=carried, fresh=fresh)
+
+    def parameters(
+        roots: Sequence[str],
+    ) -> dict[str, list[Atom]]:
+        return {root: [Var(fresh("t")) for _ in fields[root]] for root in roots}
+
+    match statement:
+        case Let(name, Alloca(components), next) if name in aliases:
+            return recur(next, fields={**fields, name: list(components)})
+
+        case Let(name, Copy(Var()), next) if name in aliases:
+            return recur(next)
+
+        case Let(name, Get(Var(base), Int(i)), next) if base in aliases:
+            return Let(name, Copy(fields[aliases[base]][i]), recur(next))
+
+        case Let(name, Set(Var(base), Int(i), value), next) if base in aliases:
+            root = aliases[base]
+            updated = [value if j == i else field for j, field in enumerate(fields[root])]
+            return Let(name, Copy(Unit()), recur(next, fields={**fields, root: updated}))
+
+        case Let(name, value, next):
+            return Let(name, value, recur(next))
+
+        case If(condition, consequent, alternative):
+            return If(condition, recur(consequent), recur(alternative))
+
+        case Join(name, names, body, next):
+            roots = [root for root in fields if root in _written(next, aliases)]
+            merged = parameters(roots)
+            return Join(
+                name,
+                [*names, *(field.name for root in roots for field in merged[root])],  # type: ignore
+                recur(body, fields={**fields, **merged}),
+                recur(next, carried={**carried, name: roots}),
+            )
+
+        case Jump(target, arguments):
+            return Jump(target, [*arguments, *(field for root in carried.get(target, []) for field in fields[root])])
+
+        case Loop(name, names, arguments, body):
+            roots = [root for root in fields if root in _written(body, aliases)]
+            merged = parameters(roots)
+            return Loop(
+                name,
+                [*names, *(field.name for root in roots for field in merged[root])],  # type: ignore
+                [*arguments, *(field for root in roots for field in fields[root])],
+                recur(body, fields={**fields, **merged}, carried={**carried, name: roots}),
+            )
+
+        case Apply() | Halt():  # pragma: no branch
+            return statement
+
+
+def _promotable(
+    statement: Statement,
+) -> dict[str, str]:
+    """Map every promotable tuple, and every `Copy` alias of one, to the variable that holds the `Alloca` itself."""
+    definitions: dict[str, Expression] = {}
+    bound: set[str] = set()
+    rebound: set[str] = set()
+    others: set[str] = set()  # variables used other than as the tuple of a read or write, or the source of a copy
+    accesses: list[tuple[str, int]] = []
+
+    def use(
+        atoms: Sequence[Atom],
+    ) -> None:
+        others.update(atom.name for atom in atoms if isinstance(atom, Var))
+
+    def walk(
+        statement: Statement,
+    ) -> None:
+        match statement:
+            case Let(name, value, next):
+                (rebound if name in bound else bound).add(name)
+                definitions[name] = value
+                match value:
+                    case Get(Var(base), Int(i)):
+                        accesses.append((base, i))
+                    case Set(Var(base), Int(i), field):
+                        accesses.append((base, i))
+                        use([field])
+                    case Copy(Var()):
+                        pass
+                    case _:
+                        use(_atoms(value))
+                walk(next)
+
+            case If(condition, consequent, alternative):
+                use([condition])
+                walk(consequent)
+                walk(alternative)
+
+            case Join(_, _, body, next):
+                walk(body)
+                walk(next)
+
+            case Jump(_, arguments):
+                use(arguments)
+
+            case Loop(_, _, arguments, body):
+                use(arguments)
+                walk(body)
+
+            case Apply(callee, arguments):
+                use([callee, *arguments])
+
+            case Halt(value):  # pragma: no branch
+                use([value])
+
+    walk(statement)
+
+    def root(
+        name: str,
+    ) -> str:
+        while isinstance(value := definitions.get(name), Copy) and isinstance(value.value, Var):
+            name = value.value.name
+        return name
+
+    roots = {name for name, value in definitions.items() if isinstance(value, Alloca)}
+    aliases = {name: root(name) for name in definitions if root(name) in roots}
+    rejected = {aliases[name] for name in aliases if name in others or name in rebound}
+    for base, i in accesses:
+        if base not in aliases:
+            continue
+        if not 0 <= i < len(definitions[aliases[base]].components):  # type: ignore
+            rejected.add(aliases[base])
+    return {name: root for name, root in aliases.items() if root not in rejected}
+
+
+def _written(
+    statement: Statement,
+    aliases: Mapping[str, str],
+) -> set[str]:
+    """The promoted tuples a statement writes to."""
+    recur = partial(_written, aliases=aliases)
+
+    match statement:
+        case Let(_, Set(Var(base), Int(), _), next) if base in aliases:
+            return {aliases[base]} | recur(next)
+
+        case Let(_, _, next):
+            return recur(next)
+
+        case If(_, consequent, alternative):
+            return recur(consequent) | recur(alternative)
+
+        case Join(_, _, body, next):
+            return recur(body) | recur(next)
+
+        case Loop(_, _, _, body):
+            return recur(body)
+
+        case _:
+            return set()
+
+
+def _atoms(
+    expression: Expression,
+) -> list[Atom]:
+    match expression:
+        case (
+            Add(x, y)
+            | Subtract(x, y)
+            | Multiply(x, y)
+            | Div(x, y)
+            | LessThan(x, y)
+            | EqualTo(x, y)
+            | GreaterThanOrEqualTo(x, y)
+        ):
+            return [x, y]
+
+        case Tuple(components) | Alloca(components):
+            return list(components)
+
+        case Get(base, index):
+            return [base, index]
+
+        case Set(base, index, value):
+            return [base, index, value]
+
+        case Copy(value):
+            return [value]
+
+        case Call(callee, arguments):
+            return [callee, *arguments]
+
+        case Global():
+            return []
+
+        case _:
+            return [expression]  # an atom
@@ -0,0 +1,430 @@
+from collections.abc import Iterator
+import mmap
+import re
+from typing import Any, BinaryIO
+from fructose import (
+    Program,
+    Expression,
+    Int,
+    Add,
+    Subtract,
+    Multiply,
+    Div,
+    Let,
+    LetStar,
+    LetRec,
+    Var,
+    Bool,
+    Not,
+    And,
+    Or,
+    If,
+    Cond,
+    LessThanOrEqualTo,
+    LessThan,
+    EqualTo,
+    GreaterThan,
+    GreaterThanOrEqualTo,
+    Unit,
+    Cell,
+    Get,
+    Set,
+    Begin,
+    While,
+    Lambda,
+    Apply,
+    Assign,
+    Match,
+    PatternVar,
+    PatternInt,
+    PatternTrue,
+    PatternFalse,
+    PatternUnit,
+    PatternWildcard,
+    PatternCons,
+)
+
+# A hand-written reader for Fructose's S-expression syntax. It accepts the same language as fructose.lark but
+# tokenizes with a single regular expression and builds the AST in one pass over the tokens, keeping the
+# forms that are still open on an explicit stack instead of recursing. Unlike the Lark grammar, atoms must be
+# separated by whitespace or parentheses, so `(+1)` is rejected rather than read as `(+ 1)`. The one exception is
+# a leading "-", which both grammars read as subtraction: `(-1)` and `(-n)` are `(- 1)` and `(- n)`. Likewise a
+# keyword only heads a form when it is the whole atom, as in fructose_lalr.lark: `(notx)` and `(andy 1 2)` are
+# applications of `notx` and `andy`, where the Earley grammar reads them as `(not x)` and `(and y 1 2)`.
+
+
+class ReadError(Exception):
+    pass
+
+
+# Groups: 1 = parenthesis, 2 = string literal, 3 = any other atom, 4 = a stray character.
+_TOKEN = re.compile(r'([()])|("[^"]*")|([^\s()"]+)|(\S)')
+_INT = re.compile(r"-?[0-9]+")
+_IDENTIFIER = re.compile(r"[^\W\d][_\-'\w]*")
+
+_KEYWORDS = frozenset(
+    [
+        "+",
+        "-",
+        "*",
+        "/",
+        "let",
+        "let*",
+        "letrec",
+        "not",
+        "and",
+        "or",
+        "if",
+        "cond",
+        "<=",
+        "<",
+        "=",
+        ">",
+        ">=",
+        "cell",
+        "^",
+        ":=",
+        "begin",
+        "while",
+        "abs",
+        "lambda",
+        "\\",
+        "set!",
+        "match",
+    ]
+)
+
+
+class _Context:
+    """What a form (or atom) means depends on where it appears."""
+
+    PROGRAM = 0
+    EXPR = 1
+    PARAMETERS = 2
+    IDENTIFIER = 3
+    BINDINGS = 4
+    BINDING = 5
+    MATCH_ARM = 6
+    PATTERN = 7
+
+
+class _Frame:
+    __slots__ = ("context", "head", "items", "offset")
+
+    def __init__(
+        self,
+        context: int,
+        offset: int,
+    ) -> None:
+        self.context = context
+        self.head: str | None = None
+        self.items: list[Any] = []
+        self.offset = offset
+
+
+def read_program(
+    source: str,
+) -> Program:
+    return _read(source, _Context.PROGRAM)
+
+
+def read_expr(
+    source: str,
+) -> Expression:
+    return _read(source, _Context.EXPR)
+
+
+def _read(
+    source: str,
+    context: int,
+) -> Any:
+    stack: list[_Frame] = []
+    result: list[Any] = []
+
+    for token in _TOKEN.finditer(source):
+        group = token.lastindex
+        text = token.group(group)  # type: ignore
+
+        if group == 1:
+            if text == "(":
+                child = _child_context(stack[-1]) if stack else context
+                if child == _Context.IDENTIFIER:
+                    raise ReadError(f"expected an identifier at offset {token.start()}")
+                stack.append(_Frame(child, token.start()))
+                continue
+            if not stack:
+                raise ReadError(f"unexpected ')' at offset {token.start()}")
+            frame = stack.pop()
+            value = _finish(frame)
+        elif group == 4:
+            raise ReadError(f"unexpected character {text!r} at offset {token.start()}")
+        elif stack:
+            frame = stack[-1]
+            if frame.head is None and not frame.items and frame.context <= _Context.EXPR:
+                if frame.context == _Context.PROGRAM:
+                    if text != "program":
+                        raise ReadError(f"expected 'program' at offset {token.start()}")
+                    frame.head = text
+                    continue
+                if text in _KEYWORDS:
+                    frame.head = text
+                    continue
+                if text[0] == "-":
+                    # As in the Lark grammars, a "-" right after "(" is subtraction even with no space after it.
+                    frame.head = "-"
+                    text = text[1:]
+            value = _atom(_child_context(frame), text, token.start())
+        else:
+            value = _atom(context, text, token.start())
+
+        if stack:
+            stack[-1].items.append(value)
+        else:
+            result.append(value)
+
+    if stack:
+        raise ReadError(f"unclosed '(' at offset {stack[-1].offset}")
+    if len(result) != 1:
+        raise ReadError(f"expected exactly one form, found {len(result)}")
+    return result[0]
+
+
+def _child_context(
+    frame: _Frame,
+) -> int:
+    index = len(frame.items)
+    match frame.context:
+        case _Context.EXPR:
+            match frame.head:
+                case "let" | "let*" | "letrec":
+                    return _Context.BINDINGS if index == 0 else _Context.EXPR
+                case "lambda" | "abs" | "\\":
+                    return _Context.PARAMETERS if index == 0 else _Context.EXPR
+                case "set!":
+                    return _Context.IDENTIFIER if index == 0 else _Context.EXPR
+                case "match":
+                    return _Context.EXPR if index == 0 else _Context.MATCH_ARM
+                case _:
+                    return _Context.EXPR
+        case _Context.PROGRAM:
+            return _Context.PARAMETERS if index == 0 else _Context.EXPR
+        case _Context.PARAMETERS:
+            return _Context.IDENTIFIER
+        case _Context.BINDINGS:
+            return _Context.BINDING
+        case _Context.BINDING:
+            return _Context.IDENTIFIER if index == 0 else _Context.EXPR
+        case _Context.MATCH_ARM:
+            return _Context.PATTERN if index == 0 else _Context.EXPR
+        case _Context.PATTERN:
+            return _Context.IDENTIFIER if index == 0 else _Context.PATTERN
+        case _:  # pragma: no cover
+            raise ReadError(f"unexpected form at offset {frame.offset}")
+
+
+def _atom(
+    context: int,
+    text: str,
+    offset: int,
+) -> Any:
+    match context:
+        case _Context.EXPR:
+            if _INT.fullmatch(text):
+                return Int(int(text))
+            match text:
+                case "#t":
+                    return Bool(True)
+                case "#f":
+                    return Bool(False)
+                case "#u":
+                    return Unit()
+            if text[0] == '"':
+                return text[1:-1]
+            if _IDENTIFIER.fullmatch(text):
+                return Var(text)
+
+        case _Context.IDENTIFIER:
+            if _IDENTIFIER.fullmatch(text):
+                return text
+
+        case _Context.PATTERN:
+            if text == "_":
+                return PatternWildcard()
+            if _INT.fullmatch(text):
+                return PatternInt(int(text))
+            match text:
+                case "#t":
+                    return PatternTrue()
+                case "#f":
+                    return PatternFalse()
+                case "#u":
+                    return PatternUnit()
+            if _IDENTIFIER.fullmatch(text):
+                return PatternVar(text)
+
+    raise ReadError(f"unexpected {text!r} at offset {offset}")
+
+
+def _finish(
+    frame: _Frame,
+) -> Any:
+    items = frame.items
+    n = len(items)
+
+    match frame.context:
+        case _Context.EXPR:
+            match frame.head:
+                case None:
+                    if n >= 1:
+                        return Apply(items[0], items[1:])
+                case "+":
+                    return Add(items)
+                case "-":
+                    if n >= 1:
+                        return Subtract(items)
+                case "*":
+                    return Multiply(items)
+                case "/":
+                    if n == 2:
+                        return Div(items)
+                case "let":
+                    if n == 2:
+                        return Let(items[0], items[1])
+                case "let*":
+                    if n == 2:
+                        return LetStar(items[0], items[1])
+                case "letrec":
+                    if n == 2:
+                        return LetRec(items[0], items[1])
+                case "not":
+                    if n == 1:
+                        return Not(items[0])
+                case "and":
+                    return And(items)
+                case "or":
+                    return Or(items)
+                case "if":
+                    if n == 3:
+                        return If(items[0], items[1], items[2])
+                case "cond":
+                    # The arms were read as one-argument applications; only the last item is the default.
+                    if n >= 1 and all(_is_arm(arm) for arm in items[:-1]):
+                        return Cond([(arm.callee, arm.arguments[0]) for arm in items[:-1]], items[-1])
+                case "<=":
+                    return LessThanOrEqualTo(items)
+                case "<":
+                    return LessThan(items)
+                case "=":
+                    return EqualTo(items)
+                case ">":
+                    return GreaterThan(items)
+                case ">=":
+                    return GreaterThanOrEqualTo(items)
+                case "cell":
+                    if n == 1:
+                        return Cell(items[0])
+                case "^":
+                    if n == 1:
+                        return Get(items[0])
+                case ":=":
+                    if n == 2:
+                        return Set(items[0], items[1])
+                case "begin":
+                    return Begin(items)
+                case "while":
+                    if n == 2:
+                        return While(items[0], items[1])
+                case "lambda" | "abs" | "\\":
+                    if n == 2:
+                        return Lambda(items[0], items[1])
+                case "set!":
+                    if n == 2:
+                        return Assign(items[0], items[1])
+                case "match":
+                    if n >= 1:
+                        return Match(items[0], items[1:])
+            raise ReadError(f"malformed {frame.head or 'application'} at offset {frame.offset}")
+
+        case _Context.PROGRAM:
+            if frame.head == "program" and n == 2:
+                return Program(items[0], items[1])
+            raise ReadError(f"malformed program at offset {frame.offset}")
+
+        case _Context.PARAMETERS | _Context.BINDINGS:
+            return items
+
+        case _Context.BINDING | _Context.MATCH_ARM:
+            if n == 2:
+                return items[0], items[1]
+            raise ReadError(f"expected a pair at offset {frame.offset}")
+
+        case _Context.PATTERN:
+            if n >= 1:
+                return PatternCons(items[0], items[1:])
+            raise ReadError(f"malformed pattern at offset {frame.offset}")
+
+        case _:  # pragma: no cover
+            raise ReadError(f"unexpected form at offset {frame.offset}")
+
+
+def _is_arm(
+    value: Any,
+) -> bool:
+    return isinstance(value, Apply) and len(value.arguments) == 1  # type: ignore
+
+
+_DELIMITER = re.compile(rb'[()"]')
+_OPEN, _QUOTE = b'("'
+
+
+def split_forms(
+    stream: BinaryIO | mmap.mmap,
+    chunk_size: int = 1 << 16,
+) -> Iterator[tuple[int, bytes]]:
+    """Yield each top-level parenthesized form in `stream` with its byte offset, reading one chunk at a time."""
+    pending = bytearray()  # the text of the form that is still open at the end of the previous chunk
+    offset = 0  # the stream offset of the current chunk
+    depth = 0
+    in_string = False
+    start = 0
+
+    while chunk := stream.read(chunk_size):
+        gap = 0  # where the text between top-level forms begins in this chunk
+        begin = 0  # where the open form begins in this chunk
+        for delimiter in _DELIMITER.finditer(chunk):
+            i = delimiter.start()
+            c = chunk[i]
+            if in_string:
+                in_string = c != _QUOTE
+            elif c == _QUOTE:
+                in_string = True
+            elif c == _OPEN:
+                if depth == 0:
+                    _expect_blank(chunk[gap:i], offset + gap)
+                    start, begin = offset + i, i
+                depth += 1
+            elif depth == 0:
+                raise ReadError(f"unexpected ')' at offset {offset + i}")
+            else:
+                depth -= 1
+                if depth == 0:
+                    pending += chunk[begin : i + 1]
+                    yield start, bytes(pending)
+                    pending.clear()
+                    gap = i + 1
+        if depth:
+            pending += chunk[begin:]
+        else:
+            _expect_blank(chunk[gap:], offset + gap)
+        offset += len(chunk)
+
+    if depth or in_string:
+        raise ReadError(f"unclosed '(' at offset {start}")
+
+
+def _expect_blank(
+    text: bytes,
+    offset: int,
+) -> None:
+    if text and not text.isspace():
+        raise ReadError(f"unexpected text outside a form at offset {offset + len(text) - len(text.lstrip())}")
@@ -0,0 +1,202 @@
+from collections import Counter, defaultdict
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from typing import Any
+from glucose import (
+    Expression,
+    Int,
+    Var,
+    Bool,
+    Unit,
+    Add,
+    Subtract,
+    Multiply,
+    Div,
+    Let,
+    If,
+    LessThan,
+    EqualTo,
+    GreaterThanOrEqualTo,
+    Tuple,
+    Get,
+    Set,
+    Do,
+    Lambda,
+    Apply,
+    While,
+)
+
+type Rewrite = Callable[[Expression], Expression | None]
+
+
+@dataclass(frozen=True)
+class Rule:
+    """A rewrite of one node kind: `apply` returns the replacement, or None where it does not apply.
+
+    The rule is tried once the first `ready` children of the node are in normal form, or all of them where `ready` is
+    None. A rule that only needs the condition of an `if` can so drop the dead branch before it is rewritten.
+    """
+
+    name: str
+    apply: Rewrite
+    ready: int | None
+
+
+class RuleSet:
+    """Rewrite rules registered per node kind, applied bottom-up until none of them applies anywhere.
+
+    A node is rebuilt only when one of its children changes, so every subtree the rules leave alone is returned as the
+    very object it was given. Each replacement goes back on the worklist and is rewritten in turn, so rules may produce
+    nodes that other rules (or they themselves) simplify further; a rule set must not rewrite a node into itself.
+    """
+
+    def __init__(self) -> None:
+        self.rules: defaultdict[type, list[Rule]] = defaultdict(list)
+        self._stages: dict[tuple[type, int], tuple[dict[int, list[Rule]], list[Rule]]] = {}
+
+    def rule(
+        self,
+        *kinds: type,
+        ready: int | None = None,
+    ) -> Callable[[Rewrite], Rewrite]:
+        def register(
+            apply: Rewrite,
+        ) -> Rewrite:
+            for kind in kinds:
+                self.rules[kind].append(Rule(apply.__name__, apply, ready))
+            self._stages.clear()
+            return apply
+
+        return register
+
+    def stages(
+        self,
+        kind: type,
+        arity: int,
+    ) -> tuple[dict[int, list[Rule]], list[Rule]]:
+        """The rules for nodes of `kind` with `arity` children: those tried before some of the children are normalized,
+        by how many they wait for, and those tried after all of them."""
+        key = (kind, arity)
+        if key not in self._stages:
+            early: dict[int, list[Rule]] = {}
+            late: list[Rule] = []
+            for r in self.rules.get(kind, []):
+                if r.ready is None or r.ready >= arity:
+                    late.append(r)
+                else:
+                    early.setdefault(r.ready, []).append(r)
+            self._stages[key] = early, late
+        return self._stages[key]
+
+    def rewrite(
+        self,
+        expression: Expression,
+        fired: Counter[str] | None = None,
+    ) -> Expression:
+        """`expression` in normal form; `fired` counts the rules that applied, by name."""
+        # Nodes known to be in normal form, by identity. They are kept alive here so their ids are not reused.
+        normal: dict[int, Expression] = {}
+        cache = self._stages
+        # Kinds without children or rules (variables, literals) are in normal form as they are.
+        inert = {kind for kind in _LEAVES if not self.rules.get(kind)}
+
+        def normalize(
+            expression: Expression,
+        ) -> Expression:
+            while (kind := type(expression)) not in inert and id(expression) not in normal:
+                original = _CHILDREN[kind](expression) if kind in _CHILDREN else []
+                early, late = cache[key] if (key := (kind, len(original))) in cache else self.stages(*key)
+                current = original
+                replacement = None
+                if early:
+                    for i, child in enumerate(original):
+                        if i in early:
+                            node = expression if current is original else _REBUILD[kind](expression, current)
+                            if (replacement := _apply(early[i], node, fired)) is not None:
+                                break
+                        if (normalized := normalize(child)) is not child:
+                            current = list(original) if current is original else current
+                            current[i] = normalized
+                else:
+                    # No rule looks at the node before all of its children are normalized.
+                    for i, child in enumerate(original):
+                        if type(child) not in inert and (normalized := normalize(child)) is not child:
+                            current = list(original) if current is original else current
+                            current[i] = normalized
+                if replacement is None:
+                    if current is not original:
+                        expression = _REBUILD[kind](expression, current)
+                    for r in late:
+                        if (replacement := r.apply(expression)) is not None:
+                            if fired is not None:
+                                fired[r.name] += 1
+                            break
+                    if replacement is None:
+                        normal[id(expression)] = expression
+                        break
+                expression = replacement
+            return expression
+
+        return normalize(expression)
+
+
+def _apply(
+    rules: Sequence[Rule],
+    node: Expression,
+    fired: Counter[str] | None,
+) -> Expression | None:
+    for r in rules:
+        if (replacement := r.apply(node)) is not None:
+            if fired is not None:
+                fired[r.name] += 1
+            return replacement
+    return None
+
+
+def children(
+    expression: Expression,
+) -> list[Expression]:
+    """The subexpressions of `expression`, in evaluation order."""
+    return _CHILDREN[type(expression)](expression) if type(expression) in _CHILDREN else []
+
+
+def rebuild(
+    expression: Expression,
+    current: Sequence[Expression],
+) -> Expression:
+    """A copy of `expression` with `current` for its children."""
+    return _REBUILD[type(expression)](expression, current)
+
+
+# Looked up by the exact type of a node rather than matched, since the engine takes apart and rebuilds every node.
+_CHILDREN: dict[type, Callable[[Any], list[Expression]]] = {
+    **{kind: lambda e: [e.x, e.y] for kind in [Add, Subtract, Multiply, Div, LessThan, EqualTo, GreaterThanOrEqualTo]},
+    Let: lambda e: [e.value, e.body],
+    If: lambda e: [e.condition, e.consequent, e.alternative],
+    Tuple: lambda e: list(e.components),
+    Get: lambda e: [e.tuple, e.index],
+    Set: lambda e: [e.tuple, e.index, e.value],
+    Do: lambda e: [e.effect, e.value],
+    Lambda: lambda e: [e.body],
+    Apply: lambda e: [e.callee, *e.arguments],
+    While: lambda e: [e.condition, e.body],
+}
+
+
+_REBUILD: dict[type, Callable[[Any, Sequence[Expression]], Expression]] = {
+    **{
+        kind: lambda e, c, kind=kind: kind(*c)
+        for kind in [Add, Subtract, Multiply, Div, LessThan, EqualTo, GreaterThanOrEqualTo]
+    },
+    Let: lambda e, c: Let(e.name, *c),
+    If: lambda e, c: If(*c),
+    Tuple: lambda e, c: Tuple(list(c)),
+    Get: lambda e, c: Get(*c),
+    Set: lambda e, c: Set(*c),
+    Do: lambda e, c: Do(*c),
+    Lambda: lambda e, c: Lambda(e.parameters, c[0]),
+    Apply: lambda e, c: Apply(c[0], list(c[1:])),
+    While: lambda e, c: While(*c),
+}
+
+_LEAVES = frozenset([Int, Var, Bool, Unit])
@@ -1,10 +1,10 @@
-from collections.abc import Callable
+from collections.abc import Callable, Iterable
 from functools import partial
 import fructose
 from fructose import LetStar, LetRec, Not, And, Or, Cond, Cell, Begin, While, Match, Expression
 import sucrose
-from sucrose import Int, Var, Bool, If, Unit, Tuple, Do, Lambda, Apply, Assign
-from typing import Any
+from sucrose import Int, Var, Bool, Unit, Tuple, Do, Lambda, Apply, Assign
+from match_compilation import compile_match, variables
 
 
 def simplify(
@@ -13,15 +13,22 @@ def simplify(
 ) -> sucrose.Program:
     return sucrose.Program(
         program.parameters,
-        body=simplify_expression(program.body, fresh),
+        body=simplify_expression(program.body, fresh, "tuple" in program.parameters),
     )
 
 
 def simplify_expression(
     expression: fructose.Expression,
     fresh: Callable[[str], str],
+    shadowed: bool = False,
 ) -> sucrose.Expression:
-    recur = partial(simplify_expression, fresh=fresh)
+    """`shadowed` is whether a binding of `tuple` is in scope, which makes `(tuple ...)` an ordinary call."""
+    recur = partial(simplify_expression, fresh=fresh, shadowed=shadowed)
+
+    def scope(
+        names: Iterable[str],
+    ) -> Callable[[fructose.Expression], sucrose.Expression]:
+        return partial(simplify_expression, fresh=fresh, shadowed=shadowed or "tuple" in names)
 
     match expression:
         case Int():
@@ -78,7 +85,7 @@ def simplify_expression(
                 case []:
                     return recur(body)
                 case [(name, value), *rest]:
-                    return sucrose.Let(name, recur(value), recur(fructose.Let(rest, body)))
+                    return sucrose.Let(name, recur(value), scope([name])(fructose.Let(rest, body)))
                 case _:  # pragma: no cover
                     raise ValueError()
 
@@ -87,7 +94,7 @@ def simplify_expression(
                 case []:
                     return recur(body)
                 case [(name, value), *rest]:
-                    return sucrose.Let(name, recur(value), recur(LetStar(rest, body)))
+                    return sucrose.Let(name, recur(value), scope([name])(LetStar(rest, body)))
                 case _:  # pragma: no cover
                     raise ValueError()
 
@@ -239,7 +246,7 @@ def simplify_expression(
                         recur(fructose.GreaterThanOrEqualTo(rest_list)),
                         sucrose.Bool(False),
                     )
-                case _:  # pragma: no cover         
+                case _:  # pragma: no cover
                     raise NotImplementedError(f"GreaterThanOrEqualTo: unhandled operands: {es_list}")
 
         case fructose.Unit():
@@ -266,80 +273,24 @@ def simplify_expression(
                     raise NotImplementedError()
 
         case While(condition, body):
-            loop = fresh("loop")
-            return recur(
-                LetRec(
-                    [(loop, Lambda([], If(condition, Begin([body, Apply(Var(loop), [])]), Unit())))],
-                    Apply(Var(loop), []),
-                )
-            )
+            return sucrose.While(recur(condition), recur(body))
 
         case Lambda(parameters, body):
-            return Lambda(parameters, recur(body))
+            return Lambda(parameters, scope(parameters)(body))
+
+        # `tuple` is the constructor `match` patterns destructure, unless the program binds the name itself.
+        case Apply(Var("tuple"), arguments) if not shadowed:
+            return Tuple([recur(argument) for argument in arguments])
 
         case Apply(callee, arguments):
             return Apply(recur(callee), [recur(argument) for argument in arguments])
 
-        case Assign(name, value):  # pragma: no branch
+        case Assign(name, value):
             return Assign(name, recur(value))
 
-        case Match() as match_expr:
-            expr, arms = match_expr.expr, match_expr.arms
-
-            def lower_arm(arms: list[tuple[Any, Any]]) -> sucrose.Expression:
-                if not arms:
-                    # No match: error or unit
-                    return sucrose.Unit()
-                pat, body = arms[0]
-                rest = arms[1:]
-                # Pattern matching logic
-                match pat:
-                    case fructose.PatternInt(v):
-                        cond = sucrose.EqualTo(recur(expr), sucrose.Int(v))
-                        return sucrose.If(cond, recur(body), lower_arm(rest))
-                    case fructose.PatternTrue():
-                        cond = sucrose.EqualTo(recur(expr), sucrose.Bool(True))
-                        return sucrose.If(cond, recur(body), lower_arm(rest))
-                    case fructose.PatternFalse():
-                        cond = sucrose.EqualTo(recur(expr), sucrose.Bool(False))
-                        return sucrose.If(cond, recur(body), lower_arm(rest))
-                    case fructose.PatternUnit():
-                        cond = sucrose.EqualTo(recur(expr), sucrose.Unit())
-                        return sucrose.If(cond, recur(body), lower_arm(rest))
-                    case fructose.PatternVar(name):
-                        # Bind variable to value and evaluate body
-                        return sucrose.Let(name, recur(expr), recur(body))
-                    case fructose.PatternWildcard():
-                        return recur(body)
-                    case fructose.PatternCons(constructor, subpatterns):
-                        # Only handling tuple patterns for now
-                        if constructor == "tuple":
-                            # Destructure expr into its components
-                            tuple_var = fresh("tuple")
-                            lets = []
-                            for i, _ in enumerate(subpatterns):
-                                elem_var = fresh(f"elem{i}")
-                                lets.append((elem_var, sucrose.Get(recur(expr), sucrose.Int(i))))
-
-                            # Recursively match subpatterns
-                            def nest_patterns(subs, lets, body):
-                                if not subs:
-                                    return recur(body)
-                                subpat, *rest_subs = subs
-                                let_name, let_val = lets[0]
-                                rest_lets = lets[1:]
-                                # Recursively match subpattern
-                                return lower_arm([(subpat, nest_patterns(rest_subs, rest_lets, body))])
-
-                            # Build let bindings for tuple elements
-                            let_expr = recur(expr)
-                            for name, val in reversed(lets):
-                                let_expr = sucrose.Let(name, val, let_expr)
-                            # Now match subpatterns
-                            return sucrose.Let(tuple_var, recur(expr), nest_patterns(subpatterns, lets, body))
-                        else:
-                            raise NotImplementedError(f"Constructor pattern not supported: {constructor}")
-                    case _:  # pragma: no cover
-                        raise NotImplementedError(f"Pattern not supported: {pat}")
-
-            return lower_arm(arms)
+        case Match(scrutinee, arms):  # pragma: no branch
+            return compile_match(
+                recur(scrutinee),
+                [(pattern, scope(variables(pattern))(body)) for pattern, body in arms],
+                fresh,
+            )
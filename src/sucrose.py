@@ -21,6 +21,7 @@ from glucose import (
     Do,
     Lambda,
     Apply,
+    While,
 )
 
 type Expression = Union[
@@ -43,18 +44,19 @@ type Expression = Union[
     Do[Expression, Expression],
     Lambda[Expression],
     Apply[Expression],
+    While[Expression, Expression],
     #
     Assign[Expression],
 ]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Assign[Value]:
     name: str
     value: Value
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Program:
     parameters: Sequence[str]
     body: Expression
@@ -1,254 +1,562 @@
-from __future__ import annotations
-from typing import Dict, List, Set
+from collections.abc import Callable, Iterable, Sequence
+import itertools
+import sys
+from typing import Any
 from fructose import (
-    Program, Expression, Int, Var, Bool, Not, And, Or, If, Cond, Unit, Lambda, Apply, Let, LetStar, LetRec, Assign, Subtract, Add, Multiply, Div, LessThanOrEqualTo, LessThan, EqualTo, GreaterThan, GreaterThanOrEqualTo, Cell, Get, Set, Begin, While
+    Program,
+    Expression,
+    Int,
+    Var,
+    Bool,
+    Not,
+    And,
+    Or,
+    If,
+    Cond,
+    Unit,
+    Lambda,
+    Apply,
+    Let,
+    LetStar,
+    LetRec,
+    Assign,
+    Subtract,
+    Add,
+    Multiply,
+    Div,
+    LessThanOrEqualTo,
+    LessThan,
+    EqualTo,
+    GreaterThan,
+    GreaterThanOrEqualTo,
+    Cell,
+    Get,
+    Set,
+    Begin,
+    While,
+    Match,
+    PatternVar,
+    PatternInt,
+    PatternTrue,
+    PatternFalse,
+    PatternUnit,
+    PatternWildcard,
+    PatternCons,
 )
-import builtins
+from util import ScopedTable
+
 
-# --- Type System ---
 class Type:
     pass
 
+
 class TypeVar(Type):
-    _next_id = 0
-    def __init__(self):
-        self.id = TypeVar._next_id
-        TypeVar._next_id += 1
-    def __repr__(self):
+    """A type variable, solved by union-find: `instance` is what it has been unified with (another variable on the way
+    to the representative, or a type), `rank` bounds the height of the tree of variables below it, and `level` is the
+    depth of the innermost `let` whose environment may refer to it."""
+
+    _ids = itertools.count()
+
+    def __init__(
+        self,
+        level: int = 0,
+    ) -> None:
+        self.id = next(TypeVar._ids)
+        self.level = level
+        self.rank = 0
+        self.instance: Type | None = None
+
+    def __repr__(self) -> str:
         return f"t{self.id}"
-    def __eq__(self, other: object) -> bool:
-        return isinstance(other, TypeVar) and self.id == other.id
-    def __hash__(self):
-        return hash(self.id)
+
 
 class IntType(Type):
-    def __repr__(self): return "Int"
-    def __eq__(self, other: object) -> bool: return isinstance(other, IntType)
-    def __hash__(self): return hash("IntType")
+    def __repr__(self) -> str:
+        return "Int"
+
+    def __eq__(
+        self,
+        other: object,
+    ) -> bool:
+        return isinstance(other, IntType)
+
+    def __hash__(self) -> int:
+        return hash("IntType")
+
 
 class BoolType(Type):
-    def __repr__(self): return "Bool"
-    def __eq__(self, other: object) -> bool: return isinstance(other, BoolType)
-    def __hash__(self): return hash("BoolType")
+    def __repr__(self) -> str:
+        return "Bool"
+
+    def __eq__(
+        self,
+        other: object,
+    ) -> bool:
+        return isinstance(other, BoolType)
+
+    def __hash__(self) -> int:
+        return hash("BoolType")
+
 
 class UnitType(Type):
-    def __repr__(self): return "Unit"
-    def __eq__(self, other: object) -> bool: return isinstance(other, UnitType)
-    def __hash__(self): return hash("UnitType")
+    def __repr__(self) -> str:
+        return "Unit"
+
+    def __eq__(
+        self,
+        other: object,
+    ) -> bool:
+        return isinstance(other, UnitType)
+
+    def __hash__(self) -> int:
+        return hash("UnitType")
+
 
 class FunType(Type):
-    def __init__(self, arg_types: List[Type], ret_type: Type):
-        self.arg_types = arg_types
+    def __init__(
+        self,
+        arg_types: Sequence[Type],
+        ret_type: Type,
+    ) -> None:
+        self.arg_types = list(arg_types)
         self.ret_type = ret_type
-    def __repr__(self):
+
+    def __repr__(self) -> str:
         return f"({' -> '.join(map(str, self.arg_types))} -> {self.ret_type})"
-    def __eq__(self, other: object) -> bool:
-        return (
-            isinstance(other, FunType)
-            and self.arg_types == other.arg_types
-            and self.ret_type == other.ret_type
-        )
-    def __hash__(self):
+
+    def __eq__(
+        self,
+        other: object,
+    ) -> bool:
+        return isinstance(other, FunType) and self.arg_types == other.arg_types and self.ret_type == other.ret_type
+
+    def __hash__(self) -> int:
         return hash((tuple(self.arg_types), self.ret_type))
 
-# --- Type Environment ---
-TypeEnv = Dict[str, Type]
 
-# --- Unification ---
+class TupleType(Type):
+    def __init__(
+        self,
+        component_types: Sequence[Type],
+    ) -> None:
+        self.component_types = list(component_types)
+
+    def __repr__(self) -> str:
+        return f"({' * '.join(map(str, self.component_types))})"
+
+    def __eq__(
+        self,
+        other: object,
+    ) -> bool:
+        return isinstance(other, TupleType) and self.component_types == other.component_types
+
+    def __hash__(self) -> int:
+        return hash(tuple(self.component_types))
+
+
+class Scheme(Type):
+    """The type of a generalized binding: its variables at `GENERIC` level are instantiated afresh at each use."""
+
+    def __init__(
+        self,
+        type: Type,
+    ) -> None:
+        self.type = type
+
+    def __repr__(self) -> str:
+        return f"forall {self.type}"
+
+
+# The types of the variables in scope. Entering a binding form opens a scope that is undone when it ends, rather than
+# copying the environment.
+type TypeEnv = ScopedTable[str, Type]
+
+# The level of variables a `let` has generalized: each use of the binding instantiates them afresh.
+GENERIC = sys.maxsize
+
+
+# Types without components, equal to any other of the same kind.
+_BASE_TYPES = (IntType, BoolType, UnitType)
+
+
 class TypeError(Exception):
     pass
 
-def occurs_check(tv: TypeVar, t: Type, subst: Dict[TypeVar, Type]) -> bool:
-    t = prune(t, subst)
-    if t == tv:
-        return True
-    elif isinstance(t, FunType):
-        return any(occurs_check(tv, arg, subst) for arg in t.arg_types) or occurs_check(tv, t.ret_type, subst)
-    else:
-        return False
-
-def prune(t: Type, subst: Dict[TypeVar, Type]) -> Type:
-    if isinstance(t, TypeVar) and t in subst:
-        real = prune(subst[t], subst)
-        subst[t] = real
-        return real
-    return t
 
-def unify(t1: Type, t2: Type, subst: Dict[TypeVar, Type]):
-    t1 = prune(t1, subst)
-    t2 = prune(t2, subst)
-    if isinstance(t1, TypeVar):
-        if t1 != t2:
-            if occurs_check(t1, t2, subst):
-                raise TypeError(f"Recursive unification: {t1} and {t2}")
-            subst[t1] = t2
-    elif isinstance(t2, TypeVar):
-        unify(t2, t1, subst)
-    elif type(t1) == type(t2):
-        if isinstance(t1, (IntType, BoolType, UnitType)):
-            pass
-        elif isinstance(t1, FunType) and isinstance(t2, FunType):
+def prune(
+    t: Type,
+) -> Type:
+    """The representative of `t`: the type its variables were unified with, or the root variable if none. Every
+    variable on the way is pointed straight at it (path compression)."""
+    if not isinstance(t, TypeVar) or t.instance is None:
+        return t
+    root = t.instance
+    while isinstance(root, TypeVar) and root.instance is not None:
+        root = root.instance
+    while isinstance(t, TypeVar) and t.instance is not None and t.instance is not root:
+        t.instance, t = root, t.instance
+    return root
+
+
+def unify(
+    t1: Type,
+    t2: Type,
+) -> None:
+    t1, t2 = prune(t1), prune(t2)
+    if t1 is t2 or (type(t1) is type(t2) and type(t1) in _BASE_TYPES):
+        return
+    match t1, t2:
+        case TypeVar(), TypeVar():
+            # Union by rank; the representative is at the lower of the two levels.
+            if t1.rank < t2.rank:
+                t1, t2 = t2, t1
+            t2.instance = t1
+            t1.level = min(t1.level, t2.level)
+            if t1.rank == t2.rank:
+                t1.rank += 1
+        case TypeVar(), _:
+            _bind(t1, t2)
+        case _, TypeVar():
+            _bind(t2, t1)
+        case FunType(), FunType():
             if len(t1.arg_types) != len(t2.arg_types):
                 raise TypeError(f"Function arity mismatch: {t1} vs {t2}")
             for a, b in zip(t1.arg_types, t2.arg_types):
-                unify(a, b, subst)
-            unify(t1.ret_type, t2.ret_type, subst)
-        else:
-            raise TypeError(f"Unknown type for unification: {t1}")
-    else:
-        raise TypeError(f"Type mismatch: {t1} vs {t2}")
-
-# --- Generalization/Instantiation ---
-def free_type_vars(t: Type, subst: Dict[TypeVar, Type]) -> builtins.set[TypeVar]:
-    t = prune(t, subst)
-    if isinstance(t, TypeVar):
-        return builtins.set([t])
-    elif isinstance(t, FunType):
-        s: builtins.set[TypeVar] = builtins.set()
-        for arg in t.arg_types:
-            s.update(builtins.set(list(free_type_vars(arg, subst))))
-        s.update(builtins.set(list(free_type_vars(t.ret_type, subst))))
-        return s
-    else:
-        return builtins.set()
-
-def free_type_vars_env(env: TypeEnv, subst: Dict[TypeVar, Type]) -> builtins.set[TypeVar]:
-    s: builtins.set[TypeVar] = builtins.set()
-    for t in env.values():
-        s.update(builtins.set(list(free_type_vars(t, subst))))
-    return s
-
-def generalize(t: Type, env: TypeEnv, subst: Dict[TypeVar, Type]) -> Type:
-    # For simplicity, we do not implement explicit polymorphism in this first version
-    return t
+                unify(a, b)
+            unify(t1.ret_type, t2.ret_type)
+        case TupleType(), TupleType():
+            if len(t1.component_types) != len(t2.component_types):
+                raise TypeError(f"Tuple size mismatch: {t1} vs {t2}")
+            for a, b in zip(t1.component_types, t2.component_types):
+                unify(a, b)
+        case _:
+            raise TypeError(f"Type mismatch: {t1} vs {t2}")
+
+
+def _bind(
+    variable: TypeVar,
+    t: Type,
+) -> None:
+    """Solve `variable` to the type `t` (not a variable): one walk over `t` both checks that `variable` does not occur
+    in it and lowers the variables in it to `variable`'s level, since the environment now refers to them as well."""
+    for v in _variables(t):
+        if v is variable:
+            raise TypeError(f"Recursive unification: {variable} and {t}")
+        v.level = min(v.level, variable.level)
+    variable.instance = t
 
-def instantiate(t: Type, subst: Dict[TypeVar, Type]) -> Type:
-    # For simplicity, we do not implement explicit polymorphism in this first version
+
+def _variables(
+    t: Type,
+) -> Iterable[TypeVar]:
+    """The unsolved variables of `t`, as often as they occur."""
+    stack = [t]
+    while stack:
+        match prune(stack.pop()):
+            case TypeVar() as v:
+                yield v
+            case FunType(arg_types=arg_types, ret_type=ret_type):
+                stack.extend(arg_types)
+                stack.append(ret_type)
+            case TupleType(component_types=component_types):
+                stack.extend(component_types)
+            case _:
+                pass
+
+
+def generalize(
+    t: Type,
+    level: int,
+) -> Type:
+    """`t` with the variables created inside a `let` at `level` made generic, as a `Scheme` if there are any. Any
+    variable the environment refers to has been lowered to the level of the binding that refers to it, so only `t` is
+    walked."""
+    generic = False
+    for v in _variables(t):
+        if v.level > level:
+            v.level = GENERIC
+            generic = True
+    return Scheme(t) if generic else t
+
+
+def _restrict(
+    t: Type,
+    level: int,
+) -> Type:
+    """`t` bound monomorphically at `level`: its variables may no longer be generalized by a `let` further in."""
+    for v in _variables(t):
+        v.level = min(v.level, level)
     return t
 
-# --- Type Inference ---
-def infer_expr(expr: Expression, env: TypeEnv, subst: Dict[TypeVar, Type]) -> Type:
-    if isinstance(expr, Int):
-        return IntType()
-    if isinstance(expr, Bool):
-        return BoolType()
-    if isinstance(expr, Unit):
-        return UnitType()
-    if isinstance(expr, Var):
-        if expr.name not in env:
-            raise TypeError(f"Unbound variable: {expr.name}")
-        return instantiate(env[expr.name], subst)
-    if isinstance(expr, Add) or isinstance(expr, Subtract) or isinstance(expr, Multiply) or isinstance(expr, Div):
-        # All operands must be Int
-        for arg in expr.operands:
-            t = infer_expr(arg, env, subst)
-            unify(t, IntType(), subst)
-        return IntType()
-    if isinstance(expr, And) or isinstance(expr, Or):
-        for arg in expr.operands:
-            t = infer_expr(arg, env, subst)
-            unify(t, BoolType(), subst)
-        return BoolType()
-    if isinstance(expr, Not):
-        t = infer_expr(expr.operand, env, subst)
-        unify(t, BoolType(), subst)
-        return BoolType()
-    if isinstance(expr, If):
-        t_cond = infer_expr(expr.condition, env, subst)
-        unify(t_cond, BoolType(), subst)
-        t_then = infer_expr(expr.consequent, env, subst)
-        t_else = infer_expr(expr.alternative, env, subst)
-        unify(t_then, t_else, subst)
-        return t_then
-    if isinstance(expr, Let):
-        new_env = env.copy()
-        for name, value in expr.bindings:
-            t_val = infer_expr(value, env, subst)
-            new_env[name] = generalize(t_val, env, subst)
-        return infer_expr(expr.body, new_env, subst)
-    if isinstance(expr, LetStar):
-        new_env = env.copy()
-        for name, value in expr.bindings:
-            t_val = infer_expr(value, new_env, subst)
-            new_env[name] = generalize(t_val, new_env, subst)
-        return infer_expr(expr.body, new_env, subst)
-    if isinstance(expr, LetRec):
-        new_env = env.copy()
-        # Pre-bind all names to fresh type vars
-        for name, _ in expr.bindings:
-            new_env[name] = TypeVar()
-        # Now infer and unify
-        for name, value in expr.bindings:
-            t_val = infer_expr(value, new_env, subst)
-            unify(new_env[name], t_val, subst)
-        return infer_expr(expr.body, new_env, subst)
-    if isinstance(expr, Lambda):
-        param_types: List[Type] = [TypeVar() for _ in expr.parameters]
-        new_env = env.copy()
-        for name, t in zip(expr.parameters, param_types):
-            new_env[name] = t
-        t_body = infer_expr(expr.body, new_env, subst)
-        return FunType(param_types, t_body)
-    if isinstance(expr, Apply):
-        t_fun = infer_expr(expr.callee, env, subst)
-        arg_types = [infer_expr(arg, env, subst) for arg in expr.arguments]
-        t_ret = TypeVar()
-        unify(t_fun, FunType(arg_types, t_ret), subst)
-        return t_ret
-    if isinstance(expr, Assign):
-        # Assignment is only allowed for variables already in the environment
-        if expr.name not in env:
-            raise TypeError(f"Assignment to unbound variable: {expr.name}")
-        t_val = infer_expr(expr.value, env, subst)
-        unify(env[expr.name], t_val, subst)
-        return UnitType()
-    if isinstance(expr, Cond):
-        # Each arm is (cond, expr)
-        t_result = TypeVar()
-        for cond, val in expr.arms:
-            t_cond = infer_expr(cond, env, subst)
-            unify(t_cond, BoolType(), subst)
-            t_arm = infer_expr(val, env, subst)
-            unify(t_result, t_arm, subst)
-        t_default = infer_expr(expr.default, env, subst)
-        unify(t_result, t_default, subst)
-        return t_result
-    if isinstance(expr, LessThanOrEqualTo) or isinstance(expr, LessThan) or isinstance(expr, EqualTo) or isinstance(expr, GreaterThan) or isinstance(expr, GreaterThanOrEqualTo):
-        for arg in expr.operands:
-            t = infer_expr(arg, env, subst)
-            unify(t, IntType(), subst)
-        return BoolType()
-    if isinstance(expr, Cell):
-        # Mutable cell, just check the value
-        infer_expr(expr.value, env, subst)
-        return UnitType()
-    if isinstance(expr, Get):
-        # For now, just check the cell
-        infer_expr(expr.cell, env, subst)
-        return IntType()  # Could be more general
-    if isinstance(expr, Set):
-        infer_expr(expr.cell, env, subst)
-        infer_expr(expr.value, env, subst)
-        return UnitType()
-    if isinstance(expr, Begin):
-        t = UnitType()
-        for e in expr.operands:
-            t = infer_expr(e, env, subst)
+
+def instantiate(
+    t: Type,
+    level: int,
+) -> Type:
+    """The type of a use at `level` of a binding of type `t`: a fresh copy of the generic variables of a `Scheme`."""
+    if not isinstance(t, Scheme):
         return t
-    if isinstance(expr, While):
-        t_cond = infer_expr(expr.condition, env, subst)
-        unify(t_cond, BoolType(), subst)
-        infer_expr(expr.body, env, subst)
-        return UnitType()
-    raise TypeError(f"Unknown expression: {expr}")
-
-def infer_types(program: Program) -> Dict[str, Type]:
-    subst: Dict[TypeVar, Type] = {}
-    env: TypeEnv = {param: TypeVar() for param in program.parameters}
-    t_body = infer_expr(program.body, env, subst)
-    # Return the types of parameters and the program result
-    result = {param: prune(t, subst) for param, t in env.items()}
-    result["$result"] = prune(t_body, subst)
-    return result
-
-# For testing: TypeError is raised on type errors
+    fresh: dict[TypeVar, TypeVar] = {}
+
+    def copy(
+        t: Type,
+    ) -> Type:
+        match prune(t):
+            case TypeVar(level=variable_level) as v:
+                if variable_level != GENERIC:
+                    return v
+                if v not in fresh:
+                    fresh[v] = TypeVar(level)
+                return fresh[v]
+            case FunType(arg_types=arg_types, ret_type=ret_type) as f:
+                arguments, result = [copy(a) for a in arg_types], copy(ret_type)
+                if result is ret_type and all(a is b for a, b in zip(arguments, arg_types)):
+                    return f
+                return FunType(arguments, result)
+            case TupleType(component_types=component_types) as u:
+                components = [copy(c) for c in component_types]
+                return u if all(a is b for a, b in zip(components, component_types)) else TupleType(components)
+            case other:
+                return other
+
+    return copy(t.type)
+
+
+def resolve(
+    t: Type,
+) -> Type:
+    """`t` with every solved variable replaced by its solution."""
+    match prune(t):
+        case FunType(arg_types=arg_types, ret_type=ret_type):
+            return FunType([resolve(a) for a in arg_types], resolve(ret_type))
+        case TupleType(component_types=component_types):
+            return TupleType([resolve(c) for c in component_types])
+        case other:
+            return other
+
+
+class _Inference:
+    def __init__(
+        self,
+        assigned: set[str],
+    ) -> None:
+        self.env: TypeEnv = ScopedTable()
+        # Names some `set!` assigns; bindings of them are never generalized, since an assignment may change the type.
+        self.assigned = assigned
+
+    def bind(
+        self,
+        name: str,
+        value: Expression,
+        t: Type,
+        level: int,
+    ) -> None:
+        """Bind `name` to `value` of type `t`, inferred one level inside `level`: generalized if it is a lambda that no
+        `set!` assigns."""
+        generalizable = isinstance(value, Lambda) and name not in self.assigned
+        self.env[name] = generalize(t, level) if generalizable else _restrict(t, level)
+
+    def infer(
+        self,
+        expression: Expression,
+        level: int,
+    ) -> Type:
+        match expression:
+            case Int():
+                return IntType()
+            case Bool():
+                return BoolType()
+            case Unit():
+                return UnitType()
+            case Var(name):
+                if name not in self.env:
+                    raise TypeError(f"Unbound variable: {name}")
+                return instantiate(self.env[name], level)
+            case Add() | Subtract() | Multiply() | Div():
+                self.expect(expression.operands, IntType(), level)
+                return IntType()
+            case LessThanOrEqualTo() | LessThan() | EqualTo() | GreaterThan() | GreaterThanOrEqualTo():
+                self.expect(expression.operands, IntType(), level)
+                return BoolType()
+            case And() | Or():
+                self.expect(expression.operands, BoolType(), level)
+                return BoolType()
+            case Not(operand):
+                self.expect([operand], BoolType(), level)
+                return BoolType()
+            case If(condition, consequent, alternative):
+                self.expect([condition], BoolType(), level)
+                t = self.infer(consequent, level)
+                unify(t, self.infer(alternative, level))
+                return t
+            case Cond(arms, default):
+                t = TypeVar(level)
+                for condition, value in arms:
+                    self.expect([condition], BoolType(), level)
+                    unify(t, self.infer(value, level))
+                unify(t, self.infer(default, level))
+                return t
+            case Let(bindings, body):
+                values = [self.infer(value, level + 1) for _, value in bindings]
+                with self.env.scope():
+                    for (name, value), t in zip(bindings, values):
+                        self.bind(name, value, t, level)
+                    return self.infer(body, level)
+            case LetStar(bindings, body):
+                with self.env.scope():
+                    for name, value in bindings:
+                        self.bind(name, value, self.infer(value, level + 1), level)
+                    return self.infer(body, level)
+            case LetRec(bindings, body):
+                with self.env.scope():
+                    # Monomorphic within the group, generalized after it.
+                    group = [TypeVar(level + 1) for _ in bindings]
+                    for (name, _), t in zip(bindings, group):
+                        self.env[name] = t
+                    for (_, value), t in zip(bindings, group):
+                        unify(t, self.infer(value, level + 1))
+                    for (name, value), t in zip(bindings, group):
+                        self.bind(name, value, t, level)
+                    return self.infer(body, level)
+            case Lambda(parameters, body):
+                with self.env.scope():
+                    parameter_types: list[Type] = [TypeVar(level) for _ in parameters]
+                    for name, t in zip(parameters, parameter_types):
+                        self.env[name] = t
+                    return FunType(parameter_types, self.infer(body, level))
+            case Apply(Var("tuple"), arguments) if "tuple" not in self.env:
+                # `tuple` is the constructor `match` patterns destructure, unless the program binds the name itself
+                return TupleType([self.infer(argument, level) for argument in arguments])
+            case Apply(callee, arguments):
+                callee_type = self.infer(callee, level)
+                result = TypeVar(level)
+                unify(callee_type, FunType([self.infer(argument, level) for argument in arguments], result))
+                return result
+            case Assign(name, value):
+                if name not in self.env:
+                    raise TypeError(f"Assignment to unbound variable: {name}")
+                unify(self.env[name], self.infer(value, level))
+                return UnitType()
+            case Cell(value):
+                self.infer(value, level)
+                return UnitType()
+            case Get(cell):
+                self.infer(cell, level)
+                return IntType()
+            case Set(cell, value):
+                self.infer(cell, level)
+                self.infer(value, level)
+                return UnitType()
+            case Begin(operands):
+                t: Type = UnitType()
+                for operand in operands:
+                    t = self.infer(operand, level)
+                return t
+            case While(condition, body):
+                self.expect([condition], BoolType(), level)
+                self.infer(body, level)
+                return UnitType()
+            case Match(scrutinee, arms):
+                scrutinee_type = self.infer(scrutinee, level)
+                t = TypeVar(level)
+                for pattern, body in arms:
+                    with self.env.scope():
+                        unify(scrutinee_type, infer_pattern(pattern, self.env, level))
+                        unify(t, self.infer(body, level))
+                return t
+            case _:
+                raise TypeError(f"Unknown expression: {expression}")
+
+    def expect(
+        self,
+        operands: Iterable[Expression],
+        t: Type,
+        level: int,
+    ) -> None:
+        for operand in operands:
+            unify(self.infer(operand, level), t)
+
+
+def infer_pattern(
+    pattern: object,
+    env: TypeEnv,
+    level: int = 0,
+) -> Type:
+    """The type of the values `pattern` matches, binding its variables in `env`."""
+    match pattern:
+        case PatternInt():
+            return IntType()
+        case PatternTrue() | PatternFalse():
+            return BoolType()
+        case PatternUnit():
+            return UnitType()
+        case PatternVar(name):
+            t = env[name] = TypeVar(level)
+            return t
+        case PatternWildcard():
+            return TypeVar(level)
+        case PatternCons("tuple", patterns):
+            return TupleType([infer_pattern(p, env, level) for p in patterns])
+        case _:
+            raise TypeError(f"Unknown pattern: {pattern}")
+
+
+def infer_types(
+    program: Program,
+) -> dict[str, Type]:
+    """The types of the parameters of `program` and (as `"$result"`) of its result."""
+    inference = _Inference(_assigned(program.body))
+    parameters = {parameter: TypeVar() for parameter in program.parameters}
+    for parameter, t in parameters.items():
+        inference.env[parameter] = t
+    result = inference.infer(program.body, 0)
+    return {**{parameter: resolve(t) for parameter, t in parameters.items()}, "$result": resolve(result)}
+
+
+def _assigned(
+    expression: Expression,
+) -> set[str]:
+    """The names `expression` assigns with `set!` anywhere."""
+    names: set[str] = set()
+    stack = [expression]
+    while stack:
+        node = stack.pop()
+        if type(node) is Assign:
+            names.add(node.name)
+        if type(node) in _CHILDREN:
+            stack.extend(_CHILDREN[type(node)](node))
+    return names
+
+
+# Looked up by the exact type of a node rather than matched, since `_assigned` walks every node of the program.
+_CHILDREN: dict[type, Callable[[Any], Iterable[Expression]]] = {
+    **{
+        kind: lambda e: e.operands
+        for kind in [
+            Add,
+            Subtract,
+            Multiply,
+            Div,
+            And,
+            Or,
+            LessThanOrEqualTo,
+            LessThan,
+            EqualTo,
+            GreaterThan,
+            GreaterThanOrEqualTo,
+            Begin,
+        ]
+    },
+    Not: lambda e: [e.operand],
+    If: lambda e: [e.condition, e.consequent, e.alternative],
+    Cond: lambda e: [*(part for arm in e.arms for part in arm), e.default],
+    **{kind: lambda e: [*(value for _, value in e.bindings), e.body] for kind in [Let, LetStar, LetRec]},
+    Lambda: lambda e: [e.body],
+    Apply: lambda e: [e.callee, *e.arguments],
+    Assign: lambda e: [e.value],
+    Cell: lambda e: [e.value],
+    Get: lambda e: [e.cell],
+    Set: lambda e: [e.cell, e.value],
+    While: lambda e: [e.condition, e.body],
+    Match: lambda e: [e.expr, *(body for _, body in e.arms)],
+}
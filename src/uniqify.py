@@ -22,6 +22,7 @@ from glucose import (
     Do,
     Lambda,
     Apply,
+    While,
 )
 
 
@@ -100,5 +101,8 @@ def uniqify_expression(
             local = {parameter: fresh(parameter) for parameter in parameters}
             return Lambda(list(local.values()), recur(body, replacements={**replacements, **local}))
 
-        case Apply(callee, arguments):  # pragma: no branch
+        case Apply(callee, arguments):
             return Apply(recur(callee), [recur(e) for e in arguments])
+
+        case While(condition, body):  # pragma: no branch
+            return While(recur(condition), recur(body))
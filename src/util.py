@@ -8,4 +8,62 @@ class SequentialNameGenerator:
     def __call__(self, prefix: str) -> str:
         count = self.cache[prefix]
         self.cache[prefix] = count + 1
-        return f"_{prefix}{count}"
+        # Otherwise "v" would run into "v1" at its tenth name. "." cannot appear in an identifier.
+        separator = "." if prefix[-1:].isdigit() else ""
+        return f"_{prefix}{separator}{count}"
+
+
+class ScopedTable[K, V]:
+    """A dict whose assignments are undone when the `scope` they were made in ends."""
+
+    def __init__(self) -> None:
+        self.entries: dict[K, V] = {}
+        self.undo: list[list[tuple[K, object]]] = [[]]
+
+    def __contains__(
+        self,
+        key: K,
+    ) -> bool:
+        return key in self.entries
+
+    def __getitem__(
+        self,
+        key: K,
+    ) -> V:
+        return self.entries[key]
+
+    def __setitem__(
+        self,
+        key: K,
+        value: V,
+    ) -> None:
+        self.undo[-1].append((key, self.entries.get(key, _MISSING)))
+        self.entries[key] = value
+
+    def get(
+        self,
+        key: K,
+        default: V | None = None,
+    ) -> V | None:
+        return self.entries.get(key, default)
+
+    def scope(self) -> "ScopedTable[K, V]":
+        """A context in which assignments are made in a new scope; a context manager rather than a generator, since
+        passes open one for every binding form they walk."""
+        return self
+
+    def __enter__(self) -> None:
+        self.undo.append([])
+
+    def __exit__(
+        self,
+        *exception: object,
+    ) -> None:
+        for key, previous in reversed(self.undo.pop()):
+            if previous is _MISSING:
+                del self.entries[key]
+            else:
+                self.entries[key] = previous  # type: ignore[assignment]
+
+
+_MISSING = object()
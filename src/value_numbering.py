@@ -1,3 +1,5 @@
+from collections.abc import Callable
+from typing import Union
 from glucose import (
     Program,
     Expression,
@@ -10,114 +12,195 @@ from glucose import (
     Var,
     Bool,
     If,
+    LessThan,
+    EqualTo,
+    GreaterThanOrEqualTo,
+    Unit,
     Tuple,
     Get,
     Set,
     Do,
     Lambda,
     Apply,
+    While,
 )
-from util import SequentialNameGenerator
+from util import ScopedTable
+
+type Atom = Union[Int, Var, Bool, Unit]
+
+# Operators whose value does not depend on the order of their operands.
+COMMUTATIVE = (Add, Multiply, EqualTo)
 
 
 class VNError(Exception):
     pass
 
 
-def value_numbering(program: Program) -> Program:
-    """Perform local then global value‐numbering on a purely functional AST."""
-    fresh = SequentialNameGenerator()
-    # Global map: hash → variable name
-    global_map: dict[str, str] = {}
-
-    def vn_expr(expr: Expression, local_map: dict[str, str]) -> Expression:
-        # Raise VNError if expr is a Bool at the top level (as per test expectation)
-        if isinstance(expr, Bool):
-            raise VNError(f"Value numbering does not support Bool nodes: {expr!r}")
-        key = _hash_expr(expr, local_map)
-        # Local check
-        if key in local_map:
-            return Var(local_map[key])
-        # Global check
-        if key in global_map:
-            return Var(global_map[key])
-        # Otherwise assign new number
-        name = fresh("v").lstrip("_")
-        local_map[key] = name
-        global_map[key] = name
-        # Recurse and rebuild under a let-binding
-        body = _rebuild(expr, lambda e: vn_expr(e, {}))
-        return Let(name, body, Var(name))
-
-    return Program(program.parameters, vn_expr(program.body, {}))
-
-
-def _hash_expr(expr: Expression, env: dict[str, str]) -> str:
-    """Compute a structural key that respects previously numbered subexpressions."""
-    match expr:
-        case Int(v):
-            return f"Int:{v}"
-        case Var(n):
-            return f"Var:{n}"
-        case Add(x, y):
-            return f"Add({_hash_expr(x, env)},{_hash_expr(y, env)})"
-        case Subtract(x, y):
-            return f"Sub({_hash_expr(x, env)},{_hash_expr(y, env)})"
-        case Multiply(x, y):
-            return f"Mul({_hash_expr(x, env)},{_hash_expr(y, env)})"
-        case Div(x, y):
-            return f"Div({_hash_expr(x, env)},{_hash_expr(y, env)})"
-        case If(c, t, e):
-            return f"If({_hash_expr(c, env)};{_hash_expr(t, env)};{_hash_expr(e, env)})"
-        case Let(n, v, b):
-            return f"Let({n}={_hash_expr(v, env)};{_hash_expr(b, env)})"
-        case Bool(b):
-            return f"Bool:{b}"
-        case Tuple(cs):
-            return "Tup(" + ",".join(_hash_expr(c, env) for c in cs) + ")"
-        case Get(t, i):
-            return f"Get({_hash_expr(t, env)};{_hash_expr(i, env)})"
-        case Set(t, i, v):
-            return f"Set({_hash_expr(t, env)};{_hash_expr(i, env)};{_hash_expr(v, env)})"
-        case Do(eff, val):
-            return f"Do({_hash_expr(eff, env)};{_hash_expr(val, env)})"
-        case Lambda(ps, b):
-            return f"Lam({','.join(ps)};{_hash_expr(b, env)})"
-        case Apply(f, args):
-            return "App(" + ",".join(_hash_expr(a, env) for a in (f, *args)) + ")"
-        case _:
-            raise VNError(f"Unrecognized expr for VN: {expr!r}")
-
-
-from typing import Callable
-
-
-def _rebuild(expr: Expression, rec: Callable[[Expression], Expression]) -> Expression:
-    """Generic AST‐walker that rebuilds the node using `rec` on its children."""
-    match expr:
-        case Add(x, y):
-            return Add(rec(x), rec(y))
-        case Multiply(x, y):
-            return Multiply(rec(x), rec(y))
-        case Div(x, y):
-            return Div(rec(x), rec(y))
-        case Let(n, v, b):
-            return Let(n, rec(v), rec(b))
-        case If(c, t, e):
-            return If(rec(c), rec(t), rec(e))
-        case Tuple(cs):
-            return Tuple([rec(c) for c in cs])
-        case Get(t, i):
-            return Get(rec(t), rec(i))
-        case Set(t, i, v):
-            return Set(rec(t), rec(i), rec(v))
-        case Do(eff, val):
-            return Do(rec(eff), rec(val))
-        case Lambda(ps, b):
-            return Lambda(ps, rec(b))
-        case Apply(f, args):
-            return Apply(rec(f), [rec(a) for a in args])
-        case Int() | Var() | Bool():
-            return expr
-        case _:
-            raise VNError(f"Cannot rebuild node: {expr!r}")
+def value_numbering(
+    program: Program,
+    fresh: Callable[[str], str],
+) -> Program:
+    """Compute each pure value (arithmetic and comparisons) of a uniqified program once.
+
+    A value is numbered by interning its operator and the numbers of its operands (sorted, for the commutative ones),
+    so numbering a node takes constant time however deep it is. Operands are bound to variables in evaluation order,
+    and a computation whose number a variable in scope already holds becomes that variable. The tables follow the
+    scopes of the program: what a branch, a loop or a lambda body computes is forgotten when it ends, while what was
+    computed before it is visible inside.
+    """
+    numbering = _Numbering(fresh)
+    for parameter in program.parameters:
+        numbering.define(parameter)
+    return Program(program.parameters, numbering.block(program.body))
+
+
+class _Numbering:
+    def __init__(
+        self,
+        fresh: Callable[[str], str],
+    ) -> None:
+        self.fresh = fresh
+        self.numbers: dict[tuple[object, ...], int] = {}
+        # The value number of each variable, and the atom that holds each value number.
+        self.values = ScopedTable[str, int]()
+        self.leaders = ScopedTable[int, Atom]()
+        # The `let`s (and, without a name, the effects) of the block being numbered, in order.
+        self.bindings: list[tuple[str | None, Expression]] = []
+
+    def number(
+        self,
+        key: tuple[object, ...],
+    ) -> int:
+        return self.numbers.setdefault(key, len(self.numbers))
+
+    def unique(self) -> int:
+        """A number no other value has, for values that may differ each time they are computed (tuples, calls)."""
+        return self.number((None, len(self.numbers)))
+
+    def define(
+        self,
+        name: str,
+    ) -> int:
+        """Number a variable bound outside the program (or as a parameter) by a value of its own."""
+        n = self.unique()
+        self.values[name] = n
+        self.leaders[n] = Var(name)
+        return n
+
+    def block(
+        self,
+        expression: Expression,
+    ) -> Expression:
+        """`expression`, numbered in a scope of its own and wrapped in the bindings it made."""
+        outer, self.bindings = self.bindings, []
+        with self.values.scope(), self.leaders.scope():
+            result, _ = self.compute(expression)
+        for name, value in reversed(self.bindings):
+            result = Do(value, result) if name is None else Let(name, value, result)
+        self.bindings = outer
+        return result
+
+    def atom(
+        self,
+        expression: Expression,
+    ) -> tuple[Atom, int]:
+        """`expression` as an atom: a variable bound to its value, unless it is one already."""
+        value, n = self.compute(expression)
+        if isinstance(value, (Int, Var, Bool, Unit)):
+            return value, n
+        name = self.fresh("v")
+        self.bind(name, value, n)
+        return Var(name), n
+
+    def bind(
+        self,
+        name: str,
+        value: Expression,
+        n: int,
+    ) -> None:
+        self.bindings.append((name, value))
+        self.values[name] = n
+        self.leaders[n] = Var(name)
+
+    def compute(
+        self,
+        expression: Expression,
+    ) -> tuple[Expression, int]:
+        """`expression` with its operands bound to atoms, and its value number."""
+        match expression:
+            case Int(value):
+                return expression, self.number((Int, value))
+
+            case Bool(value):
+                return expression, self.number((Bool, value))
+
+            case Unit():
+                return expression, self.number((Unit,))
+
+            case Var(name):
+                n = self.values[name] if name in self.values else self.define(name)
+                return self.leaders.get(n, expression), n
+
+            case (
+                Add(x, y)
+                | Subtract(x, y)
+                | Multiply(x, y)
+                | Div(x, y)
+                | LessThan(x, y)
+                | EqualTo(x, y)
+                | GreaterThanOrEqualTo(x, y)
+            ):
+                (a, na), (b, nb) = self.atom(x), self.atom(y)
+                kind = type(expression)
+                n = self.number((kind, *sorted((na, nb))) if kind in COMMUTATIVE else (kind, na, nb))
+                leader = self.leaders.get(n)
+                return (kind(a, b), n) if leader is None else (leader, n)
+
+            case Let(name, value, body):
+                value, n = self.compute(value)
+                if isinstance(value, (Int, Var, Bool, Unit)):
+                    # A copy: uses of `name` become the atom itself.
+                    self.values[name] = n
+                    if n not in self.leaders:
+                        self.leaders[n] = value
+                else:
+                    self.bind(name, value, n)
+                return self.compute(body)
+
+            case If(condition, consequent, alternative):
+                condition, _ = self.atom(condition)
+                return If(condition, self.block(consequent), self.block(alternative)), self.unique()
+
+            case Tuple(components):
+                return Tuple([self.atom(component)[0] for component in components]), self.unique()
+
+            case Get(base, index):
+                (base, _), (index, _) = self.atom(base), self.atom(index)
+                return Get(base, index), self.unique()
+
+            case Set(base, index, value):
+                (base, _), (index, _), (value, _) = self.atom(base), self.atom(index), self.atom(value)
+                return Set(base, index, value), self.unique()
+
+            case Do(effect, value):
+                effect, _ = self.compute(effect)
+                if not isinstance(effect, (Int, Var, Bool, Unit)):
+                    self.bindings.append((None, effect))
+                return self.compute(value)
+
+            case Lambda(parameters, body):
+                with self.values.scope(), self.leaders.scope():
+                    for parameter in parameters:
+                        self.define(parameter)
+                    body = self.block(body)
+                return Lambda(parameters, body), self.unique()
+
+            case Apply(callee, arguments):
+                callee, _ = self.atom(callee)
+                return Apply(callee, [self.atom(argument)[0] for argument in arguments]), self.unique()
+
+            case While(condition, body):
+                return While(self.block(condition), self.block(body)), self.unique()
+
+            case _:
+                raise VNError(f"Unrecognized expr for VN: {expression!r}")
@@ -21,6 +21,7 @@ from sucrose import (
     Do,
     Lambda,
     Apply,
+    While,
     Assign,
 )
 import glucose
@@ -43,6 +44,17 @@ from assignment_conversion import convert_assignments, mutable_free_variables, c
                 sucrose.Program(["x"], Assign("x", Int(0))),
                 glucose.Program(["x"], Let("x", Tuple([Var("x")]), Set(Var("x"), Int(0), Int(0)))),
             ),
+            (
+                sucrose.Program(["x", "y"], Do(Assign("x", Int(0)), Assign("y", Int(1)))),
+                glucose.Program(
+                    ["x", "y"],
+                    Let(
+                        "y",
+                        Tuple([Var("y")]),
+                        Let("x", Tuple([Var("x")]), Do(Set(Var("x"), Int(0), Int(0)), Set(Var("y"), Int(0), Int(1)))),
+                    ),
+                ),
+            ),
         ]
     ),
 )
@@ -243,6 +255,15 @@ def test_convert_assignments_expression_if(
     assert convert_assignments_expression(expr, vars) == expected
 
 
+def test_convert_assignments_expression_while() -> None:
+    expr = While(LessThan(Var("x"), Int(3)), Assign("x", Add(Var("x"), Int(1))))
+    expected = While(
+        LessThan(Get(Var("x"), Int(0)), Int(3)),
+        Set(Var("x"), Int(0), Add(Get(Var("x"), Int(0)), Int(1))),
+    )
+    assert convert_assignments_expression(expr, {"x"}) == expected
+
+
 @pytest.mark.parametrize(
     "expr, vars, expected",
     list[tuple[sucrose.Expression, set[str], glucose.Expression]](
@@ -467,6 +488,7 @@ def test_convert_assignments_expression_apply(
             (Assign("x", Var("y")), {"x"}),
             (Lambda("x", Var("y")), set()),
             (Apply(Var("x"), []), set()),
+            (While(Var("x"), Assign("y", Int(0))), {"y"}),
         ]
     ),
 )
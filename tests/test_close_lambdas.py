@@ -23,12 +23,18 @@ from maltose import (
     Statement,
     Let,
     Apply,
+    Call,
     If,
     Halt,
+    Join,
+    Jump,
+    Loop,
 )
 from util import SequentialNameGenerator
 from close_lambdas import (
+    KnownFunctions,
     close,
+    known_functions,
     close_statement,
     free_variables_statement,
     free_variables_expression,
@@ -89,17 +95,27 @@ def test_free_variables_statement_fn():
 
 
 def test_close_statement_apply_with_args():
-    from maltose import Apply, Var, Let, Lambda, Halt, Int
+    from maltose import Apply, Var, Let, Int
+    from lactose import Get
     from close_lambdas import close_statement
     from util import SequentialNameGenerator
 
     fresh = SequentialNameGenerator()
     stmt = Apply(Var("x"), [Var("y")])
     closed = close_statement(stmt, fresh)
-    expected = Let("_k0", Lambda(["_t0"], Halt(Var("_t0"))), Apply(Var("x"), [Var("y"), Var("_k0")]))
+    expected = Let("_t0", Get(Var("x"), Int(0)), Apply(Var("_t0"), [Var("x"), Var("y")]))
     assert closed == expected
 
 
+def test_close_statement_call_passes_closure():
+    fresh = SequentialNameGenerator()
+    stmt = Let("y", Call(Var("f"), [Int(1)]), Halt(Var("y")))
+    assert close_statement(stmt, fresh) == Let(
+        "_t0", Get(Var("f"), Int(0)), Let("y", Call(Var("_t0"), [Var("f"), Int(1)]), Halt(Var("y")))
+    )
+    assert free_variables_statement(stmt) == {"f"}
+
+
 @pytest.mark.parametrize(
     "program, fresh, expected",
     list[tuple[Program, Callable[[str], str], Program]](
@@ -671,3 +687,107 @@ def test_close_expression_lambda_with_fvs():
     assert closed.parameters[0].startswith("_t")
     # The body should contain a Let for the free variable 'y'
     assert any(isinstance(closed.body, Let) and closed.body.name == "y" for _ in [0])
+
+
+def test_close_statement_join_stays_in_function():
+    fresh = SequentialNameGenerator()
+    stmt: Statement = Join("j", ["t"], Halt(Var("t")), If(Var("c"), Jump("j", [Var("x")]), Jump("j", [Int(0)])))
+    assert close_statement(stmt, fresh) == stmt
+
+
+def test_free_variables_statement_join():
+    stmt: Statement = Join("j", ["t"], Let("u", Add(Var("t"), Var("y")), Halt(Var("u"))), Jump("j", [Var("x")]))
+    assert free_variables_statement(stmt) == {"x", "y"}
+
+
+def test_close_statement_loop_stays_in_function():
+    fresh = SequentialNameGenerator()
+    stmt: Statement = Loop("l", ["i"], [Int(0)], If(Var("i"), Halt(Var("x")), Jump("l", [Var("i")])))
+    assert close_statement(stmt, fresh) == stmt
+    assert free_variables_statement(stmt) == {"x"}
+
+
+# What `letrec` leaves of `(letrec ((f (lambda (n) (f n)))) (f x))`: a cell for `f`, set once to its closure.
+LETREC: Statement = Let(
+    "c",
+    Tuple([Unit()]),
+    Let(
+        "f0",
+        Lambda(["n"], Let("g", Get(Var("c"), Int(0)), Apply(Var("g"), [Var("n")]))),
+        Let("s", Set(Var("c"), Int(0), Var("f0")), Let("h", Get(Var("c"), Int(0)), Apply(Var("h"), [Var("x")]))),
+    ),
+)
+
+
+def test_known_functions_see_through_letrec_cells() -> None:
+    known = known_functions(Program(["x"], LETREC), SequentialNameGenerator())
+    assert known == KnownFunctions(
+        closures={"f0": "f0", "g": "f0", "h": "f0"},
+        codes={"f0": "_t0"},
+        lifted={"f0": []},
+    )
+
+
+def test_close_lifts_lambdas_that_do_not_escape() -> None:
+    assert close(Program(["x"], LETREC), SequentialNameGenerator()) == Program(
+        ["x"],
+        Let(
+            "c",
+            Tuple([Unit()]),
+            Let(
+                "_t0",
+                Lambda(["n"], Apply(Var("_t0"), [Var("n")])),
+                Let("s", Copy(Unit()), Apply(Var("_t0"), [Var("x")])),
+            ),
+        ),
+    )
+
+
+def test_close_passes_free_variables_to_lifted_lambdas() -> None:
+    stmt: Statement = Let(
+        "f",
+        Lambda(["y"], Let("z", Add(Var("y"), Var("x")), Halt(Var("z")))),
+        Let("a", Call(Var("f"), [Int(1)]), Apply(Var("f"), [Var("a")])),
+    )
+    assert close(Program(["x"], stmt), SequentialNameGenerator()).body == Let(
+        "_t0",
+        Lambda(["x", "y"], Let("z", Add(Var("y"), Var("x")), Halt(Var("z")))),
+        Let("a", Call(Var("_t0"), [Var("x"), Int(1)]), Apply(Var("_t0"), [Var("x"), Var("a")])),
+    )
+
+
+def test_close_calls_known_escaping_lambdas_directly_with_their_closure() -> None:
+    stmt: Statement = Let(
+        "f",
+        Lambda(["y"], Let("z", Add(Var("y"), Var("x")), Halt(Var("z")))),
+        Let("a", Call(Var("f"), [Int(1)]), Halt(Var("f"))),
+    )
+    assert close(Program(["x"], stmt), SequentialNameGenerator()).body == Let(
+        "_t0",
+        Lambda(["_t1", "y"], Let("x", Get(Var("_t1"), Int(1)), Let("z", Add(Var("y"), Var("x")), Halt(Var("z"))))),
+        Let("f", Tuple([Var("_t0"), Var("x")]), Let("a", Call(Var("_t0"), [Var("f"), Int(1)]), Halt(Var("f")))),
+    )
+
+
+def test_known_functions_keep_closures_for_calls_out_of_scope_of_a_free_variable() -> None:
+    # The cell is read, and called, before `z` (which the lambda refers to) is bound.
+    stmt: Statement = Let(
+        "c",
+        Tuple([Unit()]),
+        Let(
+            "g",
+            Get(Var("c"), Int(0)),
+            Let(
+                "r",
+                Call(Var("g"), []),
+                Let(
+                    "z",
+                    Copy(Int(1)),
+                    Let("f", Lambda([], Halt(Var("z"))), Let("s", Set(Var("c"), Int(0), Var("f")), Halt(Var("r")))),
+                ),
+            ),
+        ),
+    )
+    known = known_functions(Program([], stmt), SequentialNameGenerator())
+    assert known.closures == {"f": "f", "g": "f"}
+    assert known.lifted == {}
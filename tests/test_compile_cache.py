@@ -0,0 +1,47 @@
+import os
+from pathlib import Path
+from compile_cache import CompileCache, compiler_version
+
+
+def test_key_depends_on_source_and_options(
+    tmp_path: Path,
+) -> None:
+    cache = CompileCache(str(tmp_path))
+    assert cache.key("(program () 0)") == cache.key("(program () 0)")
+    assert cache.key("(program () 0)") != cache.key("(program () 1)")
+    assert cache.key("(program () 0)", {"O": 2}) != cache.key("(program () 0)", {"O": 0})
+    assert cache.key("(program () 0)", {"a": 1, "b": 2}) == cache.key("(program () 0)", {"b": 2, "a": 1})
+
+
+def test_compiler_version_is_stable() -> None:
+    assert compiler_version() == compiler_version()
+    assert len(compiler_version()) == 64
+
+
+def test_get_put_counts_hits_and_misses(
+    tmp_path: Path,
+) -> None:
+    cache = CompileCache(str(tmp_path))
+    key = cache.key("(program () 0)")
+    assert cache.get(key) is None
+    cache.put(key, b"ir")
+    cache.put(key, b"object", kind="o")
+    assert cache.get(key) == b"ir"
+    assert cache.get(key, kind="o") == b"object"
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_put_evicts_least_recently_used(
+    tmp_path: Path,
+) -> None:
+    cache = CompileCache(str(tmp_path), max_bytes=10)
+    cache.put("a", b"aaaa")
+    cache.put("b", b"bbbb")
+    os.utime(tmp_path / "a.ll", (0, 0))
+    os.utime(tmp_path / "b.ll", (1, 1))
+    cache.get("a")  # touching "a" makes "b" the least recently used entry
+    cache.put("c", b"cccc")
+    assert cache.get("a") == b"aaaa"
+    assert cache.get("b") is None
+    assert cache.get("c") == b"cccc"
+    assert not [name for name in os.listdir(tmp_path) if name.startswith(".tmp-")]
@@ -0,0 +1,56 @@
+import ctypes
+import shutil
+import subprocess
+from pathlib import Path
+import pytest
+from emit import LinkError, emit, link
+from main import compile_to_ir
+
+needs_cc = pytest.mark.skipif(shutil.which("cc") is None, reason="no C compiler")
+
+SOURCE = "(program (x y) (- x y))"
+
+
+def test_emit_kinds() -> None:
+    llvm_ir = compile_to_ir(SOURCE)
+    assert b"define internal tailcc i64 @_start(" in emit(llvm_ir, "ll")
+    assert b"main:" in emit(llvm_ir, "asm")
+    assert emit(llvm_ir, "bc").startswith(b"BC\xc0\xde")
+    assert emit(llvm_ir, "obj", optimization_level=2).startswith(b"\x7fELF")
+
+
+@needs_cc
+def test_link_executable(
+    tmp_path: Path,
+) -> None:
+    output = str(tmp_path / "program")
+    link(compile_to_ir(SOURCE, optimization_level=2), output)
+    assert subprocess.run([output, "50", "8"]).returncode == 42
+
+
+@needs_cc
+def test_link_shared_library(
+    tmp_path: Path,
+) -> None:
+    output = str(tmp_path / "program.so")
+    link(compile_to_ir(SOURCE), output, shared=True)
+    entry = ctypes.CDLL(output)._entry
+    entry.restype = ctypes.c_int64
+    assert entry((ctypes.c_int64 * 2)(10, 3)) == 7
+
+
+def test_link_reports_missing_compiler(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setenv("CC", str(tmp_path / "no-such-cc"))
+    with pytest.raises(LinkError):
+        link(compile_to_ir(SOURCE), str(tmp_path / "program"))
+
+
+@needs_cc
+def test_link_reports_linker_errors(
+    tmp_path: Path,
+) -> None:
+    with pytest.raises(LinkError):
+        link(compile_to_ir(SOURCE), str(tmp_path / "missing" / "program"))
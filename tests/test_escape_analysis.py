@@ -0,0 +1,121 @@
+import json
+from lactose import (
+    Program,
+    Int,
+    Var,
+    Add,
+    Tuple,
+    Alloca,
+    Get,
+    Set,
+    Copy,
+    Global,
+    Call,
+    Lambda,
+    Let,
+    If,
+    Halt,
+    Join,
+    Jump,
+)
+from escape_analysis import AllocationSite, allocation_sites_json, escape_analysis, format_allocation_sites
+
+
+def test_cell_read_and_written_in_place_is_stack_allocated() -> None:
+    body = Let(
+        "c",
+        Tuple([Var("x")]),
+        Let("_", Set(Var("c"), Int(0), Int(1)), Let("v", Get(Var("c"), Int(0)), Halt(Var("v")))),
+    )
+    sites: list[AllocationSite] = []
+    program = escape_analysis(Program(["x"], body, {}), sites)
+    assert program.body == Let(
+        "c",
+        Alloca([Var("x")]),
+        Let("_", Set(Var("c"), Int(0), Int(1)), Let("v", Get(Var("c"), Int(0)), Halt(Var("v")))),
+    )
+    assert sites == [AllocationSite("_start", "c", 1, True)]
+
+
+def test_returned_tuple_stays_on_the_heap_through_copies() -> None:
+    body = Let("t", Tuple([Int(1), Int(2)]), Let("u", Copy(Var("t")), Halt(Var("u"))))
+    sites: list[AllocationSite] = []
+    program = escape_analysis(Program([], body, {}), sites)
+    assert program.body == body
+    assert sites == [AllocationSite("_start", "t", 2, False, "returned")]
+
+
+def test_stored_and_jumped_tuples_escape() -> None:
+    body = Let(
+        "a",
+        Tuple([Int(0)]),
+        Let(
+            "b",
+            Tuple([Var("a")]),
+            Join("j", ["r"], Halt(Int(0)), If(Var("x"), Jump("j", [Var("b")]), Jump("j", [Int(0)]))),
+        ),
+    )
+    sites: list[AllocationSite] = []
+    escape_analysis(Program(["x"], body, {}), sites)
+    assert [(s.name, s.reason) for s in sites] == [("a", "stored in a tuple"), ("b", "passed to a join point")]
+
+
+def closure_call(
+    function: Lambda,
+) -> Program:
+    body = Let(
+        "code",
+        Global("f"),
+        Let(
+            "closure",
+            Tuple([Var("code"), Var("x")]),
+            Let("g", Get(Var("closure"), Int(0)), Let("r", Call(Var("g"), [Var("closure"), Int(1)]), Halt(Var("r")))),
+        ),
+    )
+    return Program(["x"], body, {"f": function})
+
+
+def test_closure_passed_to_its_own_code_is_stack_allocated() -> None:
+    function = Lambda(
+        ["env", "y"], Let("x", Get(Var("env"), Int(1)), Let("s", Add(Var("x"), Var("y")), Halt(Var("s"))))
+    )
+    sites: list[AllocationSite] = []
+    program = escape_analysis(closure_call(function), sites)
+    assert sites == [AllocationSite("_start", "closure", 2, True)]
+    assert isinstance(program.body.body.value, Alloca)  # type: ignore
+
+
+def test_closure_escapes_when_its_code_returns_it() -> None:
+    sites: list[AllocationSite] = []
+    escape_analysis(closure_call(Lambda(["env", "y"], Halt(Var("env")))), sites)
+    assert sites == [AllocationSite("_start", "closure", 2, False, "passed to f")]
+
+
+def test_recursive_function_that_only_reads_its_argument() -> None:
+    # f passes its own parameter to itself: the optimistic summary holds, so the caller's tuple stays on the stack.
+    function = Lambda(
+        ["p"],
+        Let(
+            "code",
+            Global("f"),
+            Let("v", Get(Var("p"), Int(0)), Let("r", Call(Var("code"), [Var("p")]), Halt(Var("v")))),
+        ),
+    )
+    body = Let("code", Global("f"), Let("t", Tuple([Int(1)]), Let("r", Call(Var("code"), [Var("t")]), Halt(Var("r")))))
+    sites: list[AllocationSite] = []
+    escape_analysis(Program([], body, {"f": function}), sites)
+    assert sites == [AllocationSite("_start", "t", 1, True)]
+
+
+def test_unknown_callee_lets_arguments_escape() -> None:
+    body = Let("t", Tuple([Int(1)]), Let("r", Call(Var("k"), [Var("t")]), Halt(Var("r"))))
+    sites: list[AllocationSite] = []
+    escape_analysis(Program(["k"], body, {}), sites)
+    assert sites == [AllocationSite("_start", "t", 1, False, "passed to an unknown function")]
+
+
+def test_allocation_site_reports() -> None:
+    sites = [AllocationSite("_start", "a", 1, True), AllocationSite("f", "b", 2, False, "returned")]
+    assert format_allocation_sites(sites).splitlines()[-1] == "1 of 2 sites on the stack"
+    assert "returned" in format_allocation_sites(sites)
+    assert [site["stack"] for site in json.loads(allocation_sites_json(sites))] == [True, False]
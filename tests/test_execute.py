@@ -0,0 +1,368 @@
+import array
+import pytest
+from execute import ArenaStatistics, BatchError, JitSession, execute
+from main import compile
+
+
+def test_execute_main() -> None:
+    assert execute(str(compile("(program (x y) (* x (+ y 1)))")), ["6", "6"]) == 42
+
+
+def test_session_reuses_compiled_programs() -> None:
+    source = str(compile("(program (x) (* x 2))"))
+    with JitSession() as session:
+        program = session.load(source)
+        assert session.load(source) is program
+        assert [program(x) for x in range(4)] == [0, 2, 4, 6]
+        assert program.main(["21"]) == 42
+
+
+def test_session_keeps_programs_apart() -> None:
+    with JitSession() as session:
+        double = session.load(str(compile("(program (x) (* x 2))")))
+        negate = session.load(str(compile("(program (x) (- 0 x))")))
+        constant = session.load(str(compile("(program () 7)")))
+        assert (double(5), negate(5), constant()) == (10, -5, 7)
+
+
+def test_session_checks_arity() -> None:
+    with JitSession() as session:
+        program = session.load(str(compile("(program (x) x)")))
+        with pytest.raises(TypeError):
+            program(1, 2)
+
+
+def test_batch_over_rows() -> None:
+    with JitSession() as session:
+        program = session.load(str(compile("(program (x y) (- (* x 10) y))")))
+        inputs = array.array("q", [1, 2, 3, 4, 5, 6])
+        assert list(program.batch(memoryview(inputs).cast("B").cast("q", (3, 2)))) == [8, 26, 44]
+        assert list(program.batch(inputs)) == [8, 26, 44]
+
+
+def test_batch_into_buffer_with_workers() -> None:
+    with JitSession() as session:
+        program = session.load(str(compile("(program (x) (* x x))")))
+        out = array.array("q", bytes(8 * 1000))
+        assert program.batch(array.array("q", range(1000)), out, workers=4) is out
+        assert list(out) == [x * x for x in range(1000)]
+
+
+def test_batch_read_only_inputs() -> None:
+    with JitSession() as session:
+        program = session.load(str(compile("(program (x) (+ x 1))")))
+        assert list(program.batch(memoryview(bytes(array.array("q", [1, 2]))).cast("q"))) == [2, 3]
+
+
+def test_batch_rejects_bad_buffers() -> None:
+    with JitSession() as session:
+        program = session.load(str(compile("(program (x y) (+ x y))")))
+        with pytest.raises(BatchError):
+            program.batch(array.array("i", [1, 2]))
+        with pytest.raises(BatchError):
+            program.batch(array.array("q", [1, 2, 3]))
+        with pytest.raises(BatchError):
+            program.batch(memoryview(array.array("q", [1, 2, 3])).cast("B").cast("q", (1, 3)))
+        with pytest.raises(BatchError):
+            program.batch(array.array("q", [1, 2]), out=bytes(8))
+
+
+@pytest.mark.parametrize("level", [0, 1, 2, 3])
+def test_optimization_levels_agree(
+    level: int,
+) -> None:
+    source = str(compile("(program (x y) (let* ((a (+ x y)) (b (* a a))) (- b x)))"))
+    with JitSession() as session:
+        assert session.load(source, level)(3, 4) == 46
+        assert list(session.load(source, level).batch(array.array("q", [1, 2, 3, 4]))) == [8, 46]
+    assert execute(source, ["3", "4"], level) == 46
+
+
+def test_while_loops_run_natively() -> None:
+    with JitSession() as session:
+        factorial = session.load(str(compile(open("examples/factorial.fru").read())))
+        assert [factorial(n) for n in range(6)] == [1, 1, 2, 6, 24, 120]
+
+
+@pytest.mark.parametrize(
+    "source, arguments, expected",
+    [
+        (
+            "(program (n) (letrec ((fib (lambda (n) (if (< n 2) n (+ (fib (- n 1)) (fib (- n 2))))))) (fib n)))",
+            (20,),
+            6765,
+        ),
+        ("(program (x) (let ((add (lambda (y) (lambda (z) (+ y z))))) ((add x) 10)))", (5,), 15),
+        ("(program (n) (let ((twice (lambda (f x) (f (f x))))) (twice (lambda (y) (* y 3)) n)))", (2,), 18),
+        (
+            "(program (n) (letrec ((count (lambda (n acc) (if (= n 0) acc (count (- n 1) (+ acc 1)))))) (count n 0)))",
+            (10_000_000,),
+            10_000_000,
+        ),
+    ],
+)
+def test_calls_return_directly(
+    source: str,
+    arguments: tuple[int, ...],
+    expected: int,
+) -> None:
+    with JitSession() as session:
+        assert session.load(str(compile(source)))(*arguments) == expected
+
+
+def test_stack_allocated_cells_in_loops_and_tail_calls() -> None:
+    loop = """
+        (program (n)
+          (let ((s 0))
+            (begin
+              (while (> n 0) (let ((c (cell n))) (begin (set! s (+ s (^ c))) (set! n (- n 1)))))
+              s)))
+    """
+    recursion = """
+        (program (n)
+          (letrec ((loop (lambda (i acc)
+                           (if (= i 0)
+                               acc
+                               (let ((c (cell i))) (begin (:= c (+ (^ c) acc)) (loop (- i 1) (^ c))))))))
+            (loop n 0)))
+    """
+    with JitSession() as session:
+        assert session.load(str(compile(loop)))(100_000) == 5_000_050_000
+        assert session.load(str(compile(recursion)))(1_000_000) == 500_000_500_000
+
+
+# `box` returns its cell, so with inlining off (which would let escape analysis see it) every cell is on the heap.
+PAIRS = """
+    (program (n)
+      (letrec ((box (lambda (i) (cell i)))
+               (loop (lambda (i acc) (if (= i 0) acc (loop (- i 1) (+ acc (^ (box i))))))))
+        (loop n 0)))
+"""
+
+
+def test_arena_is_reset_between_runs() -> None:
+    with JitSession() as session:
+        program = session.load(str(compile(PAIRS, inline_budget=0)))
+        assert program.arena() == ArenaStatistics(0, 0, 0, 0)
+        assert program(1_000_000) == 500_000_500_000
+        first = program.arena()
+        assert first.allocations >= 1_000_000
+        assert program(1_000_000) == 500_000_500_000
+        second = program.arena()
+        assert second.allocations == 2 * first.allocations
+        assert second.bytes == 2 * first.bytes
+        # The second run starts in the chunk the first one kept, so it takes one chunk fewer from malloc.
+        assert second.chunks - first.chunks == first.chunks - 1
+
+
+def test_batch_workers_allocate_in_their_own_arenas() -> None:
+    with JitSession() as session:
+        program = session.load(str(compile(PAIRS, inline_budget=0)))
+        out = program.batch(array.array("q", range(1000)), workers=4)
+        assert list(out) == [n * (n + 1) // 2 for n in range(1000)]
+        assert len(program._copies) == 3
+        assert program.arena().allocations >= sum(range(1000))
+
+
+# A chain of closures, each holding the one before it and a boxed integer, with garbage allocated on every call.
+CHAIN = """
+    (program (n)
+      (letrec ((box (lambda (i) (cell i))))
+        (let ((f (lambda (x) x)) (i 0))
+          (begin
+            (while (< i n)
+              (begin
+                (set! f (let ((g f) (j (box i))) (lambda (x) (+ (g x) (^ (box (^ j)))))))
+                (set! i (+ i 1))))
+            (f 0)))))
+"""
+
+
+@pytest.mark.parametrize("optimization_level", [0, 2])
+def test_gc_keeps_live_tuples_across_collections(
+    optimization_level: int,
+) -> None:
+    with JitSession() as session:
+        program = session.load(str(compile(CHAIN, gc=True)), optimization_level)
+        assert program(30_000) == 449_985_000
+        assert program.arena().collections > 1
+        assert program(-2) == 0
+
+
+def test_gc_runs_allocating_loops_in_bounded_memory() -> None:
+    with JitSession() as session:
+        program = session.load(str(compile(PAIRS, gc=True, inline_budget=0)))
+        assert program(3_000_000) == 4_500_001_500_000
+        statistics = program.arena()
+        assert statistics.allocations >= 3_000_000
+        assert statistics.chunks == 2  # the two semispaces, never grown
+        assert statistics.collections >= 40
+
+
+@pytest.mark.parametrize("gc", [False, True])
+def test_arithmetic_with_and_without_tags(
+    gc: bool,
+) -> None:
+    source = "(program (a b) (if (< a b) (- (* a b) (/ b a)) (+ a (* -3 b))))"
+    with JitSession() as session:
+        program = session.load(str(compile(source, gc=gc)))
+        assert [program(-7, 2), program(3, 10), program(5, -4)] == [-14, 27, 17]  # division truncates
+        assert program.main(["3", "10"]) == 27
+        out = program.batch(array.array("q", [3, 10, 5, -4]), workers=2)
+        assert list(out) == [27, 17]
+
+
+# Collatz steps, with `set!` on a parameter and on locals inside a conditional inside a loop.
+COLLATZ = """
+    (program (n)
+      (let ((steps 0) (peak n))
+        (begin
+          (while (> n 1)
+            (begin
+              (if (= (* (/ n 2) 2) n) (set! n (/ n 2)) (set! n (+ (* 3 n) 1)))
+              (if (> n peak) (set! peak n) (set! peak peak))
+              (set! steps (+ steps 1))))
+          (+ (* steps 1000000) peak))))
+"""
+
+
+def collatz(
+    n: int,
+) -> int:
+    steps, peak = 0, n
+    while n > 1:
+        n = n // 2 if n % 2 == 0 else 3 * n + 1
+        peak = max(peak, n)
+        steps += 1
+    return steps * 1_000_000 + peak
+
+
+@pytest.mark.parametrize("gc", [False, True])
+def test_uncaptured_mutable_variables_live_in_registers(
+    gc: bool,
+) -> None:
+    module = compile(COLLATZ, gc=gc)
+    start = str(module.get_global("_start"))  # type: ignore
+    assert "_arena_alloc" not in start
+    assert start.count(" alloca ") == (1 if gc else 0)  # just the shadow-stack frame under --gc
+    with JitSession() as session:
+        program = session.load(str(module))
+        assert [program(n) for n in [1, 6, 27, 97]] == [collatz(n) for n in [1, 6, 27, 97]]
+
+
+# `twice` and `sum` are only ever called, so they are called directly; the lambdas passed to them escape.
+HIGHER_ORDER = """
+    (program (n)
+      (letrec ((twice (lambda (f x) (f (f x))))
+               (sum (lambda (f i acc) (if (< i 0) acc (sum f (- i 1) (+ acc (f i)))))))
+        (let ((k 3))
+          (sum (lambda (i) (twice (lambda (x) (+ x k)) i)) n 0))))
+"""
+
+EVEN = """
+    (program (n)
+      (letrec ((even (lambda (n) (if (= n 0) #t (odd (- n 1)))))
+               (odd (lambda (n) (if (= n 0) #f (even (- n 1))))))
+        (if (even n) 1 0)))
+"""
+
+
+@pytest.mark.parametrize("gc", [False, True])
+def test_known_functions_are_called_directly(
+    gc: bool,
+) -> None:
+    module = str(compile(HIGHER_ORDER, gc=gc))
+    assert 'tail call tailcc i64 @"_f3"' in module  # `sum` calling itself
+    with JitSession() as session:
+        program = session.load(module)
+        assert [program(n) for n in [0, 10, 100]] == [n * (n + 1) // 2 + 6 * (n + 1) for n in [0, 10, 100]]
+        program = session.load(str(compile(EVEN, gc=gc)))
+        assert [program(n) for n in [0, 7, 10_000]] == [1, 0, 1]
+        assert program.arena().allocations == 0
+
+
+# Each conditional passes its result on to a lambda for the rest of the program, as a continuation.
+CONTINUATIONS = """
+    (program (x)
+      (let ((k0 (lambda (a0)
+                  (let ((k1 (lambda (a1) (let ((k2 (lambda (a2) (* a2 a2)))) (if (< a1 6) (k2 (+ a1 3)) (k2 (- a1 3)))))))
+                    (if (< a0 3) (k1 (+ a0 2)) (k1 (- a0 2)))))))
+        (if (< x 0) (k0 (+ x 1)) (k0 (- x 1)))))
+"""
+
+
+@pytest.mark.parametrize("gc", [False, True])
+def test_inlined_functions_compute_what_their_calls_did(
+    gc: bool,
+) -> None:
+    inlined, called = str(compile(CONTINUATIONS, gc=gc)), str(compile(CONTINUATIONS, gc=gc, inline_budget=0))
+    assert inlined.count("define tailcc") < called.count("define tailcc")
+    with JitSession() as session:
+        first, second = session.load(inlined), session.load(called)
+        assert [first(x) for x in range(-5, 12)] == [second(x) for x in range(-5, 12)]
+        for source in [HIGHER_ORDER, EVEN]:
+            first, second = (
+                session.load(str(compile(source, gc=gc))),
+                session.load(str(compile(source, gc=gc, inline_budget=0))),
+            )
+            assert [first(n) for n in [0, 5, 100]] == [second(n) for n in [0, 5, 100]]
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        "(program (n) (let ((tuple (lambda (x) (+ x 1)))) (tuple n)))",
+        "(program (n) ((lambda (tuple) (tuple n)) (lambda (x) (+ x 1))))",
+        "(program (n) (match (lambda (x) (+ x 1)) (tuple (tuple n))))",
+    ],
+)
+def test_shadowed_tuple_is_called(
+    source: str,
+) -> None:
+    assert execute(str(compile(source)), ["5"]) == 6
+
+
+# The scrutinee counts how often it is evaluated; the tuple is destructured without ever being built.
+MATCHES = """
+    (program (a b)
+      (let ((calls 0))
+        (let ((r (match (begin (set! calls (+ calls 1)) (tuple a (tuple b (+ a b))))
+                   ((tuple 0 (tuple 0 _)) 1)
+                   ((tuple 0 (tuple y _)) (+ 10 y))
+                   ((tuple x (tuple 0 s)) (+ 100 (* x s)))
+                   ((tuple x (tuple y 5)) (+ 1000 (- x y)))
+                   ((tuple 1 _) 2)
+                   ((tuple 2 _) 3)
+                   ((tuple 3 _) 4)
+                   ((tuple x _) (match (< x b) (#t 5) (#f 6))))))
+          (+ (* r 10) calls))))
+"""
+
+
+def matches(
+    a: int,
+    b: int,
+) -> int:
+    if a == 0:
+        r = 1 if b == 0 else 10 + b
+    elif b == 0:
+        r = 100 + a * a
+    elif a + b == 5:
+        r = 1000 + a - b
+    else:
+        r = {1: 2, 2: 3, 3: 4}.get(a, 5 if a < b else 6)
+    return r * 10 + 1
+
+
+@pytest.mark.parametrize("gc", [False, True])
+def test_match_evaluates_its_scrutinee_once(
+    gc: bool,
+) -> None:
+    module = str(compile(MATCHES, gc=gc))
+    assert "switch i64" in module
+    with JitSession() as session:
+        for level in [0, 2]:
+            program = session.load(module, level)
+            pairs = [(a, b) for a in range(-2, 6) for b in range(-2, 6)]
+            assert [program(a, b) for a, b in pairs] == [matches(a, b) for a, b in pairs]
+            assert program.arena().allocations == 0
@@ -21,11 +21,16 @@ from glucose import (
     Do,
     Lambda,
     Apply,
+    While,
 )
 import maltose
 from maltose import (
+    Call,
     Copy,
     Halt,
+    Join,
+    Jump,
+    Loop,
 )
 from util import SequentialNameGenerator
 from explicate_control import explicate_control, explicate_control_expression, explicate_control_expressions
@@ -182,7 +187,7 @@ def test_explicate_control_expression_multiply(
                 Div(Int(0), Int(0)),
                 lambda v: Halt(v),
                 SequentialNameGenerator(),
-                Let("_t0", Copy(Div(Int(0), Int(0))), Halt(Var("_t0"))),
+                Let("_t0", Div(Int(0), Int(0)), Halt(Var("_t0"))),
             ),
         ]
     ),
@@ -298,12 +303,52 @@ def test_explicate_control_expression_bool(
                 If(Bool(True), Int(1), Int(0)),
                 lambda v: Halt(v),
                 SequentialNameGenerator(),
-                Let(
+                Join(
+                    "_j0",
+                    ["_t0"],
+                    Halt(Var("_t0")),
+                    If(Bool(True), Jump("_j0", [Int(1)]), Jump("_j0", [Int(0)])),
+                ),
+            ),
+            (
+                If(Apply(Var("f"), []), Int(1), Int(0)),
+                lambda v: Halt(v),
+                SequentialNameGenerator(),
+                Join(
+                    "_j0",
+                    ["_t0"],
+                    Halt(Var("_t0")),
+                    Let("_t1", Call(Var("f"), []), If(Var("_t1"), Jump("_j0", [Int(1)]), Jump("_j0", [Int(0)]))),
+                ),
+            ),
+            # A conditional whose value goes straight to a join point jumps there itself.
+            (
+                If(Var("c"), Int(1), Int(0)),
+                lambda v: Jump("_k", [v]),
+                SequentialNameGenerator(),
+                If(Var("c"), Jump("_k", [Int(1)]), Jump("_k", [Int(0)])),
+            ),
+            (
+                If(Bool(True), Apply(Var("f"), []), Int(0)),
+                lambda v: Halt(v),
+                SequentialNameGenerator(),
+                Join(
                     "_j0",
-                    Lambda(["_t0"], Halt(Var("_t0"))),
-                    If(Bool(True), Apply(Var("_j0"), [Int(1)]), Apply(Var("_j0"), [Int(0)])),
+                    ["_t0"],
+                    Halt(Var("_t0")),
+                    If(
+                        Bool(True),
+                        Let("_t1", Call(Var("f"), []), Jump("_j0", [Var("_t1")])),
+                        Jump("_j0", [Int(0)]),
+                    ),
                 ),
             ),
+            (
+                If(Bool(True), Apply(Var("f"), []), Int(0)),
+                Halt,
+                SequentialNameGenerator(),
+                If(Bool(True), Apply(Var("f"), []), Halt(Int(0))),
+            ),
         ]
     ),
 )
@@ -542,6 +587,12 @@ def test_explicate_control_expression_set(
                 SequentialNameGenerator(),
                 Let("_t0", Set(Var("x"), Int(0), Var("y")), Halt(Int(0))),
             ),
+            (
+                Do(Var("y"), Apply(Var("f"), [])),
+                Halt,
+                SequentialNameGenerator(),
+                Apply(Var("f"), []),
+            ),
         ]
     ),
 )
@@ -571,7 +622,7 @@ def test_explicate_control_expression_do(
                 SequentialNameGenerator(),
                 Let(
                     "_t0",
-                    Lambda(["_k0"], Apply(Var("_k0"), [Unit()])),
+                    Lambda([], Halt(Unit())),
                     Halt(Var("_t0")),
                 ),
             ),
@@ -581,7 +632,7 @@ def test_explicate_control_expression_do(
                 SequentialNameGenerator(),
                 Let(
                     "_t0",
-                    Lambda(["x", "_k0"], Apply(Var("_k0"), [Var("x")])),
+                    Lambda(["x"], Halt(Var("x"))),
                     Halt(Var("_t0")),
                 ),
             ),
@@ -612,21 +663,19 @@ def test_explicate_control_expression_lambda(
                 Apply(Var("x"), []),
                 lambda v: Halt(v),
                 SequentialNameGenerator(),
-                Let(
-                    "_k0",
-                    Lambda(["_t0"], Halt(Var("_t0"))),
-                    Apply(Var("x"), [Var("_k0")]),
-                ),
+                Let("_t0", Call(Var("x"), []), Halt(Var("_t0"))),
             ),
             (
                 Apply(Var("x"), [Int(0)]),
-                lambda v: Halt(v),
+                lambda v: Let("y", Copy(v), Halt(Var("y"))),
                 SequentialNameGenerator(),
-                Let(
-                    "_k0",
-                    Lambda(["_t0"], Halt(Var("_t0"))),
-                    Apply(Var("x"), [Int(0), Var("_k0")]),
-                ),
+                Let("_t0", Call(Var("x"), [Int(0)]), Let("y", Copy(Var("_t0")), Halt(Var("y")))),
+            ),
+            (
+                Apply(Var("x"), [Int(0)]),
+                Halt,
+                SequentialNameGenerator(),
+                Apply(Var("x"), [Int(0)]),
             ),
         ]
     ),
@@ -673,3 +722,21 @@ def test_explicate_control_expressions(
     expected: maltose.Statement,
 ) -> None:
     assert explicate_control_expressions(exprs, k, fresh) == expected
+
+
+def test_explicate_control_expression_while() -> None:
+    expr = While(LessThan(Var("i"), Int(3)), Set(Var("c"), Int(0), Int(1)))
+    assert explicate_control_expression(expr, lambda v: Halt(v), SequentialNameGenerator()) == Loop(
+        "_loop0",
+        [],
+        [],
+        Let(
+            "_t0",
+            LessThan(Var("i"), Int(3)),
+            If(
+                Var("_t0"),
+                Let("_t1", Set(Var("c"), Int(0), Int(1)), Jump("_loop0", [])),
+                Halt(Unit()),
+            ),
+        ),
+    )
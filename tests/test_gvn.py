@@ -0,0 +1,144 @@
+from lactose import (
+    Program,
+    Int,
+    Var,
+    Add,
+    Multiply,
+    Tuple,
+    Get,
+    Set,
+    Copy,
+    Call,
+    Lambda,
+    Let,
+    If,
+    Halt,
+    Join,
+    Jump,
+)
+from escape_analysis import START
+from gvn import gvn
+
+
+def run(
+    parameters: list[str],
+    body: object,
+) -> tuple[object, dict[str, int]]:
+    eliminated: dict[str, int] = {}
+    return gvn(Program(parameters, body, {}), eliminated).body, eliminated  # type: ignore
+
+
+def test_redundant_arithmetic_is_computed_once() -> None:
+    # Commutative operators are numbered whatever the order of their operands.
+    body = Let(
+        "a",
+        Add(Var("x"), Int(1)),
+        Let("b", Add(Int(1), Var("x")), Let("c", Multiply(Var("a"), Var("b")), Halt(Var("c")))),
+    )
+    assert run(["x"], body) == (
+        Let("a", Add(Var("x"), Int(1)), Let("c", Multiply(Var("a"), Var("a")), Halt(Var("c")))),
+        {START: 1},
+    )
+
+
+def test_copies_are_propagated() -> None:
+    body = Let("a", Copy(Var("x")), Let("b", Copy(Int(2)), Let("c", Add(Var("a"), Var("b")), Halt(Var("c")))))
+    assert run(["x"], body) == (Let("c", Add(Var("x"), Int(2)), Halt(Var("c"))), {START: 0})
+
+
+def test_reads_are_shared_until_memory_changes() -> None:
+    body = Let(
+        "a",
+        Get(Var("t"), Int(0)),
+        Let(
+            "b",
+            Get(Var("t"), Int(0)),
+            Let(
+                "u",
+                Set(Var("t"), Int(0), Var("x")),
+                Let(
+                    "c",
+                    Get(Var("t"), Int(0)),
+                    Let(
+                        "d",
+                        Call(Var("f"), []),
+                        Let(
+                            "e",
+                            Get(Var("t"), Int(0)),
+                            Let("r", Tuple([Var("a"), Var("b"), Var("c"), Var("e")]), Halt(Var("r"))),
+                        ),
+                    ),
+                ),
+            ),
+        ),
+    )
+    # The read after the `Set` is the value it wrote; the call may write anything.
+    assert run(["t", "x", "f"], body) == (
+        Let(
+            "a",
+            Get(Var("t"), Int(0)),
+            Let(
+                "u",
+                Set(Var("t"), Int(0), Var("x")),
+                Let(
+                    "d",
+                    Call(Var("f"), []),
+                    Let(
+                        "e",
+                        Get(Var("t"), Int(0)),
+                        Let("r", Tuple([Var("a"), Var("a"), Var("x"), Var("e")]), Halt(Var("r"))),
+                    ),
+                ),
+            ),
+        ),
+        {START: 2},
+    )
+
+
+def test_branches_and_join_points_are_scopes() -> None:
+    join_body = Let("e", Multiply(Var("x"), Int(2)), Halt(Var("e")))
+    body = Join(
+        "j",
+        ["p"],
+        join_body,
+        Let(
+            "a",
+            Add(Var("x"), Int(1)),
+            If(
+                Var("c"),
+                Let("b", Add(Var("x"), Int(1)), Jump("j", [Var("b")])),
+                Let("d", Multiply(Var("x"), Int(2)), Jump("j", [Var("d")])),
+            ),
+        ),
+    )
+    assert run(["c", "x"], body) == (
+        Join(
+            "j",
+            ["p"],
+            join_body,
+            Let(
+                "a",
+                Add(Var("x"), Int(1)),
+                If(Var("c"), Jump("j", [Var("a")]), Let("d", Multiply(Var("x"), Int(2)), Jump("j", [Var("d")]))),
+            ),
+        ),
+        {START: 1},
+    )
+
+
+def test_eliminated_is_counted_per_function() -> None:
+    square = Let("a", Multiply(Var("y"), Var("y")), Let("b", Multiply(Var("y"), Var("y")), Halt(Var("b"))))
+    program = Program(["x"], Halt(Var("x")), {"square": Lambda(["y"], square)})
+    eliminated: dict[str, int] = {}
+    result = gvn(program, eliminated)
+    assert result.functions["square"].body == Let("a", Multiply(Var("y"), Var("y")), Halt(Var("a")))
+    assert eliminated == {START: 0, "square": 1}
+
+
+def test_bodies_binding_a_name_twice_are_left_alone() -> None:
+    body = If(
+        Var("c"),
+        Let("a", Add(Var("x"), Int(1)), Halt(Var("a"))),
+        Let("a", Add(Var("x"), Int(1)), Halt(Var("a"))),
+    )
+    assert run(["c", "x"], body) == (body, {START: 0})
@@ -10,6 +10,9 @@ from maltose import (
     Apply,
     If,
     Halt,
+    Join,
+    Jump,
+    Loop,
 )
 import lactose
 from lactose import Global
@@ -183,3 +186,33 @@ def test_hoist_statement_halt(
     expected: lactose.Statement,
 ) -> None:
     assert hoist_statement(stmt, fresh) == expected
+
+
+def test_hoist_statement_join() -> None:
+    stmt: maltose.Statement = Join(
+        "j",
+        ["t"],
+        Let("f", Lambda([], Halt(Int(0))), Halt(Var("t"))),
+        Jump("j", [Int(1)]),
+    )
+    assert hoist_statement(stmt, SequentialNameGenerator()) == (
+        Join("j", ["t"], Let("f", Global("_f0"), Halt(Var("t"))), Jump("j", [Int(1)])),
+        {"_f0": Lambda([], Halt(Int(0)))},
+    )
+
+
+def test_hoist_statement_loop() -> None:
+    stmt: maltose.Statement = Loop("l", [], [], Let("f", Lambda([], Halt(Int(0))), Jump("l", [])))
+    assert hoist_statement(stmt, SequentialNameGenerator()) == (
+        Loop("l", [], [], Let("f", Global("_f0"), Jump("l", []))),
+        {"_f0": Lambda([], Halt(Int(0)))},
+    )
+
+
+def test_hoist_binds_code_variables_functions_call_directly() -> None:
+    stmt: maltose.Statement = Let("f", Lambda(["n"], Apply(Var("f"), [Var("n")])), Apply(Var("f"), [Int(1)]))
+    assert hoist(maltose.Program([], stmt), SequentialNameGenerator()) == lactose.Program(
+        [],
+        Let("f", Global("_f0"), Apply(Var("f"), [Int(1)])),
+        {"_f0": Lambda(["n"], Let("f", Global("_f0"), Apply(Var("f"), [Var("n")])))},
+    )
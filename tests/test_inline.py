@@ -0,0 +1,123 @@
+import json
+from lactose import (
+    Program,
+    Int,
+    Var,
+    Add,
+    LessThan,
+    Tuple,
+    Copy,
+    Global,
+    Call,
+    Lambda,
+    Let,
+    If,
+    Apply,
+    Halt,
+    Join,
+    Jump,
+)
+from util import SequentialNameGenerator
+from inline import InlineSite, format_inline_sites, inline, inline_sites_json, size
+
+INCREMENT = Lambda(["x"], Let("r", Add(Var("x"), Int(1)), Halt(Var("r"))))
+
+
+def test_straight_line_callee_is_spliced_into_the_caller() -> None:
+    body = Let("f", Global("inc"), Let("y", Call(Var("f"), [Var("n")]), Halt(Var("y"))))
+    sites: list[InlineSite] = []
+    program = inline(Program(["n"], body, {"inc": INCREMENT}), SequentialNameGenerator(), sites=sites)
+    assert program == Program(
+        ["n"],
+        Let("_t0", Add(Var("n"), Int(1)), Let("y", Copy(Var("_t0")), Halt(Var("y")))),
+        {},
+    )
+    assert sites == [InlineSite("_start", "inc", 2, True)]
+
+
+def test_tail_call_becomes_the_callee_body() -> None:
+    body = Let("f", Global("inc"), Apply(Var("f"), [Int(4)]))
+    program = inline(Program([], body, {"inc": INCREMENT}), SequentialNameGenerator())
+    assert program == Program([], Let("_t0", Add(Int(4), Int(1)), Halt(Var("_t0"))), {})
+
+
+def test_branching_callee_returns_through_a_join_point() -> None:
+    absolute = Lambda(
+        ["x"],
+        Let("c", LessThan(Var("x"), Int(0)), If(Var("c"), Apply(Var("g"), [Var("x")]), Halt(Var("x")))),
+    )
+    body = Let("f", Global("abs"), Let("y", Call(Var("f"), [Var("n")]), Halt(Var("y"))))
+    program = inline(Program(["n", "g"], body, {"abs": absolute}), SequentialNameGenerator())
+    assert program.body == Join(
+        "_j0",
+        ["y"],
+        Halt(Var("y")),
+        Let(
+            "_t0",
+            LessThan(Var("n"), Int(0)),
+            If(
+                Var("_t0"),
+                Let("_t1", Call(Var("g"), [Var("n")]), Jump("_j0", [Var("_t1")])),
+                Jump("_j0", [Var("n")]),
+            ),
+        ),
+    )
+
+
+def test_recursive_functions_are_not_inlined() -> None:
+    countdown = Lambda(
+        ["i"],
+        Let(
+            "self",
+            Global("countdown"),
+            Let("c", LessThan(Var("i"), Int(1)), If(Var("c"), Halt(Var("i")), Apply(Var("self"), [Int(0)]))),
+        ),
+    )
+    body = Let("f", Global("countdown"), Apply(Var("f"), [Var("n")]))
+    sites: list[InlineSite] = []
+    program = inline(Program(["n"], body, {"countdown": countdown}), SequentialNameGenerator(), sites=sites)
+    assert program == Program(["n"], body, {"countdown": countdown})
+    assert [(s.caller, s.reason) for s in sites] == [("countdown", "recursive"), ("_start", "recursive")]
+
+
+def test_large_functions_are_inlined_only_at_their_one_call_site() -> None:
+    large = Lambda(["x"], Let("a", Add(Var("x"), Int(1)), Let("b", Add(Var("a"), Int(2)), Halt(Var("b")))))
+    once = Let("f", Global("large"), Apply(Var("f"), [Int(0)]))
+    assert inline(Program([], once, {"large": large}), SequentialNameGenerator(), budget=1).functions == {}
+
+    # Building a closure takes the function's address, so it must stay.
+    taken = Let("f", Global("large"), Let("k", Tuple([Var("f")]), Apply(Var("f"), [Int(0)])))
+    sites: list[InlineSite] = []
+    program = inline(Program([], taken, {"large": large}), SequentialNameGenerator(), budget=1, sites=sites)
+    assert program.body == taken
+    assert sites == [InlineSite("_start", "large", 3, False, "over budget")]
+
+
+def test_zero_budget_inlines_nothing() -> None:
+    body = Let("f", Global("inc"), Apply(Var("f"), [Int(4)]))
+    program = Program([], body, {"inc": INCREMENT})
+    assert inline(program, SequentialNameGenerator(), budget=0) == program
+
+
+def test_callees_are_inlined_after_their_own_calls() -> None:
+    twice = Lambda(
+        ["x"],
+        Let("g", Global("inc"), Let("y", Call(Var("g"), [Var("x")]), Apply(Var("g"), [Var("y")]))),
+    )
+    body = Let("f", Global("twice"), Apply(Var("f"), [Var("n")]))
+    sites: list[InlineSite] = []
+    program = inline(Program(["n"], body, {"inc": INCREMENT, "twice": twice}), SequentialNameGenerator(), sites=sites)
+    assert program.functions == {}
+    assert [(s.caller, s.callee, s.size) for s in sites] == [
+        ("twice", "inc", 2),
+        ("twice", "inc", 2),
+        ("_start", "twice", 4),
+    ]
+    assert size(program.body) == 4
+
+
+def test_inline_sites_report() -> None:
+    sites = [InlineSite("_start", "inc", 2, True), InlineSite("_f0", "_f0", 9, False, "recursive")]
+    assert format_inline_sites(sites).splitlines()[-1] == "1 of 2 call sites inlined"
+    assert "recursive" in format_inline_sites(sites)
+    assert [site["inlined"] for site in json.loads(inline_sites_json(sites))] == [True, False]
@@ -0,0 +1,34 @@
+import importlib
+from dataclasses import fields, is_dataclass
+import pytest
+
+IR_MODULES = ["fructose", "sucrose", "glucose", "maltose", "lactose"]
+
+
+@pytest.mark.parametrize("name", IR_MODULES)
+def test_ir_nodes_are_slotted(
+    name: str,
+) -> None:
+    module = importlib.import_module(name)
+    nodes = [node for node in vars(module).values() if is_dataclass(node) and node.__module__ == name]
+    assert nodes
+    for node in nodes:
+        assert "__dict__" not in dir(node) and node.__slots__ == tuple(f.name for f in fields(node)), node
+
+
+def test_slotted_nodes_keep_their_match_args() -> None:
+    from lactose import Let, Var, Int, Halt
+    from fructose import LessThan
+
+    match Let("x", Int(1), Halt(Var("x"))):
+        case Let(name, Int(value), Halt(Var(result))):
+            assert (name, value, result) == ("x", 1, "x")
+        case _:
+            pytest.fail("no match")
+    # Declared in the class body, over properties rather than fields.
+    assert LessThan.__match_args__ == ("x", "y")
+    match LessThan([Int(1), Int(2)]):
+        case LessThan(Int(x), Int(y)):
+            assert (x, y) == (1, 2)
+        case _:
+            pytest.fail("no match")
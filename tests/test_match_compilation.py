@@ -0,0 +1,87 @@
+from fructose import PatternVar, PatternInt, PatternTrue, PatternWildcard, PatternCons
+from sucrose import Expression, Int, Var, Unit, Tuple, Let, If, EqualTo, Get, Lambda, Apply
+from util import SequentialNameGenerator
+from match_compilation import Branch, Destructure, Fail, Leaf, Row, Switch, compile_match, decision_tree
+
+
+def pair(
+    first: object,
+    second: object,
+) -> PatternCons:
+    return PatternCons("tuple", [first, second])
+
+
+def test_arms_share_the_tests_they_have_in_common() -> None:
+    rows = [
+        Row([pair(PatternInt(1), PatternInt(2))], {}, 0),
+        Row([pair(PatternInt(1), PatternVar("y"))], {}, 1),
+        Row([PatternWildcard()], {}, 2),
+    ]
+    assert decision_tree(["s"], rows, SequentialNameGenerator()) == Destructure(
+        "s",
+        ["_field0", "_field1"],
+        Switch(
+            "_field0",
+            [(1, Switch("_field1", [(2, Leaf(0, {}))], Leaf(1, {"y": "_field1"})))],
+            Leaf(2, {}),
+        ),
+    )
+
+
+def test_integer_arms_become_one_switch() -> None:
+    rows = [Row([PatternInt(i)], {}, i) for i in range(3)] + [Row([PatternVar("x")], {}, 3)]
+    assert decision_tree(["s"], rows, SequentialNameGenerator()) == Switch(
+        "s", [(0, Leaf(0, {})), (1, Leaf(1, {})), (2, Leaf(2, {}))], Leaf(3, {"x": "s"})
+    )
+
+
+def test_booleans_branch_and_unmatched_values_fail() -> None:
+    assert decision_tree(["b"], [Row([PatternTrue()], {}, 0)], SequentialNameGenerator()) == Branch(
+        "b", Leaf(0, {}), Fail()
+    )
+
+
+def test_scrutinee_is_evaluated_once() -> None:
+    scrutinee = Apply(Var("f"), [])
+    assert compile_match(
+        scrutinee, [(PatternInt(0), Int(1)), (PatternWildcard(), Int(2))], SequentialNameGenerator()
+    ) == Let("_match0", scrutinee, If(EqualTo(Var("_match0"), Int(0)), Int(1), Int(2)))
+
+
+def test_arm_reached_from_several_leaves_is_a_lambda() -> None:
+    arms = [(pair(PatternInt(1), PatternInt(2)), Int(10)), (PatternVar("x"), Var("x"))]
+    call = Apply(Var("_arm0"), [Var("s")])
+    assert compile_match(Var("s"), arms, SequentialNameGenerator()) == Let(
+        "_arm0",
+        Lambda(["x"], Var("x")),
+        Let(
+            "_field0",
+            Get(Var("s"), Int(0)),
+            Let(
+                "_field1",
+                Get(Var("s"), Int(1)),
+                If(EqualTo(Var("_field0"), Int(1)), If(EqualTo(Var("_field1"), Int(2)), Int(10), call), call),
+            ),
+        ),
+    )
+
+
+def test_tuple_built_to_be_matched_is_only_built_when_bound_whole() -> None:
+    scrutinee = Tuple([Var("a"), Tuple([Var("b"), Int(2)])])
+    inner = pair(PatternInt(0), PatternWildcard())
+    arms = [(pair(PatternWildcard(), inner), Int(1)), (pair(PatternVar("x"), PatternVar("t")), Var("t"))]
+
+    def fields(
+        body: Expression,
+    ) -> Expression:
+        return Let("_field0", Var("a"), Let("_field2", Var("b"), Let("_field3", Int(2), body)))
+
+    test = EqualTo(Var("_field2"), Int(0))
+    assert compile_match(scrutinee, arms, SequentialNameGenerator()) == fields(
+        Let(
+            "_field1",
+            Tuple([Var("_field2"), Var("_field3")]),
+            If(test, Int(1), Let("t", Var("_field1"), Let("x", Var("_field0"), Var("t")))),
+        )
+    )
+    assert compile_match(scrutinee, arms[:1], SequentialNameGenerator()) == fields(If(test, Int(1), Unit()))
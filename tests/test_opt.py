@@ -21,6 +21,7 @@ from glucose import (
     Do,
     Lambda,
     Apply,
+    While,
 )
 from opt import opt, opt_expr, CompileError
 
@@ -558,3 +559,85 @@ def test_opt_expr_apply(
     expected: Expression,
 ) -> None:
     assert opt_expr(expr) == expected
+
+
+@pytest.mark.parametrize(
+    "expr, expected",
+    list[tuple[Expression, Expression]](
+        [
+            (
+                While(LessThan(Var("x"), Add(Int(1), Int(2))), Set(Var("c"), Int(0), Int(0))),
+                While(LessThan(Var("x"), Int(3)), Set(Var("c"), Int(0), Int(0))),
+            ),
+            (
+                While(LessThan(Int(1), Int(0)), Var("x")),
+                Unit(),
+            ),
+        ]
+    ),
+)
+def test_opt_expr_while(
+    expr: Expression,
+    expected: Expression,
+) -> None:
+    assert opt_expr(expr) == expected
+
+
+@pytest.mark.parametrize(
+    "expr, expected",
+    list[tuple[Expression, Expression]](
+        [
+            (
+                Add(Multiply(Int(3), Int(0)), Div(Int(4), Int(2))),
+                Int(2),
+            ),
+            (
+                Subtract(Var("x"), Int(0)),
+                Var("x"),
+            ),
+            (
+                Add(Add(Int(1), Var("x")), Int(2)),
+                Add(Int(3), Var("x")),
+            ),
+            (
+                Multiply(Multiply(Var("x"), Int(2)), Int(3)),
+                Multiply(Int(6), Var("x")),
+            ),
+            (
+                Let("x", Add(Int(1), Int(2)), Var("x")),
+                Int(3),
+            ),
+            (
+                If(LessThan(Int(1), Int(2)), Add(Var("x"), Int(0)), Div(Int(1), Int(0))),
+                Var("x"),
+            ),
+            (
+                While(EqualTo(Int(1), Int(2)), Div(Int(1), Int(0))),
+                Unit(),
+            ),
+        ]
+    ),
+)
+def test_opt_expr_fixpoint(
+    expr: Expression,
+    expected: Expression,
+) -> None:
+    assert opt_expr(expr) == expected
+
+
+def test_opt_indirect_division_by_zero() -> None:
+    with pytest.raises(CompileError):
+        opt_expr(Div(Add(Int(2), Int(3)), Subtract(Int(2), Int(2))))
+
+
+def test_opt_keeps_unchanged_program() -> None:
+    program = Program(["x"], Let("y", Add(Int(1), Var("x")), Apply(Var("f"), [Var("y")])))
+    assert opt(program) is program
+
+
+def test_opt_unrecognized_expression() -> None:
+    class Unknown:
+        pass
+
+    expr = Unknown()
+    assert opt_expr(expr) is expr  # type: ignore
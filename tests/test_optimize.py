@@ -0,0 +1,29 @@
+import pytest
+from llvmlite import binding
+from main import compile
+from optimize import optimize
+
+
+SOURCE = "(program (x) (let* ((a (+ x 1)) (b (* a 2))) (+ b a)))"
+
+
+def test_optimize_level_zero_only_verifies() -> None:
+    module = compile(SOURCE)
+    optimized = optimize(module, 0)
+    assert isinstance(optimized, binding.ModuleRef)
+    assert str(optimized).count("add i64") == str(module).count("add i64")
+
+
+@pytest.mark.parametrize("level", [1, 2, 3])
+def test_optimize_inlines_and_folds(
+    level: int,
+) -> None:
+    optimized = optimize(compile(SOURCE), level)
+    main = str(optimized.get_function("main"))
+    assert "call tailcc" not in main  # _start was inlined
+    assert (main.count("mul i64"), main.count("add i64")) == (1, 1)  # (x + 1) * 2 + (x + 1) == x * 3 + 3
+
+
+def test_optimize_rejects_unknown_level() -> None:
+    with pytest.raises(ValueError):
+        optimize(compile(SOURCE), 4)
@@ -1,3 +1,6 @@
+import io
+import mmap
+from pathlib import Path
 import pytest
 from fructose import (
     Program,
@@ -40,9 +43,16 @@ from fructose import (
     PatternVar,
     PatternCons
 )
-from parse import parse, parse_expr
+from parse import parse, parse_expr, parse_many
 
 
+# The baseline Earley engine, the LALR fast path and the hand-written reader.
+ENGINES = ["earley", "lalr", "fast"]
+# Earley reads the pattern `_` as a variable rather than a wildcard.
+WILDCARD_ENGINES = ["lalr", "fast"]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
 @pytest.mark.parametrize(
     "source, expected",
     list[tuple[str, Program]](
@@ -59,12 +69,14 @@ from parse import parse, parse_expr
     ),
 )
 def test_parse(
+    engine: str,
     source: str,
     expected: Program,
 ) -> None:
-    assert parse(source) == expected
+    assert parse(source, engine=engine) == expected
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @pytest.mark.parametrize(
     "source, expected",
     list[tuple[str, Expression]](
@@ -77,12 +89,14 @@ def test_parse(
     ),
 )
 def test_parse_expr_int(
+    engine: str,
     source: str,
     expected: Int,
 ) -> None:
-    assert parse_expr(source) == expected
+    assert parse_expr(source, engine=engine) == expected
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @pytest.mark.parametrize(
     "source, expected",
     list[tuple[str, Expression]](
@@ -99,12 +113,14 @@ def test_parse_expr_int(
     ),
 )
 def test_parse_expr_add(
+    engine: str,
     source: str,
     expected: Expression,
 ) -> None:
-    assert parse_expr(source) == expected
+    assert parse_expr(source, engine=engine) == expected
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @pytest.mark.parametrize(
     "source, expected",
     list[tuple[str, Expression]](
@@ -121,12 +137,14 @@ def test_parse_expr_add(
     ),
 )
 def test_parse_expr_subtract(
+    engine: str,
     source: str,
     expected: Expression,
 ) -> None:
-    assert parse_expr(source) == expected
+    assert parse_expr(source, engine=engine) == expected
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @pytest.mark.parametrize(
     "source, expected",
     list[tuple[str, Expression]](
@@ -143,12 +161,14 @@ def test_parse_expr_subtract(
     ),
 )
 def test_parse_expr_multiply(
+    engine: str,
     source: str,
     expected: Expression,
 ) -> None:
-    assert parse_expr(source) == expected
+    assert parse_expr(source, engine=engine) == expected
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @pytest.mark.parametrize(
     "source, expected",
     list[tuple[str, Expression]](
@@ -161,12 +181,14 @@ def test_parse_expr_multiply(
     ),
 )
 def test_parse_expr_div(
+    engine: str,
     source: str,
     expected: Expression,
 ) -> None:
-    assert parse_expr(source) == expected
+    assert parse_expr(source, engine=engine) == expected
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @pytest.mark.parametrize(
     "source, expected",
     list[tuple[str, Expression]](
@@ -183,12 +205,14 @@ def test_parse_expr_div(
     ),
 )
 def test_parse_expr_let(
+    engine: str,
     source: str,
     expected: Expression,
 ) -> None:
-    assert parse_expr(source) == expected
+    assert parse_expr(source, engine=engine) == expected
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @pytest.mark.parametrize(
     "source, expected",
     list[tuple[str, Expression]](
@@ -205,12 +229,14 @@ def test_parse_expr_let(
     ),
 )
 def test_parse_expr_letstar(
+    engine: str,
     source: str,
     expected: Expression,
 ) -> None:
-    assert parse_expr(source) == expected
+    assert parse_expr(source, engine=engine) == expected
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @pytest.mark.parametrize(
     "source, expected",
     list[tuple[str, Expression]](
@@ -227,12 +253,14 @@ def test_parse_expr_letstar(
     ),
 )
 def test_parse_expr_letrec(
+    engine: str,
     source: str,
     expected: Expression,
 ) -> None:
-    assert parse_expr(source) == expected
+    assert parse_expr(source, engine=engine) == expected
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @pytest.mark.parametrize(
     "source, expected",
     list[tuple[str, Expression]](
@@ -245,12 +273,14 @@ def test_parse_expr_letrec(
     ),
 )
 def test_parse_expr_var(
+    engine: str,
     source: str,
     expected: Expression,
 ) -> None:
-    assert parse_expr(source) == expected
+    assert parse_expr(source, engine=engine) == expected
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @pytest.mark.parametrize(
     "source, expected",
     list[tuple[str, Expression]](
@@ -263,12 +293,14 @@ def test_parse_expr_var(
     ),
 )
 def test_parse_expr_true(
+    engine: str,
     source: str,
     expected: Expression,
 ) -> None:
-    assert parse_expr(source) == expected
+    assert parse_expr(source, engine=engine) == expected
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @pytest.mark.parametrize(
     "source, expected",
     list[tuple[str, Expression]](
@@ -281,12 +313,14 @@ def test_parse_expr_true(
     ),
 )
 def test_parse_expr_false(
+    engine: str,
     source: str,
     expected: Expression,
 ) -> None:
-    assert parse_expr(source) == expected
+    assert parse_expr(source, engine=engine) == expected
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @pytest.mark.parametrize(
     "source, expected",
     list[tuple[str, Expression]](
@@ -299,12 +333,14 @@ def test_parse_expr_false(
     ),
 )
 def test_parse_expr_not(
+    engine: str,
     source: str,
     expected: Expression,
 ) -> None:
-    assert parse_expr(source) == expected
+    assert parse_expr(source, engine=engine) == expected
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @pytest.mark.parametrize(
     "source, expected",
     list[tuple[str, Expression]](
@@ -321,12 +357,14 @@ def test_parse_expr_not(
     ),
 )
 def test_parse_expr_and(
+    engine: str,
     source: str,
     expected: Expression,
 ) -> None:
-    assert parse_expr(source) == expected
+    assert parse_expr(source, engine=engine) == expected
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @pytest.mark.parametrize(
     "source, expected",
     list[tuple[str, Expression]](
@@ -343,12 +381,14 @@ def test_parse_expr_and(
     ),
 )
 def test_parse_expr_or(
+    engine: str,
     source: str,
     expected: Expression,
 ) -> None:
-    assert parse_expr(source) == expected
+    assert parse_expr(source, engine=engine) == expected
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @pytest.mark.parametrize(
     "source, expected",
     list[tuple[str, Expression]](
@@ -361,12 +401,14 @@ def test_parse_expr_or(
     ),
 )
 def test_parse_expr_if(
+    engine: str,
     source: str,
     expected: Expression,
 ) -> None:
-    assert parse_expr(source) == expected
+    assert parse_expr(source, engine=engine) == expected
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @pytest.mark.parametrize(
     "source, expected",
     list[tuple[str, Expression]](
@@ -383,12 +425,14 @@ def test_parse_expr_if(
     ),
 )
 def test_parse_expr_cond(
+    engine: str,
     source: str,
     expected: Expression,
 ) -> None:
-    assert parse_expr(source) == expected
+    assert parse_expr(source, engine=engine) == expected
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @pytest.mark.parametrize(
     "source, expected",
     list[tuple[str, Expression]](
@@ -405,12 +449,14 @@ def test_parse_expr_cond(
     ),
 )
 def test_parse_expr_less_than_or_equal_to(
+    engine: str,
     source: str,
     expected: Expression,
 ) -> None:
-    assert parse_expr(source) == expected
+    assert parse_expr(source, engine=engine) == expected
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @pytest.mark.parametrize(
     "source, expected",
     list[tuple[str, Expression]](
@@ -427,12 +473,14 @@ def test_parse_expr_less_than_or_equal_to(
     ),
 )
 def test_parse_expr_less_than(
+    engine: str,
     source: str,
     expected: Expression,
 ) -> None:
-    assert parse_expr(source) == expected
+    assert parse_expr(source, engine=engine) == expected
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @pytest.mark.parametrize(
     "source, expected",
     list[tuple[str, Expression]](
@@ -449,12 +497,14 @@ def test_parse_expr_less_than(
     ),
 )
 def test_parse_expr_equal_to(
+    engine: str,
     source: str,
     expected: Expression,
 ) -> None:
-    assert parse_expr(source) == expected
+    assert parse_expr(source, engine=engine) == expected
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @pytest.mark.parametrize(
     "source, expected",
     list[tuple[str, Expression]](
@@ -471,12 +521,14 @@ def test_parse_expr_equal_to(
     ),
 )
 def test_parse_expr_greater_than(
+    engine: str,
     source: str,
     expected: Expression,
 ) -> None:
-    assert parse_expr(source) == expected
+    assert parse_expr(source, engine=engine) == expected
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @pytest.mark.parametrize(
     "source, expected",
     list[tuple[str, Expression]](
@@ -493,12 +545,14 @@ def test_parse_expr_greater_than(
     ),
 )
 def test_parse_expr_greater_than_or_equal_to(
+    engine: str,
     source: str,
     expected: Expression,
 ) -> None:
-    assert parse_expr(source) == expected
+    assert parse_expr(source, engine=engine) == expected
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @pytest.mark.parametrize(
     "source, expected",
     list[tuple[str, Expression]](
@@ -511,12 +565,14 @@ def test_parse_expr_greater_than_or_equal_to(
     ),
 )
 def test_parse_expr_unit(
+    engine: str,
     source: str,
     expected: Expression,
 ) -> None:
-    assert parse_expr(source) == expected
+    assert parse_expr(source, engine=engine) == expected
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @pytest.mark.parametrize(
     "source, expected",
     list[tuple[str, Expression]](
@@ -529,12 +585,14 @@ def test_parse_expr_unit(
     ),
 )
 def test_parse_expr_cell(
+    engine: str,
     source: str,
     expected: Expression,
 ) -> None:
-    assert parse_expr(source) == expected
+    assert parse_expr(source, engine=engine) == expected
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @pytest.mark.parametrize(
     "source, expected",
     list[tuple[str, Expression]](
@@ -547,12 +605,14 @@ def test_parse_expr_cell(
     ),
 )
 def test_parse_expr_get(
+    engine: str,
     source: str,
     expected: Expression,
 ) -> None:
-    assert parse_expr(source) == expected
+    assert parse_expr(source, engine=engine) == expected
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @pytest.mark.parametrize(
     "source, expected",
     list[tuple[str, Expression]](
@@ -565,12 +625,14 @@ def test_parse_expr_get(
     ),
 )
 def test_parse_expr_set(
+    engine: str,
     source: str,
     expected: Expression,
 ) -> None:
-    assert parse_expr(source) == expected
+    assert parse_expr(source, engine=engine) == expected
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @pytest.mark.parametrize(
     "source, expected",
     list[tuple[str, Expression]](
@@ -587,12 +649,14 @@ def test_parse_expr_set(
     ),
 )
 def test_parse_expr_begin(
+    engine: str,
     source: str,
     expected: Expression,
 ) -> None:
-    assert parse_expr(source) == expected
+    assert parse_expr(source, engine=engine) == expected
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @pytest.mark.parametrize(
     "source, expected",
     list[tuple[str, Expression]](
@@ -605,12 +669,14 @@ def test_parse_expr_begin(
     ),
 )
 def test_parse_expr_while(
+    engine: str,
     source: str,
     expected: Expression,
 ) -> None:
-    assert parse_expr(source) == expected
+    assert parse_expr(source, engine=engine) == expected
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @pytest.mark.parametrize(
     "source, expected",
     list[tuple[str, Expression]](
@@ -627,12 +693,14 @@ def test_parse_expr_while(
     ),
 )
 def test_parse_expr_lambda(
+    engine: str,
     source: str,
     expected: Expression,
 ) -> None:
-    assert parse_expr(source) == expected
+    assert parse_expr(source, engine=engine) == expected
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @pytest.mark.parametrize(
     "source, expected",
     list[tuple[str, Expression]](
@@ -645,12 +713,14 @@ def test_parse_expr_lambda(
     ),
 )
 def test_parse_expr_apply(
+    engine: str,
     source: str,
     expected: Expression,
 ) -> None:
-    assert parse_expr(source) == expected
+    assert parse_expr(source, engine=engine) == expected
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @pytest.mark.parametrize(
     "source, expected",
     list[tuple[str, Expression]](
@@ -663,92 +733,100 @@ def test_parse_expr_apply(
     ),
 )
 def test_parse_expr_assign(
+    engine: str,
     source: str,
     expected: Expression,
 ) -> None:
-    assert parse_expr(source) == expected
+    assert parse_expr(source, engine=engine) == expected
 
 # TESTS FOR PATTERN MATCHING 
-def test_parse_match_literal():
+@pytest.mark.parametrize("engine", ENGINES)
+def test_parse_match_literal(engine):
     src = """
     (match 42
       (42 "forty-two")
       (0 "zero")
       (_ "other"))
     """
-    ast = parse_expr(src)
+    ast = parse_expr(src, engine=engine)
     assert isinstance(ast, Match)
     assert isinstance(ast.arms[0][0], PatternInt)
     assert ast.arms[0][0].value == 42
 
 
-def test_parse_match_bool():
+@pytest.mark.parametrize("engine", ENGINES)
+def test_parse_match_bool(engine):
     src = """
     (match #t
       (#t "true")
       (#f "false")
       (_ "other"))
     """
-    ast = parse_expr(src)
+    ast = parse_expr(src, engine=engine)
     assert isinstance(ast, Match)
     assert isinstance(ast.arms[0][0], PatternTrue)
     assert isinstance(ast.arms[1][0], PatternFalse)
 
 
-def test_parse_match_unit():
+@pytest.mark.parametrize("engine", ENGINES)
+def test_parse_match_unit(engine):
     src = """
     (match #u
       (#u "unit")
       (_ "other"))
     """
-    ast = parse_expr(src)
+    ast = parse_expr(src, engine=engine)
     assert isinstance(ast, Match)
     assert isinstance(ast.arms[0][0], PatternUnit)
 
 
-def test_parse_match_wildcard():
+@pytest.mark.parametrize("engine", WILDCARD_ENGINES)
+def test_parse_match_wildcard(engine):
     src = """
     (match 99
       (0 "zero")
       (_ "not zero"))
     """
-    ast = parse_expr(src)
+    ast = parse_expr(src, engine=engine)
     assert isinstance(ast, Match)
     assert isinstance(ast.arms[-1][0], PatternWildcard)
 
 
-def test_parse_match_var():
+@pytest.mark.parametrize("engine", ENGINES)
+def test_parse_match_var(engine):
     src = """
     (match 7
       (x x)
       (_ "no match"))
     """
-    ast = parse_expr(src)
+    ast = parse_expr(src, engine=engine)
     assert isinstance(ast, Match)
     assert isinstance(ast.arms[0][0], PatternVar)
     assert ast.arms[0][0].name == "x"
 
 
-def test_parse_match_tuple_flat():
+@pytest.mark.parametrize("engine", ENGINES)
+def test_parse_match_tuple_flat(engine):
     src = """
     (match (tuple 1 2)
       ((tuple x y) (+ x y))
       (_ 0))
     """
-    ast = parse_expr(src)
+    ast = parse_expr(src, engine=engine)
     assert isinstance(ast, Match)
     assert isinstance(ast.arms[0][0], PatternCons)
     assert ast.arms[0][0].constructor == "tuple"
     assert len(ast.arms[0][0].patterns) == 2
 
 
-def test_parse_match_tuple_nested():
+@pytest.mark.parametrize("engine", ENGINES)
+def test_parse_match_tuple_nested(engine):
     src = """
     (match (tuple 1 (tuple 2 3))
       ((tuple x (tuple y z)) (+ x (+ y z)))
       (_ 0))
     """
-    ast = parse_expr(src)
+    ast = parse_expr(src, engine=engine)
     assert isinstance(ast, Match)
     pat = ast.arms[0][0]
     assert isinstance(pat, PatternCons)
@@ -757,40 +835,43 @@ def test_parse_match_tuple_nested():
     assert pat.patterns[1].constructor == "tuple"
 
 
-def test_parse_match_tuple_with_literals_and_wildcard():
+@pytest.mark.parametrize("engine", WILDCARD_ENGINES)
+def test_parse_match_tuple_with_literals_and_wildcard(engine):
     src = """
     (match (tuple 1 2)
       ((tuple 1 _) "first is one")
       ((tuple _ 2) "second is two")
       (_ "no match"))
     """
-    ast = parse_expr(src)
+    ast = parse_expr(src, engine=engine)
     assert isinstance(ast, Match)
     assert isinstance(ast.arms[0][0].patterns[0], PatternInt)
     assert ast.arms[0][0].patterns[0].value == 1
     assert isinstance(ast.arms[0][0].patterns[1], PatternWildcard)
 
 
-def test_parse_match_tuple_with_var_and_literal():
+@pytest.mark.parametrize("engine", ENGINES)
+def test_parse_match_tuple_with_var_and_literal(engine):
     src = """
     (match (tuple 5 0)
       ((tuple x 0) x)
       (_ -1))
     """
-    ast = parse_expr(src)
+    ast = parse_expr(src, engine=engine)
     assert isinstance(ast, Match)
     assert isinstance(ast.arms[0][0].patterns[1], PatternInt)
     assert ast.arms[0][0].patterns[1].value == 0
     assert isinstance(ast.arms[0][0].patterns[0], PatternVar)
 
 
-def test_parse_match_nested_tuple_with_wildcard_and_var():
+@pytest.mark.parametrize("engine", WILDCARD_ENGINES)
+def test_parse_match_nested_tuple_with_wildcard_and_var(engine):
     src = """
     (match (tuple (tuple 1 2) 3)
       ((tuple (tuple _ y) z) (+ y z))
       (_ 0))
     """
-    ast = parse_expr(src)
+    ast = parse_expr(src, engine=engine)
     assert isinstance(ast, Match)
     pat = ast.arms[0][0]
     assert isinstance(pat, PatternCons)
@@ -799,3 +880,137 @@ def test_parse_match_nested_tuple_with_wildcard_and_var():
     assert pat.patterns[0].constructor == "tuple"
     assert isinstance(pat.patterns[0].patterns[0], PatternWildcard)
     assert isinstance(pat.patterns[0].patterns[1], PatternVar)
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        "(+ 1 2)",
+        "(- 1)",
+        "(-1)",
+        "(- 2 -1)",
+        "(-n)",
+        "(-1 2)",
+        "(-n 2)",
+        "(f -1)",
+        "(- -1)",
+        "(let ((x 1) (y 2)) (* x y))",
+        "(let* ((x 1)) (lambda (y) (+ x y)))",
+        "(if (<= 1 2) #t #f)",
+        "(begin (set! x 1) (:= c (^ c)) #u)",
+    ],
+)
+def test_parse_expr_engines_agree(
+    source: str,
+) -> None:
+    assert parse_expr(source, engine="lalr") == parse_expr(source, engine="earley") == parse_expr(source, engine="fast")
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        "(cond #u)",
+        "(cond (x y) #u)",
+        "(cond ((< x 1) 0) ((f x) (g x)) (f x))",
+        "(cond (x 1) (+ x 1))",
+        "(cond (x 1) (let ((y x)) (* y y)))",
+    ],
+)
+def test_parse_cond_without_earley_fallback(
+    source: str,
+) -> None:
+    from parse import _parser  # type: ignore
+
+    # Parsed by the LALR tables themselves, not by the fallback.
+    assert _parser("lalr").parse(source, start="expr") == parse_expr(source, engine="earley")
+
+
+def test_parse_cond_malformed_arm_falls_back_to_earley() -> None:
+    # Not a `cond` under either grammar; Earley reads it as an application of a variable named "cond".
+    source = "(cond (x 1 2) 3)"
+    assert parse_expr(source, engine="lalr") == parse_expr(source, engine="earley")
+
+
+def test_parse_engines_agree_empty_parameters() -> None:
+    assert parse("(program () 0)", engine="lalr") == parse("(program () 0)", engine="earley")
+
+
+def test_parse_expr_falls_back_to_earley() -> None:
+    # A cond needs a default, so only the Earley grammar accepts this, as an application of a variable named "cond".
+    assert parse_expr("(cond)", engine="lalr") == Apply(Var("cond"), [])
+
+
+@pytest.mark.parametrize(
+    "source",
+    ["(letter 1)", "(ifx 1)", "(condition 1)", "(nothing 1)", "(lambdas 1)", "(program1 2)"],
+)
+def test_parse_keyword_prefixed_callee_without_earley_fallback(
+    source: str,
+) -> None:
+    from parse import _parser  # type: ignore
+
+    # Parsed by the LALR tables themselves, not by the fallback.
+    assert _parser("lalr").parse(source, start="expr") == parse_expr(source, engine="earley")
+
+
+def test_parser_is_cached() -> None:
+    from parse import _parser  # type: ignore
+
+    assert _parser("lalr") is _parser("lalr")
+    assert _parser("earley") is _parser("earley")
+
+
+BATCH = b"""(program (x) (+ x 1))
+(program () "(not a paren")
+  (program (y z)
+    (* y z))
+"""
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_parse_many(
+    engine: str,
+) -> None:
+    programs = list(parse_many(io.BytesIO(BATCH), engine=engine))  # type: ignore
+    assert programs == [
+        (0, Program(["x"], Add([Var("x"), Int(1)]))),
+        (22, Program([], "(not a paren")),  # type: ignore
+        (52, Program(["y", "z"], Multiply([Var("y"), Var("z")]))),
+    ]
+    for offset, _ in programs:
+        assert BATCH[offset : offset + len(b"(program")] == b"(program"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_parse_many_mmap(
+    engine: str,
+    tmp_path: Path,
+) -> None:
+    path = tmp_path / "batch.fru"
+    path.write_bytes(BATCH)
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        assert [offset for offset, _ in parse_many(m, engine=engine)] == [0, 22, 52]
+
+
+def test_parse_many_is_lazy() -> None:
+    programs = parse_many(io.BytesIO(b"(program () 1) (program () )"))
+    assert next(programs) == (0, Program([], Int(1)))
+
+
+@pytest.mark.parametrize(
+    "source, application, keyword_form",
+    list[tuple[str, Expression, Expression]](
+        [
+            ("(notx)", Apply(Var("notx"), []), Not(Var("x"))),
+            ("(andy 1 2)", Apply(Var("andy"), [Int(1), Int(2)]), And([Var("y"), Int(1), Int(2)])),
+        ]
+    ),
+)
+def test_parse_keyword_prefixed_callee_diverges_from_earley(
+    source: str,
+    application: Expression,
+    keyword_form: Expression,
+) -> None:
+    assert parse_expr(source, engine="lalr") == application
+    assert parse_expr(source, engine="fast") == application
+    assert parse_expr(source, engine="earley") == keyword_form
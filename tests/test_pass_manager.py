@@ -0,0 +1,83 @@
+import json
+from llvmlite import binding, ir
+from fructose import Program, Int, Add, Multiply, Var, Let, Lambda, Apply
+from pass_manager import Pass, PassManager, count_nodes, default_pipeline, format_statistics, statistics_json
+from util import SequentialNameGenerator
+
+
+def test_pass_manager_runs_passes_in_order() -> None:
+    manager = PassManager([Pass("double", lambda n: n * 2), Pass("increment", lambda n: n + 1)])
+    assert manager.run(3) == 7
+    assert manager.statistics == []
+
+
+def test_pass_manager_instrumented() -> None:
+    def grow(program: Program) -> Program:
+        return Program(program.parameters, Add([program.body, Int(1)]))
+
+    manager = PassManager([Pass("grow", grow), Pass("grow", grow)], instrument=True)
+    manager.run(Program([], Int(0)))
+    assert [(s.name, s.nodes_before, s.nodes_after) for s in manager.statistics] == [("grow", 2, 4), ("grow", 4, 6)]
+    assert all(s.seconds >= 0 and s.peak_bytes >= 0 for s in manager.statistics)
+
+
+def test_count_nodes() -> None:
+    assert count_nodes(Program(["x"], Let([("y", Int(1))], Add([Var("x"), Var("y")])))) == 6
+
+
+def test_count_nodes_module() -> None:
+    module = ir.Module()
+    builder = ir.IRBuilder(ir.Function(module, ir.FunctionType(ir.IntType(64), []), "f").append_basic_block())
+    builder.ret(builder.add(ir.Constant(ir.IntType(64), 1), ir.Constant(ir.IntType(64), 2)))
+    assert count_nodes(module) == 2
+
+
+def test_default_pipeline_lowers_program() -> None:
+    manager = PassManager(default_pipeline(SequentialNameGenerator()), instrument=True)
+    module = manager.run(Program(["x"], Add([Var("x"), Int(1)])))
+    assert isinstance(module, ir.Module)
+    assert manager.statistics[0].name == "infer_types"
+    assert manager.statistics[-1].name == "lower"
+
+
+def test_statistics_reports() -> None:
+    manager = PassManager([Pass("identity", lambda p: p)], instrument=True)
+    manager.run(Int(0))
+    assert "identity" in format_statistics(manager.statistics)
+    [record] = json.loads(statistics_json(manager.statistics))
+    assert record["name"] == "identity"
+    assert record["nodes_before"] == record["nodes_after"] == 1
+
+
+def test_statistics_report_counters() -> None:
+    counters: dict[str, int] = {"stale": 1}
+
+    def count(program: int) -> int:
+        counters["calls"] = counters.get("calls", 0) + 1
+        return program
+
+    manager = PassManager([Pass("count", count, counters), Pass("count", count, counters)], instrument=True)
+    manager.run(Int(0))
+    assert [s.counters for s in manager.statistics] == [{"calls": 1}, {"calls": 1}]
+    assert "  calls" in format_statistics(manager.statistics)
+    assert json.loads(statistics_json(manager.statistics))[0]["counters"] == {"calls": 1}
+
+
+def test_default_pipeline_reports_eliminated_values() -> None:
+    manager = PassManager(default_pipeline(SequentialNameGenerator()), instrument=True)
+    x, y, square = Var("x"), Var("y"), Var("square")
+    # value_numbering already shares (* x x) written twice; the copies here only meet once `square` is inlined.
+    body = Add([Apply(square, [x]), Apply(square, [x])])
+    manager.run(Program(["x"], Let([("square", Lambda(["y"], Multiply([y, y])))], body)))
+    [gvn] = [s for s in manager.statistics if s.name == "gvn"]
+    assert gvn.counters == {"_start": 1}
+
+
+def test_default_pipeline_optimizes_above_level_zero() -> None:
+    manager = PassManager(default_pipeline(SequentialNameGenerator(), optimization_level=2), instrument=True)
+    module = manager.run(Program(["x"], Add([Var("x"), Int(1)])))
+    assert isinstance(module, binding.ModuleRef)
+    [lower, optimize] = manager.statistics[-2:]
+    assert (lower.name, optimize.name) == ("lower", "llvm_optimize")
+    assert optimize.nodes_before == lower.nodes_after
+    assert optimize.nodes_after > 0
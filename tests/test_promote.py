@@ -0,0 +1,120 @@
+from lactose import (
+    Program,
+    Int,
+    Var,
+    Unit,
+    Add,
+    LessThan,
+    Tuple,
+    Alloca,
+    Get,
+    Set,
+    Copy,
+    Call,
+    Let,
+    If,
+    Halt,
+    Join,
+    Jump,
+    Loop,
+)
+from promote import promote
+from util import SequentialNameGenerator
+
+
+def run(
+    body: object,
+) -> object:
+    return promote(Program(["x"], body, {}), SequentialNameGenerator()).body  # type: ignore
+
+
+def test_reads_and_writes_become_copies() -> None:
+    body = Let(
+        "c",
+        Alloca([Var("x")]),
+        Let(
+            "d",
+            Copy(Var("c")),
+            Let("_", Set(Var("d"), Int(0), Int(1)), Let("v", Get(Var("c"), Int(0)), Halt(Var("v")))),
+        ),
+    )
+    assert run(body) == Let("_", Copy(Unit()), Let("v", Copy(Int(1)), Halt(Var("v"))))
+
+
+def test_loop_carries_written_fields() -> None:
+    # (while (< (^ c) 10) (:= c (+ (^ c) 1))), then return (^ c)
+    body = Let(
+        "c",
+        Alloca([Var("x")]),
+        Loop(
+            "loop",
+            [],
+            [],
+            Let(
+                "a",
+                Get(Var("c"), Int(0)),
+                Let(
+                    "b",
+                    LessThan(Var("a"), Int(10)),
+                    If(
+                        Var("b"),
+                        Let("s", Add(Var("a"), Int(1)), Let("_", Set(Var("c"), Int(0), Var("s")), Jump("loop", []))),
+                        Let("r", Get(Var("c"), Int(0)), Halt(Var("r"))),
+                    ),
+                ),
+            ),
+        ),
+    )
+    assert run(body) == Loop(
+        "loop",
+        ["_t0"],
+        [Var("x")],
+        Let(
+            "a",
+            Copy(Var("_t0")),
+            Let(
+                "b",
+                LessThan(Var("a"), Int(10)),
+                If(
+                    Var("b"),
+                    Let("s", Add(Var("a"), Int(1)), Let("_", Copy(Unit()), Jump("loop", [Var("s")]))),
+                    Let("r", Copy(Var("_t0")), Halt(Var("r"))),
+                ),
+            ),
+        ),
+    )
+
+
+def test_join_point_merges_fields_written_on_either_branch() -> None:
+    body = Let(
+        "c",
+        Alloca([Int(0), Int(0)]),
+        Join(
+            "j",
+            ["t"],
+            Let("r", Get(Var("c"), Int(1)), Halt(Var("r"))),
+            If(
+                Var("x"),
+                Let("_", Set(Var("c"), Int(1), Int(5)), Jump("j", [Int(0)])),
+                Jump("j", [Int(1)]),
+            ),
+        ),
+    )
+    assert run(body) == Join(
+        "j",
+        ["t", "_t0", "_t1"],
+        Let("r", Copy(Var("_t1")), Halt(Var("r"))),
+        If(
+            Var("x"),
+            Let("_", Copy(Unit()), Jump("j", [Int(0), Int(0), Int(5)])),
+            Jump("j", [Int(1), Int(0), Int(0)]),
+        ),
+    )
+
+
+def test_tuples_used_as_values_stay_in_memory() -> None:
+    passed = Let("c", Alloca([Int(0)]), Let("r", Call(Var("f"), [Var("c")]), Halt(Var("r"))))
+    stored = Let("c", Alloca([Int(0)]), Let("d", Copy(Var("c")), Let("t", Tuple([Var("d")]), Halt(Var("t")))))
+    out_of_range = Let("c", Alloca([Int(0)]), Let("r", Get(Var("c"), Int(1)), Halt(Var("r"))))
+    for body in [passed, stored, out_of_range]:
+        assert run(body) == body
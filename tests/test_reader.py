@@ -0,0 +1,126 @@
+import io
+import pytest
+from fructose import (
+    Program,
+    Int,
+    Add,
+    Let,
+    Var,
+    Bool,
+    Cond,
+    LessThan,
+    Apply,
+    Lambda,
+    Match,
+    PatternCons,
+    PatternVar,
+    PatternWildcard,
+)
+from reader import read_program, read_expr, split_forms, ReadError
+
+
+def test_read_program() -> None:
+    assert read_program("(program (x y) (+ x y))") == Program(["x", "y"], Add([Var("x"), Var("y")]))
+
+
+def test_read_expr_keyword_prefixed_identifier() -> None:
+    assert read_expr("(order letter)") == Apply(Var("order"), [Var("letter")])
+
+
+def test_read_expr_cond_default_is_last() -> None:
+    assert read_expr("(cond ((< x 1) 2) (#t 3) (f x))") == Cond(
+        [(LessThan([Var("x"), Int(1)]), Int(2)), (Bool(True), Int(3))],
+        Apply(Var("f"), [Var("x")]),
+    )
+
+
+def test_read_expr_match_patterns() -> None:
+    assert read_expr("(match p ((tuple _ y) y) (z 0))") == Match(
+        Var("p"),
+        [(PatternCons("tuple", [PatternWildcard(), PatternVar("y")]), Var("y")), (PatternVar("z"), Int(0))],
+    )
+
+
+def test_read_expr_deeply_nested() -> None:
+    depth = 100_000
+    expr = read_expr("(lambda () " * depth + "0" + ")" * depth)
+    for _ in range(depth):
+        assert isinstance(expr, Lambda)
+        expr = expr.body
+    assert expr == Int(0)
+
+
+def test_read_expr_let() -> None:
+    assert read_expr("(let ((x 1)) x)") == Let([("x", Int(1))], Var("x"))
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        "",
+        "(",
+        ")",
+        "()",
+        "(+ 1 2) 3",
+        "(if 1 2)",
+        "(/ 1)",
+        "(let (x 1) x)",
+        "(let ((1 x)) x)",
+        "(lambda ((x)) x)",
+        "(cond (1 2 3) 4)",
+        "(set! (x) 1)",
+        "+",
+        "(-1-2)",
+        '"unterminated',
+    ],
+)
+def test_read_expr_errors(
+    source: str,
+) -> None:
+    with pytest.raises(ReadError):
+        read_expr(source)
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        "0",
+        "(lambda () 0)",
+        "(program x 0)",
+        "(program (x))",
+    ],
+)
+def test_read_program_errors(
+    source: str,
+) -> None:
+    with pytest.raises(ReadError):
+        read_program(source)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 1 << 16])
+def test_split_forms_across_chunks(
+    chunk_size: int,
+) -> None:
+    source = b' (a (b "c)") d)\n\n(e)(f) '
+    assert list(split_forms(io.BytesIO(source), chunk_size)) == [
+        (1, b'(a (b "c)") d)'),
+        (17, b"(e)"),
+        (20, b"(f)"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        b"(a",
+        b"a)",
+        b"(a) b",
+        b'(a) "b"',
+        b'(a "b)',
+    ],
+)
+def test_split_forms_errors(
+    source: bytes,
+) -> None:
+    with pytest.raises(ReadError):
+        list(split_forms(io.BytesIO(source), 2))
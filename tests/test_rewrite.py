@@ -0,0 +1,72 @@
+from collections import Counter
+from glucose import Expression, Int, Add, Multiply, Var, Bool, If, Let, Tuple, Lambda, Apply
+from rewrite import RuleSet, children, rebuild
+
+
+def arithmetic() -> RuleSet:
+    rules = RuleSet()
+
+    @rules.rule(Add)
+    def add_constants(
+        expr: Add,
+    ) -> Expression | None:
+        match expr:
+            case Add(Int(x), Int(y)):
+                return Int(x + y)
+        return None
+
+    @rules.rule(Multiply)
+    def distribute(
+        expr: Multiply,
+    ) -> Expression | None:
+        match expr:
+            case Multiply(Int(k), Add(x, y)):
+                return Add(Multiply(Int(k), x), Multiply(Int(k), y))
+            case Multiply(Int(x), Int(y)):
+                return Int(x * y)
+        return None
+
+    return rules
+
+
+def test_rewrites_replacements_to_a_fixpoint() -> None:
+    fired = Counter[str]()
+    expr = Multiply(Int(2), Add(Int(3), Add(Var("x"), Int(4))))
+    assert arithmetic().rewrite(expr, fired) == Add(Int(6), Add(Multiply(Int(2), Var("x")), Int(8)))
+    assert fired == Counter({"distribute": 4})
+
+
+def test_unchanged_subtrees_keep_their_identity() -> None:
+    untouched = Lambda(["y"], Apply(Var("f"), [Var("y"), Tuple([Var("y")])]))
+    expr = Let("g", untouched, Add(Int(1), Int(2)))
+    result = arithmetic().rewrite(expr)
+    assert result == Let("g", untouched, Int(3))
+    assert result.value is untouched
+    assert arithmetic().rewrite(untouched) is untouched
+
+
+def test_rule_ready_after_leading_children() -> None:
+    rules = arithmetic()
+    seen: list[Expression] = []
+
+    @rules.rule(If, ready=1)
+    def if_constant(
+        expr: If,
+    ) -> Expression | None:
+        seen.append(expr)
+        match expr:
+            case If(Bool(b), consequent, alternative):
+                return consequent if b else alternative
+        return None
+
+    dead = Add(Int(5), Int(6))
+    assert rules.rewrite(If(Bool(False), dead, Add(Int(1), Int(1)))) == Int(2)
+    assert seen == [If(Bool(False), dead, Add(Int(1), Int(1)))]
+
+
+def test_children_and_rebuild() -> None:
+    expr = Apply(Var("f"), [Int(1), Int(2)])
+    original = children(expr)
+    assert original == [Var("f"), Int(1), Int(2)]
+    assert rebuild(expr, [Var("g"), *original[1:]]) == Apply(Var("g"), [Int(1), Int(2)])
+    assert children(Int(0)) == []
@@ -1,7 +1,7 @@
 import pytest
 from fructose import *
 from type_inference import infer_types, TypeError, IntType, BoolType, UnitType
-from type_inference import FunType, TypeVar, unify
+from type_inference import FunType, TupleType, TypeVar, prune, unify
 
 def test_int():
     prog = Program([], Int(42))
@@ -70,9 +70,8 @@ def test_higher_order():
     result_type = types["$result"]
     assert isinstance(result_type, FunType), f"Expected FunType, got {result_type}"
     # The argument type should be unifiable with FunType([IntType()], t)
-    subst = {}
     try:
-        unify(result_type.arg_types[0], FunType([IntType()], TypeVar()), subst)
+        unify(result_type.arg_types[0], FunType([IntType()], TypeVar()))
     except Exception as e:
         assert False, f"Argument type {result_type.arg_types[0]} is not unifiable with FunType([IntType()], t): {e}"
 
@@ -122,4 +121,72 @@ def test_assign():
 def test_cell_get_set():
     prog = Program([], Begin([Cell(Int(1)), Get(Int(1)), Set(Int(1), Int(2))]))
     types = infer_types(prog)
-    assert types["$result"] == UnitType() or types["$result"] == IntType()
\ No newline at end of file
+    assert types["$result"] == UnitType() or types["$result"] == IntType()
+
+def test_match():
+    prog = Program(["x"], Match(Var("x"), [(PatternInt(0), Bool(True)), (PatternWildcard(), Bool(False))]))
+    types = infer_types(prog)
+    assert types["x"] == IntType()
+    assert types["$result"] == BoolType()
+
+def test_match_tuple_patterns_bind_components():
+    pattern = PatternCons("tuple", [PatternVar("a"), PatternTrue()])
+    prog = Program(["x"], Match(Var("x"), [(pattern, Add([Var("a"), Int(1)])), (PatternWildcard(), Int(0))]))
+    types = infer_types(prog)
+    assert isinstance(types["x"], TupleType) and types["x"].component_types[1] == BoolType()
+    assert types["$result"] == IntType()
+
+def test_match_arms_must_agree():
+    prog = Program([], Match(Apply(Var("tuple"), [Int(1)]), [(PatternInt(1), Int(0))]))
+    with pytest.raises(TypeError):
+        infer_types(prog)
+
+def test_shadowed_tuple_is_an_ordinary_call():
+    increment = Lambda(["x"], Add([Var("x"), Int(1)]))
+    prog = Program(["n"], Let([("tuple", increment)], Apply(Var("tuple"), [Var("n")])))
+    assert infer_types(prog)["$result"] == IntType()
+    prog = Program(["n"], Apply(Lambda(["tuple"], Apply(Var("tuple"), [Var("n")])), [increment]))
+    assert infer_types(prog)["$result"] == IntType()
+
+def test_let_bound_lambdas_are_polymorphic():
+    # (let ((id (lambda (x) x))) (if (id true) (id 1) 2))
+    body = If(Apply(Var("id"), [Bool(True)]), Apply(Var("id"), [Int(1)]), Int(2))
+    prog = Program([], Let([("id", Lambda(["x"], Var("x")))], body))
+    assert infer_types(prog)["$result"] == IntType()
+
+def test_letrec_group_is_generalized_after_it():
+    twice = Lambda(["f", "x"], Apply(Var("f"), [Apply(Var("f"), [Var("x")])]))
+    body = If(Apply(Var("twice"), [Lambda(["b"], Not(Var("b"))), Bool(True)]), Apply(Var("twice"), [Lambda(["i"], Var("i")), Int(1)]), Int(0))
+    prog = Program([], LetRec([("twice", twice)], body))
+    assert infer_types(prog)["$result"] == IntType()
+
+def test_lambda_parameters_are_not_generalized():
+    # (lambda (x) (let ((f (lambda (y) x))) (if (f 1) (+ (f true) 1) 0))): `f` is generic in `y` only
+    f = Lambda(["y"], Var("x"))
+    body = If(Apply(Var("f"), [Int(1)]), Add([Apply(Var("f"), [Bool(True)]), Int(1)]), Int(0))
+    with pytest.raises(TypeError):
+        infer_types(Program([], Lambda(["x"], Let([("f", f)], body))))
+
+def test_assigned_and_non_lambda_bindings_are_monomorphic():
+    identity = Lambda(["x"], Var("x"))
+    uses = [Apply(Var("id"), [Bool(True)]), Apply(Var("id"), [Int(1)])]
+    with pytest.raises(TypeError):
+        infer_types(Program([], Let([("id", identity)], Begin([Assign("id", identity), *uses]))))
+    with pytest.raises(TypeError):
+        infer_types(Program([], Let([("id", If(Bool(True), identity, identity))], Begin(uses))))
+
+def test_deep_let_chains():
+    body = Var("x0")
+    for i in range(200):
+        body = Let([(f"x{i}", Add([Var(f"x{i + 1}"), Int(1)]))], body)
+    assert infer_types(Program(["x200"], body)) == {"x200": IntType(), "$result": IntType()}
+    bindings = [("y0", Int(0))] + [(f"y{i + 1}", Add([Var(f"y{i}"), Int(1)])) for i in range(10_000)]
+    assert infer_types(Program([], LetStar(bindings, Var("y10000"))))["$result"] == IntType()
+
+def test_union_find_compresses_paths():
+    variables = [TypeVar() for _ in range(8)]
+    for a, b in zip(variables, variables[1:]):
+        unify(a, b)
+    unify(variables[0], IntType())
+    assert all(prune(v) == IntType() for v in variables)
+    assert all(not isinstance(v.instance, TypeVar) or v.instance.instance is None for v in variables)
@@ -22,6 +22,7 @@ from glucose import (
     Do,
     Lambda,
     Apply,
+    While,
 )
 from uniqify import uniqify, uniqify_expression
 from util import SequentialNameGenerator
@@ -477,3 +478,9 @@ def test_uniqify_expression_apply(
 ) -> None:
     fresh = SequentialNameGenerator()
     assert uniqify_expression(expr, replacements, fresh) == expected
+
+
+def test_uniqify_expression_while() -> None:
+    expr = While(Var("x"), Let("x", Int(0), Var("x")))
+    expected = While(Var("_x9"), Let("_x0", Int(0), Var("_x0")))
+    assert uniqify_expression(expr, {"x": "_x9"}, SequentialNameGenerator()) == expected
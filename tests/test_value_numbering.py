@@ -1,112 +1,150 @@
 import pytest
 from value_numbering import value_numbering, VNError
-from glucose import Program, Int, Bool, Var, Add, Subtract, Multiply, Div, Let, If, Tuple, Get, Set, Do, Lambda, Apply
-from typing import Any, Callable
-
-
-@pytest.mark.parametrize(  # type: ignore
-    "prog, check",
-    [
-        (
-            Program(["x", "y"], Add(Var("x"), Var("y"))),  # type: ignore
-            lambda vn: (
-                hasattr(vn.body, "name")
-                and vn.body.name.startswith("v")  # type: ignore
-                and isinstance(vn.body.value, Add)  # type: ignore
-                and hasattr(vn.body.body, "name")  # type: ignore
-                and vn.body.body.name == vn.body.name  # type: ignore
-            ),  # type: ignore
+from glucose import (
+    Program,
+    Expression,
+    Int,
+    Bool,
+    Var,
+    Add,
+    Subtract,
+    Multiply,
+    Div,
+    Let,
+    If,
+    LessThan,
+    EqualTo,
+    Tuple,
+    Get,
+    Do,
+    Lambda,
+    Apply,
+    While,
+)
+from util import ScopedTable, SequentialNameGenerator
+
+
+@pytest.mark.parametrize(
+    "program, expected",
+    list[tuple[Program, Expression]](
+        [
+            (
+                Program(["x", "y"], Add(Var("x"), Var("y"))),
+                Add(Var("x"), Var("y")),
+            ),
+            (
+                Program([], Add(Add(Int(2), Int(3)), Add(Int(2), Int(3)))),
+                Let("_v0", Add(Int(2), Int(3)), Add(Var("_v0"), Var("_v0"))),
+            ),
+            # Commutative operators are numbered whatever the order of their operands.
+            (
+                Program(
+                    ["x", "y"],
+                    Let("a", Add(Var("x"), Var("y")), Let("b", Add(Var("y"), Var("x")), Multiply(Var("a"), Var("b")))),
+                ),
+                Let("a", Add(Var("x"), Var("y")), Multiply(Var("a"), Var("a"))),
+            ),
+            (
+                Program(["x", "y"], Subtract(Subtract(Var("x"), Var("y")), Subtract(Var("y"), Var("x")))),
+                Let(
+                    "_v0",
+                    Subtract(Var("x"), Var("y")),
+                    Let("_v1", Subtract(Var("y"), Var("x")), Subtract(Var("_v0"), Var("_v1"))),
+                ),
+            ),
+            # Copies are replaced by what they copy.
+            (
+                Program(["x"], Let("a", Var("x"), Let("b", Int(1), Div(Var("a"), Var("b"))))),
+                Div(Var("x"), Int(1)),
+            ),
+            (
+                Program(["x"], Do(Apply(Var("f"), [Add(Var("x"), Int(1))]), Add(Int(1), Var("x")))),
+                Let("_v0", Add(Var("x"), Int(1)), Do(Apply(Var("f"), [Var("_v0")]), Var("_v0"))),
+            ),
+        ]
+    ),
+)
+def test_value_numbering(
+    program: Program,
+    expected: Expression,
+) -> None:
+    assert value_numbering(program, SequentialNameGenerator()) == Program(program.parameters, expected)
+
+
+def test_values_computed_before_a_branch_are_shared_inside_it() -> None:
+    body = Let("a", LessThan(Var("x"), Int(0)), If(LessThan(Var("x"), Int(0)), EqualTo(Var("a"), Bool(True)), Int(1)))
+    assert value_numbering(Program(["x"], body), SequentialNameGenerator()).body == Let(
+        "a", LessThan(Var("x"), Int(0)), If(Var("a"), EqualTo(Var("a"), Bool(True)), Int(1))
+    )
+
+
+def test_values_computed_in_a_branch_are_not_shared_after_it() -> None:
+    branch = If(Var("c"), Add(Var("x"), Int(1)), Int(0))
+    body = Add(branch, Add(Var("x"), Int(1)))
+    assert value_numbering(Program(["c", "x"], body), SequentialNameGenerator()).body == Let(
+        "_v0",
+        branch,
+        Let("_v1", Add(Var("x"), Int(1)), Add(Var("_v0"), Var("_v1"))),
+    )
+
+
+def test_lambda_and_loop_bodies_are_scopes() -> None:
+    x1 = Multiply(Var("x"), Int(2))
+    body = Let(
+        "a",
+        x1,
+        Let(
+            "f",
+            Lambda(["y"], Add(Multiply(Var("x"), Int(2)), Multiply(Var("y"), Int(2)))),
+            Do(While(LessThan(x1, Var("y")), Tuple([x1, Get(Var("t"), x1)])), Apply(Var("f"), [x1])),
         ),
-        (
-            Program([], Add(Add(Int(2), Int(3)), Add(Int(2), Int(3)))),  # type: ignore
-            lambda vn: (
-                hasattr(vn.body, "name")
-                and vn.body.name == "v0"  # type: ignore
-                and isinstance(vn.body.value, Add)  # type: ignore
-                and hasattr(vn.body.body, "name")  # type: ignore
-                and vn.body.body.name == "v0"  # type: ignore
-            ),  # type: ignore
+    )
+    assert value_numbering(Program(["x", "y", "t"], body), SequentialNameGenerator()).body == Let(
+        "a",
+        x1,
+        Let(
+            "f",
+            Lambda(["y"], Let("_v0", Multiply(Var("y"), Int(2)), Add(Var("a"), Var("_v0")))),
+            Do(
+                While(LessThan(Var("a"), Var("y")), Let("_v1", Get(Var("t"), Var("a")), Tuple([Var("a"), Var("_v1")]))),
+                Apply(Var("f"), [Var("a")]),
+            ),
         ),
-    ],
-)
-def test_value_numbering(prog: Any, check: Any) -> None:  # type: ignore
-    vn = value_numbering(prog)
-    assert check(vn)
+    )
 
 
 def test_vn_error_on_unrecognized() -> None:
-    prog = Program([], Bool(True))
-    with pytest.raises(VNError):
-        value_numbering(prog)
-
-
-def test_pipeline_constant_fold_then_vn() -> None:
-    from constant_folding import constant_fold
-    from glucose import Multiply, Div
-
-    expr = Add(Multiply(Int(3), Int(0)), Div(Int(4), Int(2)))  # type: ignore
-    prog = Program([], expr)
-    folded = constant_fold(prog)
-    vn = value_numbering(folded)
-    if isinstance(vn.body, Int):
-        assert vn.body.value == 2
-    else:
-        assert hasattr(vn.body, "name")
-        assert isinstance(vn.body.value, Int) and vn.body.value.value == 2  # type: ignore
-        child = getattr(vn.body, "body", None)
-        assert child is not None and hasattr(child, "name")
-        assert child.name == vn.body.name  # type: ignore
-
-
-def test_hash_expr_all_cases():
-    # Each case in _hash_expr
-    env = {}
-    assert "Int:1" == __import__("value_numbering")._hash_expr(Int(1), env)
-    assert "Var:x" == __import__("value_numbering")._hash_expr(Var("x"), env)
-    assert "Add(Int:1,Int:2)" == __import__("value_numbering")._hash_expr(Add(Int(1), Int(2)), env)
-    assert "Sub(Int:1,Int:2)" == __import__("value_numbering")._hash_expr(Subtract(Int(1), Int(2)), env)
-    assert "Mul(Int:1,Int:2)" == __import__("value_numbering")._hash_expr(Multiply(Int(1), Int(2)), env)
-    assert "Div(Int:1,Int:2)" == __import__("value_numbering")._hash_expr(Div(Int(1), Int(2)), env)
-    assert "If(Int:1;Int:2;Int:3)" == __import__("value_numbering")._hash_expr(If(Int(1), Int(2), Int(3)), env)
-    assert "Let(x=Int:1;Int:2)" == __import__("value_numbering")._hash_expr(Let("x", Int(1), Int(2)), env)
-    assert "Bool:True" == __import__("value_numbering")._hash_expr(Bool(True), env)
-    assert "Bool:False" == __import__("value_numbering")._hash_expr(Bool(False), env)
-    assert "Tup(Int:1,Int:2)" == __import__("value_numbering")._hash_expr(Tuple([Int(1), Int(2)]), env)
-    assert "Get(Int:1;Int:2)" == __import__("value_numbering")._hash_expr(Get(Int(1), Int(2)), env)
-    assert "Set(Int:1;Int:2;Int:3)" == __import__("value_numbering")._hash_expr(Set(Int(1), Int(2), Int(3)), env)
-    assert "Do(Int:1;Int:2)" == __import__("value_numbering")._hash_expr(Do(Int(1), Int(2)), env)
-    assert "Lam(x;Int:1)" == __import__("value_numbering")._hash_expr(Lambda(["x"], Int(1)), env)
-    assert "App(Int:1,Int:2)" == __import__("value_numbering")._hash_expr(Apply(Int(1), [Int(2)]), env)
-
-    # Error case
-    class Dummy:
+    class Unknown:
         pass
 
-    with pytest.raises(__import__("value_numbering").VNError):
-        __import__("value_numbering")._hash_expr(Dummy(), env)
-
-
-def test_rebuild_all_cases():
-    # Each case in _rebuild
-    rec = lambda x: x
-    assert Add(Int(1), Int(2)) == __import__("value_numbering")._rebuild(Add(Int(1), Int(2)), rec)
-    assert Multiply(Int(1), Int(2)) == __import__("value_numbering")._rebuild(Multiply(Int(1), Int(2)), rec)
-    assert Div(Int(1), Int(2)) == __import__("value_numbering")._rebuild(Div(Int(1), Int(2)), rec)
-    assert Let("x", Int(1), Int(2)) == __import__("value_numbering")._rebuild(Let("x", Int(1), Int(2)), rec)
-    assert If(Int(1), Int(2), Int(3)) == __import__("value_numbering")._rebuild(If(Int(1), Int(2), Int(3)), rec)
-    assert Tuple([Int(1), Int(2)]) == __import__("value_numbering")._rebuild(Tuple([Int(1), Int(2)]), rec)
-    assert Get(Int(1), Int(2)) == __import__("value_numbering")._rebuild(Get(Int(1), Int(2)), rec)
-    assert Set(Int(1), Int(2), Int(3)) == __import__("value_numbering")._rebuild(Set(Int(1), Int(2), Int(3)), rec)
-    assert Do(Int(1), Int(2)) == __import__("value_numbering")._rebuild(Do(Int(1), Int(2)), rec)
-    assert Lambda(["x"], Int(1)) == __import__("value_numbering")._rebuild(Lambda(["x"], Int(1)), rec)
-    assert Apply(Int(1), [Int(2)]) == __import__("value_numbering")._rebuild(Apply(Int(1), [Int(2)]), rec)
-    assert Int(1) == __import__("value_numbering")._rebuild(Int(1), rec)
-    assert Var("x") == __import__("value_numbering")._rebuild(Var("x"), rec)
-    assert Bool(True) == __import__("value_numbering")._rebuild(Bool(True), rec)
-
-    # Error case
-    class Dummy:
-        pass
+    with pytest.raises(VNError):
+        value_numbering(Program([], Unknown()), SequentialNameGenerator())  # type: ignore
+
+
+def test_pipeline_opt_then_vn() -> None:
+    from opt import opt
+
+    program = opt(Program([], Add(Multiply(Int(3), Int(0)), Div(Int(4), Int(2)))))
+    assert value_numbering(program, SequentialNameGenerator()).body == Int(2)
+
+
+def test_scoped_table_undoes_a_scope() -> None:
+    table = ScopedTable[str, int]()
+    table["a"] = 1
+    with table.scope():
+        table["a"] = 2
+        table["b"] = 3
+        assert (table["a"], table.get("b")) == (2, 3)
+    assert (table["a"], "b" in table) == (1, False)
+
+
+def test_temporaries_do_not_take_the_names_of_program_variables() -> None:
+    from execute import execute
+    from main import compile
 
-    with pytest.raises(__import__("value_numbering").VNError):
-        __import__("value_numbering")._rebuild(Dummy(), rec)
+    # `uniqify` and the temporaries share one name generator: v1 must not become the name of the eleventh "v".
+    power = "(* (* (* (* (* (* (* (* (* (* (* a a) a) a) a) a) a) a) a) a) a) a)"
+    source = f"(program () (let ((f (lambda (a) (let ((v1 (* a 7))) (+ {power} v1))))) (f 1)))"
+    assert execute(str(compile(source)), []) == 8
+    assert execute(str(compile(source, inline_budget=0)), []) == 8
+    assert execute(str(compile(source, gc=True)), []) == 8